@@ -0,0 +1,200 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+from latency_stats import percentile_ms
+
+DEFAULT_RUN_HISTORY = int(os.environ.get("AGENT_RUN_HISTORY", 100))
+DEFAULT_SAMPLE_INTERVAL_MS = float(os.environ.get("AGENT_PROFILE_SAMPLE_INTERVAL_MS", 5))
+DEFAULT_PROFILE_TOP = int(os.environ.get("AGENT_PROFILE_TOP", 40))
+PROFILE_MODES = ("cprofile", "sample")
+
+_current_node: ContextVar[Optional[Dict[str, Any]]] = ContextVar("agent_node_metrics", default=None)
+
+
+def record(metric: str, amount: int = 1) -> None:
+    """Add to a counter of the agent node currently running; a no-op outside of one"""
+    metrics = _current_node.get()
+    if metrics is not None:
+        metrics[metric] = metrics.get(metric, 0) + amount
+
+
+class LLMUsageCallback(AsyncCallbackHandler):
+    """Counts LLM calls and tokens into the metrics of the running agent node"""
+
+    async def on_llm_end(self, response, **kwargs: Any) -> None:
+        record("llm_calls")
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    record("prompt_tokens", usage.get("input_tokens", 0))
+                    record("completion_tokens", usage.get("output_tokens", 0))
+
+
+def instrument_node(name: str, node: Callable[[Any], Awaitable[Dict[str, Any]]]):
+    """
+    Wrap a LangGraph node so every execution appends its wall time, LLM calls,
+    tokens and graph queries to the `node_metrics` list of the state.
+    """
+
+    async def run(state):
+        metrics = {"node": name, "llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "graph_queries": 0}
+        token = _current_node.set(metrics)
+        started = time.perf_counter()
+        try:
+            update = await node(state)
+        finally:
+            metrics["wall_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            _current_node.reset(token)
+        return {**update, "node_metrics": [metrics]}
+
+    return run
+
+
+class StackSampler:
+    """
+    Sampling profiler for the event loop thread.
+    Collects the thread's stack every `interval_ms` and reports the most frequent
+    stacks in collapsed "file:function;..." form, readable by flamegraph tools.
+    """
+
+    def __init__(self, interval_ms: float = DEFAULT_SAMPLE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._sampler = threading.Thread(target=self._run, daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._sampler.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def report(self, top: int) -> Dict[str, Any]:
+        return {
+            "mode": "sample",
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "stacks": [{"stack": stack, "samples": count} for stack, count in self.stacks.most_common(top)]
+        }
+
+
+class AgentRunRecorder:
+    """
+    Keeps the per-node metrics (and optional profiles) of the most recent agent runs.
+
+    Profiling covers the whole event loop thread, so concurrent requests show up
+    in a profile too; only one run is profiled at a time.
+    """
+
+    def __init__(self, history: int = DEFAULT_RUN_HISTORY, profile_top: int = DEFAULT_PROFILE_TOP):
+        self.runs: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self.profile_top = profile_top
+        self._profiling = False
+
+    @contextmanager
+    def profile(self, mode: Optional[str]):
+        """Profile the enclosed code with cProfile or the stack sampler; yields a dict receiving the report"""
+        report: Dict[str, Any] = {}
+        if not mode:
+            yield report
+            return
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode}. Must be one of: {', '.join(PROFILE_MODES)}")
+        if self._profiling:
+            report["skipped"] = "Another run is being profiled"
+            yield report
+            return
+
+        self._profiling = True
+        profiler = cProfile.Profile() if mode == "cprofile" else StackSampler()
+        try:
+            if mode == "cprofile":
+                profiler.enable()
+            else:
+                profiler.start()
+            yield report
+        finally:
+            if mode == "cprofile":
+                profiler.disable()
+                output = io.StringIO()
+                pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(self.profile_top)
+                report.update({"mode": "cprofile", "stats": output.getvalue()})
+            else:
+                profiler.stop()
+                report.update(profiler.report(self.profile_top))
+            self._profiling = False
+
+    def record(self, query: str, group_id: str, wall_seconds: float,
+               node_metrics: List[Dict[str, Any]], profile: Optional[Dict[str, Any]] = None) -> str:
+        run_id = uuid.uuid4().hex
+        self.runs.append({
+            "run_id": run_id,
+            "query": query,
+            "group_id": group_id,
+            "wall_ms": round(wall_seconds * 1000, 2),
+            "nodes": node_metrics,
+            "totals": {
+                metric: sum(node.get(metric, 0) for node in node_metrics)
+                for metric in ("llm_calls", "prompt_tokens", "completion_tokens", "graph_queries")
+            },
+            "profile": profile or None
+        })
+        return run_id
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        return next((run for run in self.runs if run["run_id"] == run_id), None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-node latency percentiles and mean counters over the recorded runs"""
+        per_node: Dict[str, List[Dict[str, Any]]] = {}
+        for run in self.runs:
+            for metrics in run["nodes"]:
+                per_node.setdefault(metrics["node"], []).append(metrics)
+
+        nodes = {}
+        for name, executions in per_node.items():
+            wall = [execution["wall_ms"] / 1000 for execution in executions]
+            nodes[name] = {
+                "executions": len(executions),
+                "p50_ms": percentile_ms(wall, 50),
+                "p95_ms": percentile_ms(wall, 95),
+                **{
+                    f"mean_{metric}": round(sum(e.get(metric, 0) for e in executions) / len(executions), 2)
+                    for metric in ("llm_calls", "prompt_tokens", "completion_tokens", "graph_queries")
+                }
+            }
+        runs_wall = [run["wall_ms"] / 1000 for run in self.runs]
+        return {
+            "runs": len(self.runs),
+            "p50_ms": percentile_ms(runs_wall, 50),
+            "p95_ms": percentile_ms(runs_wall, 95),
+            "nodes": nodes
+        }
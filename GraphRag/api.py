@@ -1,6 +1,10 @@
-﻿import logging
+﻿import asyncio
+import hashlib
+import logging
 import os
-from typing import Any, List, Optional
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union
 from uuid import UUID
 
 import structlog
@@ -8,12 +12,16 @@ import cognee
 import uvicorn
 from cognee.api.v1.exceptions import DocumentNotFoundError
 from cognee.context_global_variables import set_session_user_context_variable
+from cognee.infrastructure.databases.vector.embeddings import get_embedding_engine
 from cognee.modules.data.exceptions import DatasetNotFoundError
+from cognee.modules.chunking.TextChunker import TextChunker
+from cognee.modules.engine.operations.setup import setup as setup_databases
 from cognee.modules.observability.get_observe import get_observe
 from cognee.modules.search.types import SearchType
 from cognee.modules.users.methods import get_default_user
 from cognee.modules.users.permissions.methods.give_permission_on_dataset import give_permission_on_dataset
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from opentelemetry import trace
 from opentelemetry._logs import set_logger_provider
 from opentelemetry.exporter.otlp.proto.grpc._log_exporter import OTLPLogExporter
@@ -24,9 +32,44 @@ from opentelemetry.sdk._logs._internal.export import BatchLogRecordProcessor
 from opentelemetry.sdk.resources import Resource, SERVICE_NAME
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from starlette import status
 
+from chunking_pool import (
+    DEFAULT_CHUNK_WORKERS,
+    ProcessPoolTextChunker,
+    chunking_stats,
+    shutdown_chunking_pool,
+    start_chunking_pool
+)
+from dataset_listing import InvalidListingError, get_dataset_page, parse_fields, stream_dataset_json
+from embedding_cache import EmbeddingCache
+from graph_maintenance import GraphMaintainer, dataset_graph_engine, dataset_graph_paths
+from hybrid_search import HYBRID_SEARCH_TYPE, HybridChunkSearch
+from memify_scheduler import MemifyScheduler
+from prefetch import PrefetchScheduler
+from reclamation import TombstoneCompactor, dataset_data_ids, delete_dataset_stores, delete_orphaned_data, prune_everything
+from result_cache import CachedCogneeSearch
+from shared_state import (
+    ALL_DATASETS,
+    ProcessLock,
+    SharedGenerations,
+    acquire_worker_slot,
+    enable_shared_kuzu_lock,
+    enable_sqlite_wal,
+    multi_worker
+)
+from store_handles import StoreHandles, remove_dataset_files
+from temporal_index import TemporalIndex, time_window, use_time_window
+from vector_maintenance import (
+    VectorIndexMaintainer,
+    dataset_vector_urls,
+    install_search_params,
+    search_overrides,
+    use_search_params
+)
+from write_scheduler import WriteScheduler
+
 observe = get_observe()
 
 ENV_FILE_PATH = os.path.join(os.path.dirname(__file__), ".env")
@@ -48,10 +91,190 @@ logging.getLogger().addHandler(handler)
 logger = logging.getLogger(__name__)
 cognee.setup_logging()
 
+# With several workers (WEB_CONCURRENCY > 1) all of them read and write one embedding cache
+# on disk, so a text embedded by any worker is a hit for the others. Search results stay
+# cached per process, as they are live Python objects; writes invalidate them in all
+# workers through shared generation counters.
+worker_slot = acquire_worker_slot() if multi_worker() else None
+embedding_cache = EmbeddingCache(
+    namespace=os.environ.get('EMBEDDING_MODEL') or "default",
+    dimensions=int(os.environ.get('EMBEDDING_DIMENSIONS', 3072))
+)
+search_cache = CachedCogneeSearch(cognee.search, generations=SharedGenerations() if multi_worker() else None)
+prefetcher = PrefetchScheduler()
+# Each adventure has its own Kuzu and LanceDB stores; only recently used ones stay open
+store_handles = StoreHandles()
+# Writes to a dataset's stores run one at a time; searches don't wait for them
+write_scheduler = WriteScheduler()
+# Sentence splitting and tokenization of large documents leave the event loop when COGNIFY_CHUNK_WORKERS > 0
+cognify_chunker = ProcessPoolTextChunker if DEFAULT_CHUNK_WORKERS > 0 else TextChunker
+# Story-time intervals of each adventure's events, for searches scoped with as_of/between
+temporal_index = TemporalIndex()
+# search_type HYBRID: BM25 and vector search over chunks, fused, without any LLM call
+hybrid_search = HybridChunkSearch()
+# Memify requests for an adventure arriving close together are served by one run
+memify_scheduler = MemifyScheduler()
+# Large LanceDB tables get an ANN index and many small appends are compacted, checked after writes and hourly
+vector_maintainer = VectorIndexMaintainer()
+# Kuzu graphs are checkpointed once cognify's writes pile up in their WAL, checked after writes and every 30 minutes
+graph_maintainer = GraphMaintainer()
+
+
+async def reclaim_everything(progress) -> None:
+    """Wipe all adventures and cognee's system state after /nuke, holding off writes to the known adventures"""
+    datasets = await cognee.datasets.list_datasets()
+    await progress(0, 1)
+    async with write_scheduler.write([dataset.name for dataset in datasets], "reclaim"):
+        store_handles.evict_all()
+        await prune_everything()
+        store_handles.evict_all()
+    await progress(1, None)
+    search_cache.clear()
+    logger.info("Reclaimed all %d adventures and pruned the system databases", len(datasets))
+
+
+async def reclaim_adventure(tombstone: Dict[str, Any], progress) -> None:
+    """Physically delete a tombstoned adventure: graph and vector stores, store files, data rows and files"""
+    if tombstone["name"] == ALL_DATASETS:
+        await reclaim_everything(progress)
+        return
+    name, dataset_id, owner_id = tombstone["name"], tombstone["dataset_id"], tombstone["owner_id"]
+    async with write_scheduler.write([name], "reclaim"):
+        data_ids = await dataset_data_ids(dataset_id)
+        await progress(0, len(data_ids) + 1)
+        store_handles.evict_dataset(dataset_id)
+        await delete_dataset_stores(dataset_id, owner_id)
+        # Close the handles cognee opened to delete, then drop the adventure's store files
+        store_handles.evict_dataset(dataset_id)
+        removed = remove_dataset_files(owner_id, dataset_id)
+        await progress(1, None)
+        deleted = await delete_orphaned_data(dataset_id, owner_id, data_ids, progress, steps_done=1)
+    search_cache.invalidate(name)
+    logger.info("Reclaimed %s: removed %s and %d of %d data items", name, removed, deleted, len(data_ids))
+
+
+# /delete and /nuke only tombstone adventures; their storage is reclaimed in the background
+compactor = TombstoneCompactor(reclaim_adventure)
+
+
+def reject_deleted(adventure_ids: List[str]) -> None:
+    deleted = compactor.hidden(adventure_ids)
+    if deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Adventures {deleted} were deleted"
+        )
+
+
+async def maintain_vector_stores(
+        adventure_ids: Optional[List[str]] = None,
+        force_index: bool = False,
+        compact: Optional[bool] = None
+) -> Dict[str, Any]:
+    """Index and compact the LanceDB tables of the given adventures (all of them for None); reports per adventure"""
+    datasets = await cognee.datasets.list_datasets()
+    deleted = set(compactor.hidden([d.name for d in datasets]))
+    urls = await dataset_vector_urls()
+    report = {}
+    for dataset in datasets:
+        name = dataset.name
+        if name in deleted or (adventure_ids is not None and name not in adventure_ids):
+            continue
+        url = urls.get(str(dataset.id))
+        if url is None:
+            continue
+        # Compaction rewrites fragments, so it waits for the adventure's writes; index builds don't
+        actions = await vector_maintainer.maintain(
+            url, force_index=force_index, compact=compact,
+            write_lock=lambda: write_scheduler.write([name], "compact")
+        )
+        if actions:
+            search_cache.invalidate(name)
+        report[name] = actions
+    return report
+
+
+async def maintain_graph_stores(adventure_ids: Optional[List[str]] = None, force_checkpoint: bool = False) -> Dict[str, Any]:
+    """Checkpoint and index the Kuzu graphs of the given adventures (all of them for None); reports per adventure"""
+    datasets = await cognee.datasets.list_datasets()
+    deleted = set(compactor.hidden([d.name for d in datasets]))
+    paths = await dataset_graph_paths()
+    report = {}
+    for dataset in datasets:
+        name = dataset.name
+        if name in deleted or (adventure_ids is not None and name not in adventure_ids):
+            continue
+        path = paths.get(str(dataset.id))
+        if path is None:
+            continue
+        # Opening a graph reserves its buffer pool, so graphs with nothing to do stay closed
+        if not graph_maintainer.due(path, force_checkpoint):
+            report[name] = []
+            continue
+        engine = await dataset_graph_engine(str(dataset.id), str(dataset.owner_id))
+        # A checkpoint waits for open write transactions, so it queues behind the adventure's writes
+        report[name] = await graph_maintainer.maintain(
+            engine, force_checkpoint=force_checkpoint,
+            write_lock=lambda: write_scheduler.write([name], "checkpoint")
+        )
+    return report
+
+
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    store_handles.install()
+    install_search_params()
+    temporal_index.install()
+    if multi_worker():
+        # Kuzu and SQLite allow a single writer: Kuzu databases are opened per query under a
+        # host-wide lock, SQLite switches to WAL, and the databases and default user are
+        # created by whichever worker starts first
+        enable_shared_kuzu_lock()
+        startup_lock = ProcessLock("startup")
+        await startup_lock.acquire()
+        try:
+            await setup_databases()
+            await enable_sqlite_wal()
+            await get_default_user()
+        finally:
+            startup_lock.release()
+        logger.info("Worker %s started (pid %s)", worker_slot, os.getpid())
+    else:
+        # Searches keep reading the relational database while a write transaction is open
+        await setup_databases()
+        await enable_sqlite_wal()
+
+    # The embedding engine is a process-wide singleton shared by the vector store,
+    # so wrapping it once covers ingestion (cognify/memify) and search queries
+    embedding_engine = get_embedding_engine()
+    embedding_engine.embed_text = embedding_cache.wrap(embedding_engine.embed_text)
+    logger.info("Embedding cache enabled: %s", embedding_cache.stats())
+    prefetcher.start()
+    store_handles.start()
+    compactor.start()
+    vector_maintainer.start(maintain_vector_stores)
+    graph_maintainer.start(maintain_graph_stores)
+    start_chunking_pool()
+
+    yield
+
+    await prefetcher.stop()
+    await memify_scheduler.stop()
+    await compactor.stop()
+    await vector_maintainer.stop()
+    await graph_maintainer.stop()
+    await store_handles.stop()
+    shutdown_chunking_pool()
+    embedding_cache.close()
+    if search_cache.generations is not None:
+        search_cache.generations.close()
+
+
 app = FastAPI(
     title="GraphRAG API (Cognee)",
     description="API for GraphRAG operations using Cognee framework with SQLite, Kuzu, and LanceDB",
     version="2.0.0",
+    lifespan=lifespan
 )
 FastAPIInstrumentor.instrument_app(app)
 
@@ -64,7 +287,15 @@ class AddDataRequest(BaseModel):
 class SearchRequest(BaseModel):
     adventure_ids: List[str]
     query: str
-    search_type: SearchType
+    search_type: Union[SearchType, Literal["HYBRID"]]
+    # Number of snippets returned by HYBRID searches
+    top_k: Optional[int] = Field(default=None, ge=1)
+    # ANN parameters of indexed vector tables; more probes or refinement trade latency for recall
+    nprobes: Optional[int] = Field(default=None, ge=1)
+    refine_factor: Optional[int] = Field(default=None, ge=1)
+    # Story time: only facts valid at this moment / overlapping this range are retrieved (not for HYBRID)
+    as_of: Optional[datetime] = None
+    between: Optional[Tuple[datetime, datetime]] = None
 
 
 class PipelineRunInfo(BaseModel):
@@ -94,12 +325,21 @@ class AddDataResponse(BaseModel):
 class SearchResultItem(BaseModel):
     dataset_name: str
     text: str
+    # Fused rank score of HYBRID results
+    score: Optional[float] = None
 
 
 class SearchResponse(BaseModel):
     results: List[SearchResultItem]
 
 
+class PrefetchRequest(BaseModel):
+    adventure_ids: List[str]
+    queries: List[str] = []
+    entities: List[str] = []
+    search_type: SearchType = SearchType.GRAPH_COMPLETION
+
+
 class VisualizeRequest(BaseModel):
     path: str
 
@@ -119,10 +359,18 @@ class UpdateDataRequest(BaseModel):
     content: str
 
 
+def _text_content_hash(content: str) -> str:
+    """Content hash cognee records for a text document it stores (Data.content_hash)"""
+    return hashlib.md5(content.encode("utf-8")).hexdigest()
+
+
 @app.post("/add", status_code=status.HTTP_200_OK)
 async def add_data(data: AddDataRequest):
     """Add data to multiple datasets without processing"""
     try:
+        # Re-adding to a deleted adventure must not write into the dataset being reclaimed; a pending
+        # /nuke wipe runs first, before the default user is looked up in the wiped database
+        await compactor.reclaim_now(data.adventure_ids)
         user = await get_default_user()
         await set_session_user_context_variable(user)
 
@@ -130,7 +378,13 @@ async def add_data(data: AddDataRequest):
 
         for adventure_id in data.adventure_ids:
             logger.info("Adding data to dataset %s", adventure_id)
-            result = await cognee.add(data.content, dataset_name=adventure_id)
+            # Adds queued for the same dataset run as one batched cognee.add
+            result = await write_scheduler.add(
+                adventure_id,
+                data.content,
+                lambda contents, dataset_name=adventure_id: cognee.add(contents, dataset_name=dataset_name)
+            )
+            search_cache.invalidate(adventure_id)
             logger.info("Add completed %s", result)
             datasets = await cognee.datasets.list_datasets()
             dataset_summaries = [{"id": getattr(d, "id", None), "name": getattr(d, "name", None)} for d in datasets]
@@ -153,10 +407,12 @@ async def add_data(data: AddDataRequest):
                     if data_id:
                         data_ids.add(str(data_id))
 
+            # A batched add also reports the documents of the requests it was merged with
+            requested_hashes = {_text_content_hash(content) for content in data.content}
             file_name_to_id = {}
             for item in dataset_data:
                 item_id = str(getattr(item, "id", ""))
-                if item_id in data_ids:
+                if item_id in data_ids and getattr(item, "content_hash", None) in requested_hashes:
                     file_name = getattr(item, "name", "")
                     file_name_to_id[file_name] = item_id
 
@@ -176,20 +432,31 @@ async def add_data(data: AddDataRequest):
 @app.post("/cognify", status_code=status.HTTP_200_OK)
 async def cognify_dataset(request: CognifyRequest):
     """Run cognify processing on multiple datasets"""
+    reject_deleted(request.adventure_ids)
     try:
         user = await get_default_user()
         await set_session_user_context_variable(user)
 
         # Process all datasets in a single cognify call to avoid race conditions
         logger.info("Running cognify for datasets %s (temporal=%s)", request.adventure_ids, request.temporal)
-        result = await cognee.cognify(datasets=request.adventure_ids, temporal_cognify=request.temporal)
+        try:
+            async with write_scheduler.write(request.adventure_ids, "cognify"):
+                result = await cognee.cognify(
+                    datasets=request.adventure_ids, temporal_cognify=request.temporal, chunker=cognify_chunker
+                )
+        finally:
+            for adventure_id in request.adventure_ids:
+                search_cache.invalidate(adventure_id)
+                vector_maintainer.request(adventure_id)
+                graph_maintainer.request(adventure_id)
         logger.info("Cognify result: %s", result)
 
         # Generate visualizations for each dataset
         path = os.environ.get('VISUALISATION_PATH', './visualization')
         for adventure_id in request.adventure_ids:
             try:
-                await cognee.cognify(datasets=adventure_id, temporal_cognify=request.temporal)
+                async with write_scheduler.write([adventure_id], "cognify"):
+                    await cognee.cognify(datasets=adventure_id, temporal_cognify=request.temporal, chunker=cognify_chunker)
                 await cognee.visualize_graph(f"{path}/{adventure_id}/cognify_graph_visualization.html")
             except Exception as viz_error:
                 logger.warning("Failed to generate visualization for %s: %s", adventure_id, viz_error)
@@ -205,15 +472,26 @@ async def cognify_dataset(request: CognifyRequest):
 @app.post("/memify", status_code=status.HTTP_200_OK)
 async def memify_dataset(request: MemifyRequest):
     """Run memify processing on multiple datasets"""
+    reject_deleted(request.adventure_ids)
     try:
         user = await get_default_user()
         await set_session_user_context_variable(user)
 
-        # Process all datasets - memify may need to be called per dataset
-        # depending on cognee's API, but we batch where possible
-        for adventure_id in request.adventure_ids:
+        async def run_memify(adventure_id: str):
             logger.info("Running memify for dataset %s", adventure_id)
-            mem_result = await cognee.memify(dataset=adventure_id)
+            try:
+                async with write_scheduler.write([adventure_id], "memify"):
+                    return await cognee.memify(dataset=adventure_id)
+            finally:
+                search_cache.invalidate(adventure_id)
+                vector_maintainer.request(adventure_id)
+                graph_maintainer.request(adventure_id)
+
+        # memify runs per dataset; datasets run in parallel and overlapping requests share a run
+        mem_results = await asyncio.gather(
+            *(memify_scheduler.memify(adventure_id, run_memify) for adventure_id in request.adventure_ids)
+        )
+        for adventure_id, mem_result in zip(request.adventure_ids, mem_results):
             logger.info("Memify result for %s: %s", adventure_id, mem_result)
 
         # Generate visualizations for each dataset
@@ -236,39 +514,89 @@ async def memify_dataset(request: MemifyRequest):
 async def list_all_datasets():
     """List all datasets with their IDs and names"""
     datasets = await cognee.datasets.list_datasets()
-    return [{"id": str(getattr(d, "id", None)), "name": getattr(d, "name", None)} for d in datasets]
+    deleted = set(compactor.hidden([d.name for d in datasets]))
+    return [{"id": str(getattr(d, "id", None)), "name": getattr(d, "name", None)} for d in datasets if d.name not in deleted]
 
 
 @app.get("/datasets/{adventure_id}")
-async def get_datasets(adventure_id: str):
-
+async def get_datasets(
+        adventure_id: str,
+        fields: Optional[str] = None,
+        since: Optional[datetime] = None,
+        limit: Optional[int] = Query(default=None, ge=1, le=1000),
+        cursor: Optional[str] = None
+):
+    """List the data of a dataset
+
+    Query parameters (all optional):
+    - fields: comma separated columns to return (defaults to all columns)
+    - since: only data created or updated at or after this time
+    - limit: page size; when set the response is {"items": [...], "next_cursor": ...}
+    - cursor: next_cursor of the previous page
+
+    Without limit and cursor the full list is streamed from the database as a JSON array.
+    """
     datasets = await cognee.datasets.list_datasets()
-    dataset_summaries = [{"id": getattr(d, "id", None), "name": getattr(d, "name", None)} for d in datasets]
-    logger.info("Datasets after processing %s: %s", adventure_id, dataset_summaries)
-
     dataset = next((d for d in datasets if d.name == adventure_id), None)
-    if not dataset:
-        raise ValueError(f"Dataset '{adventure_id}' not found after processing")
+    if not dataset or compactor.hidden([adventure_id]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Dataset '{adventure_id}' not found"
+        )
 
-    dataset_data = await cognee.datasets.list_data(dataset.id)
-    logger.info("Dataset data for %s: %s", adventure_id, dataset_data)
-    return dataset_data
+    try:
+        selected = parse_fields(fields)
+        if limit is None and cursor is None:
+            logger.info("Streaming data of dataset %s (fields=%s, since=%s)", adventure_id, fields, since)
+            return StreamingResponse(stream_dataset_json(dataset.id, selected, since), media_type="application/json")
+
+        page = await get_dataset_page(dataset.id, selected, limit or 100, cursor, since)
+        logger.info("Returning %d data items of dataset %s", len(page["items"]), adventure_id)
+        return page
+    except InvalidListingError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
 
 @observe(name="search", as_type="generation")
 @app.post("/search")
 async def search(request: SearchRequest, response_model=SearchResponse):
+    try:
+        window = time_window(request.as_of, request.between)
+        if window is not None and request.search_type == HYBRID_SEARCH_TYPE:
+            # Chunks carry no story time of their own, so a window can't scope them
+            raise ValueError("as_of and between are not supported by the HYBRID search type")
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
     try:
         user = await get_default_user()
         await set_session_user_context_variable(user)
 
-        search_results = await cognee.search(
-            datasets=request.adventure_ids,
-            query_type=request.search_type,
-            query_text=request.query,
-            session_id=request.adventure_ids[0] if request.adventure_ids else ""
-        )
+        # Deleted adventures have no results, even before their storage is reclaimed
+        adventure_ids = compactor.visible(request.adventure_ids)
+        if request.adventure_ids and not adventure_ids:
+            return SearchResponse(results=[])
+
+        overrides = search_overrides(request.nprobes, request.refine_factor)
+        use_search_params(overrides)
+        if request.search_type == HYBRID_SEARCH_TYPE:
+            return await search_hybrid(adventure_ids, request.query, request.top_k)
+        use_time_window(window)
+        variant = {**(overrides or {}), **({"time_window": window} if window else {})} or None
+        async with prefetcher.foreground():
+            search_results = await search_cache.search_(
+                datasets=adventure_ids,
+                query_type=request.search_type,
+                query_text=request.query,
+                variant=variant,
+                session_id=adventure_ids[0] if adventure_ids else ""
+            )
 
         all_results = []
         for result in search_results:
@@ -294,11 +622,86 @@ async def search(request: SearchRequest, response_model=SearchResponse):
         )
 
 
-@app.delete("/nuke")
+async def search_hybrid(adventure_ids: List[str], query: str, top_k: Optional[int]) -> SearchResponse:
+    """Ranked chunks of the adventures (all of them when none are given) without generating an answer"""
+    datasets = await cognee.datasets.list_datasets()
+    if adventure_ids:
+        selected = [d for d in datasets if d.name in adventure_ids]
+        missing = set(adventure_ids) - {d.name for d in selected}
+        if missing:
+            raise DatasetNotFoundError(f"Datasets {sorted(missing)} not found")
+    else:
+        deleted = set(compactor.hidden([d.name for d in datasets]))
+        selected = [d for d in datasets if d.name not in deleted]
+
+    async with prefetcher.foreground():
+        results = await hybrid_search.search(
+            [(d.name, str(d.id), str(d.owner_id)) for d in selected], query, top_k
+        )
+    return SearchResponse(results=[
+        SearchResultItem(dataset_name=result["dataset_name"], text=result["text"], score=result["score"])
+        for result in results
+    ])
+
+
+@app.post("/prefetch", status_code=status.HTTP_202_ACCEPTED)
+async def prefetch(request: PrefetchRequest):
+    """Warm the search and embedding caches for the next scene in the background
+
+    Request body should contain:
+    - adventure_ids: list of datasets the upcoming searches will use
+    - queries: list of search queries expected at scene start
+    - entities: list of entity names (characters present, current location, active quests)
+    - search_type: optional, defaults to GRAPH_COMPLETION
+
+    Entity names are embedded and searched as queries of their own.
+    Prefetching runs at low priority: jobs wait while any /search is in progress.
+    """
+    adventure_ids = compactor.visible(request.adventure_ids)
+    if request.adventure_ids and not adventure_ids:
+        return {"queued": 0, "dropped": 0}
+    entities = list(dict.fromkeys(request.entities))
+    queries = list(dict.fromkeys(request.queries + entities))
+
+    async def warm_embeddings():
+        await get_embedding_engine().embed_text(entities)
+
+    def warm_search(query: str):
+        async def job():
+            user = await get_default_user()
+            await set_session_user_context_variable(user)
+            await search_cache.search_(
+                datasets=adventure_ids,
+                query_type=request.search_type,
+                query_text=query,
+                prefetch=True,
+                session_id=adventure_ids[0] if adventure_ids else ""
+            )
+
+        return job
+
+    queued = 0
+    if entities and prefetcher.submit(warm_embeddings):
+        queued += 1
+    for query in queries:
+        if prefetcher.submit(warm_search(query)):
+            queued += 1
+
+    logger.info("Queued %d prefetch jobs for datasets %s", queued, request.adventure_ids)
+    return {"queued": queued, "dropped": len(queries) + (1 if entities else 0) - queued}
+
+
+@app.delete("/nuke", status_code=status.HTTP_202_ACCEPTED)
 async def nuke():
+    """
+    Delete every adventure at once; all data and system state (graph, vector and relational
+    databases) is wiped in the background, or before the next write (see /reclamation)
+    """
     try:
-        await cognee.prune.prune_data()
-        await cognee.prune.prune_system(metadata=True)
+        datasets = await cognee.datasets.list_datasets()
+        compactor.tombstone(ALL_DATASETS, ALL_DATASETS, "")
+        search_cache.clear()
+        return {"message": f"Deleted {len(datasets)} adventures", "status": compactor.status()["counts"]}
     except Exception as e:
         logger.error(f"{type(e).__name__}: Error clearing data: {str(e)}")
         raise HTTPException(
@@ -309,6 +712,7 @@ async def nuke():
 
 @app.delete("/delete/node/{dataset_name}/{data_id}")
 async def delete_node(dataset_name: str, data_id: UUID):
+    reject_deleted([dataset_name])
     try:
         user = await get_default_user()
         await set_session_user_context_variable(user)
@@ -334,7 +738,11 @@ async def delete_node(dataset_name: str, data_id: UUID):
         except Exception as lookup_err:
             logger.warning(f"Could not look up data item: {lookup_err}")
 
-        await cognee.delete(data_id=data_id, dataset_id=dataset.id)
+        try:
+            async with write_scheduler.write([dataset_name], "delete"):
+                await cognee.delete(data_id=data_id, dataset_id=dataset.id)
+        finally:
+            search_cache.invalidate(dataset_name)
 
         return {"message": f"Successfully deleted node {data_id} from dataset {dataset_name}"}
     except HTTPException:
@@ -349,6 +757,7 @@ async def delete_node(dataset_name: str, data_id: UUID):
 
 @app.put("/update")
 async def update_node(request: UpdateDataRequest):
+    reject_deleted([request.adventure_id])
     try:
         user = await get_default_user()
         await set_session_user_context_variable(user)
@@ -362,7 +771,11 @@ async def update_node(request: UpdateDataRequest):
                 detail=f"Dataset with name '{request.adventure_id}' not found"
             )
 
-        await cognee.update(data_id=request.data_id, dataset_id=dataset.id, data=request.content)
+        try:
+            async with write_scheduler.write([request.adventure_id], "update"):
+                await cognee.update(data_id=request.data_id, dataset_id=dataset.id, data=request.content)
+        finally:
+            search_cache.invalidate(request.adventure_id)
 
     except DocumentNotFoundError:
         raise HTTPException(
@@ -379,8 +792,9 @@ async def update_node(request: UpdateDataRequest):
         )
 
 
-@app.delete("/delete/{adventure_id}")
+@app.delete("/delete/{adventure_id}", status_code=status.HTTP_202_ACCEPTED)
 async def clear_adventure(adventure_id: str):
+    """Delete an adventure at once; its storage is reclaimed in the background (see /reclamation)"""
     try:
         user = await get_default_user()
         await set_session_user_context_variable(user)
@@ -394,8 +808,12 @@ async def clear_adventure(adventure_id: str):
                 detail=f"Dataset with name '{adventure_id}' not found"
             )
 
-        dataset_id = dataset.id
-        await cognee.datasets.delete_dataset(dataset_id=dataset_id)
+        tombstone = compactor.tombstone(str(dataset.id), adventure_id, str(dataset.owner_id))
+        search_cache.invalidate(adventure_id)
+        logger.info("Adventure %s deleted, reclamation %s", adventure_id, tombstone["state"])
+        return tombstone
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"{type(e).__name__}: Error clearing adventure: {str(e)}")
         raise HTTPException(
@@ -451,6 +869,154 @@ async def visualization(request: VisualizeRequest):
             detail=f"Failed to generate visualization: {str(e)}"
         )
 
+@app.get("/reclamation")
+async def reclamation_status():
+    """Deleted adventures and the progress of reclaiming their storage"""
+    return compactor.status()
+
+
+@app.get("/reclamation/{adventure_id}")
+async def adventure_reclamation_status(adventure_id: str):
+    result = compactor.status(adventure_id)
+    if not result["tombstones"]:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Adventure '{adventure_id}' was not deleted"
+        )
+    return result
+
+
+@app.get("/admin/vectors")
+async def vector_maintenance_status():
+    """Index and compaction settings of the LanceDB maintainer and what it did so far"""
+    return vector_maintainer.stats()
+
+
+@app.get("/admin/vectors/{adventure_id}")
+async def adventure_vector_stats(adventure_id: str):
+    """Rows, fragments and index coverage of each LanceDB table of an adventure"""
+    reject_deleted([adventure_id])
+    datasets = await cognee.datasets.list_datasets()
+    dataset = next((d for d in datasets if d.name == adventure_id), None)
+    url = (await dataset_vector_urls()).get(str(dataset.id)) if dataset else None
+    if url is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Dataset '{adventure_id}' has no vector store"
+        )
+    try:
+        return {"adventure_id": adventure_id, "tables": await vector_maintainer.inspect(url)}
+    except Exception as e:
+        logger.error(f"{type(e).__name__}: Error reading vector store of {adventure_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to read vector store: {str(e)}"
+        )
+
+
+@app.post("/admin/vectors/{adventure_id}/maintain")
+async def maintain_adventure_vectors(adventure_id: str, force_index: bool = False, compact: Optional[bool] = None):
+    """Index and compact an adventure's LanceDB tables now
+
+    Query parameters (all optional):
+    - force_index: build the ANN index even below LANCEDB_INDEX_MIN_ROWS
+    - compact: true always optimizes, false never does; by default only fragmented or poorly indexed tables are
+    """
+    reject_deleted([adventure_id])
+    try:
+        report = await maintain_vector_stores([adventure_id], force_index=force_index, compact=compact)
+    except Exception as e:
+        logger.error(f"{type(e).__name__}: Error maintaining vector store of {adventure_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Vector maintenance failed: {str(e)}"
+        )
+    if adventure_id not in report:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Dataset '{adventure_id}' has no vector store"
+        )
+    return {"adventure_id": adventure_id, "tables": report[adventure_id]}
+
+
+@app.get("/admin/graph")
+async def graph_maintenance_status():
+    """Checkpoint settings of the Kuzu maintainer and what it did so far"""
+    return graph_maintainer.stats()
+
+
+@app.get("/admin/graph/{adventure_id}")
+async def adventure_graph_stats(adventure_id: str):
+    """Nodes, edges, node types, file and WAL sizes and indexes of an adventure's graph"""
+    reject_deleted([adventure_id])
+    datasets = await cognee.datasets.list_datasets()
+    dataset = next((d for d in datasets if d.name == adventure_id), None)
+    if not dataset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Dataset '{adventure_id}' not found"
+        )
+    try:
+        engine = await dataset_graph_engine(str(dataset.id), str(dataset.owner_id))
+        return {"adventure_id": adventure_id, **await graph_maintainer.inspect(engine)}
+    except Exception as e:
+        logger.error(f"{type(e).__name__}: Error reading graph of {adventure_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to read graph: {str(e)}"
+        )
+
+
+@app.post("/admin/graph/{adventure_id}/maintain")
+async def maintain_adventure_graph(adventure_id: str, checkpoint: bool = False):
+    """Checkpoint and index an adventure's graph now
+
+    Query parameters (all optional):
+    - checkpoint: checkpoint even when the WAL is below KUZU_CHECKPOINT_MIN_WAL_BYTES
+    """
+    reject_deleted([adventure_id])
+    try:
+        report = await maintain_graph_stores([adventure_id], force_checkpoint=checkpoint)
+    except Exception as e:
+        logger.error(f"{type(e).__name__}: Error maintaining graph of {adventure_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Graph maintenance failed: {str(e)}"
+        )
+    if adventure_id not in report:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Dataset '{adventure_id}' not found"
+        )
+    return {"adventure_id": adventure_id, "actions": report[adventure_id]}
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss statistics of the search and embedding caches, the prefetch backlog, open stores and event timelines"""
+    return {
+        "search": search_cache.stats(),
+        "embedding": embedding_cache.stats(),
+        "prefetch": prefetcher.stats(),
+        "stores": store_handles.stats(),
+        "temporal": temporal_index.stats(),
+        "hybrid": hybrid_search.stats(),
+        # Caches are per worker process; the answer comes from this one
+        "worker": {"slot": worker_slot, "pid": os.getpid()}
+    }
+
+
+@app.get("/writes/stats")
+async def write_stats():
+    """Queued writes per dataset, batched adds, time writes spent waiting, the cognify chunking pool and memify runs"""
+    return {
+        **write_scheduler.stats(),
+        "chunking": chunking_stats(),
+        "memify": memify_scheduler.stats(),
+        "worker": {"slot": worker_slot, "pid": os.getpid()}
+    }
+
+
 @app.get("/")
 async def root():
     """Root endpoint to verify API is running"""
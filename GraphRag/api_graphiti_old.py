@@ -1,13 +1,13 @@
 ﻿import logging
 import os
+import time
 from contextlib import asynccontextmanager
-from datetime import datetime
-from enum import Enum
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
 
 import fastapi
 import uvicorn
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, Header, HTTPException, Response
 from opentelemetry import trace
 from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
@@ -17,15 +17,21 @@ from pydantic import BaseModel
 from starlette import status
 
 from graphiti_core import Graphiti
-from graphiti_core.cross_encoder.bge_reranker_client import BGERerankerClient
-from graphiti_core.driver.neo4j_driver import Neo4jDriver
 from graphiti_core.embedder import OpenAIEmbedder, OpenAIEmbedderConfig
 from graphiti_core.errors import NodeNotFoundError
 from graphiti_core.llm_client import LLMConfig
 from graphiti_core.llm_client.openai_generic_client import OpenAIGenericClient
 from graphiti_core.nodes import EpisodeType
+from graphiti_core.utils.bulk_utils import RawEpisode
 from graphiti_core.utils.maintenance.graph_data_operations import clear_data
 from graphiti_search_agent import create_graph_search_agent, GraphSearchState
+from agent_instrumentation import AgentRunRecorder, PROFILE_MODES
+from neo4j_pool import PooledNeo4jDriver
+from batching_reranker import BatchingCrossEncoderClient
+from community_maintenance import CommunityChangeTracker, IncrementalCommunityBuilder
+from embedding_cache import CachedGraphitiEmbedder, EmbeddingCache
+from result_cache import CachedGraphitiSearch
+from task_queue import DurableTaskQueue, QueueFullError, TaskStatus
 
 otlpExporter = OTLPSpanExporter()
 processor = BatchSpanProcessor(otlpExporter)
@@ -43,8 +49,21 @@ async def lifespan(application: FastAPI):
         logger.error(f"{type(e).__name__}: Error initializing Graphiti: {str(e)}")
         raise e
 
+    try:
+        await reranker.warmup()
+    except Exception as e:
+        logger.error(f"{type(e).__name__}: Error warming up reranker: {str(e)}")
+
+    await task_queue.start()
+
     yield
 
+    await task_queue.stop()
+    community_tracker.close()
+    embedding_cache.close()
+    await reranker.close()
+    await driver.close()
+
 app = fastapi.FastAPI(
     title="GraphRAG API",
     description="API for GraphRAG operations using Graphiti",
@@ -64,6 +83,8 @@ neo4j_password = os.environ.get('NEO4J_PASSWORD', 'SuperPassword')
 if not neo4j_uri or not neo4j_user or not neo4j_password:
     raise ValueError('NEO4J_URI, NEO4J_USER, and NEO4J_PASSWORD must be set')
 
+bulk_batch_size = int(os.environ.get('BULK_BATCH_SIZE', 20))
+
 llm_config = LLMConfig(
     api_key=os.environ.get("LLM_API_KEY"),
     model=os.environ.get("LLM_MODEL"),
@@ -80,27 +101,28 @@ ollama_embedder = OpenAIEmbedder(
         embedding_model=os.environ.get("EMBEDDING_MODEL"),
         base_url=os.environ.get("EMBEDDING_ENDPOINT"),
     ))
+embedding_cache = EmbeddingCache(
+    namespace=os.environ.get("EMBEDDING_MODEL") or "default",
+    dimensions=ollama_embedder.config.embedding_dim
+)
 
-driver = Neo4jDriver(neo4j_uri, neo4j_user, neo4j_password, database="neo4j")
+# Pool size, acquisition timeout, fetch size and database come from NEO4J_* environment variables
+driver = PooledNeo4jDriver(neo4j_uri, neo4j_user, neo4j_password)
+# Reranking runs on its own worker pool, batching pairs of concurrent searches (RERANKER_* variables)
+reranker = BatchingCrossEncoderClient()
 graphiti = Graphiti(
     graph_driver=driver,
     tracer=tracer,
     trace_span_prefix='graphrag',
     llm_client=OpenAIGenericClient(config=llm_config),
-    embedder=ollama_embedder,
-    cross_encoder=BGERerankerClient())
-
-agent = create_graph_search_agent(graphiti)
-
-class TaskStatus(str, Enum):
-    PENDING = "pending"
-    PROCESSING = "processing"
-    COMPLETED = "completed"
-    FAILED = "failed"
-
-
-task_store = {}
+    embedder=CachedGraphitiEmbedder(ollama_embedder, embedding_cache),
+    cross_encoder=reranker)
 
+search_cache = CachedGraphitiSearch(graphiti)
+community_tracker = CommunityChangeTracker()
+community_builder = IncrementalCommunityBuilder(graphiti, community_tracker)
+agent = create_graph_search_agent(graphiti, search_client=search_cache)
+agent_runs = AgentRunRecorder()
 
 class AddDataRequest(BaseModel):
     episode_type: str
@@ -111,6 +133,20 @@ class AddDataRequest(BaseModel):
     reference_time: Optional[datetime] = None
 
 
+class BulkEpisode(BaseModel):
+    episode_type: str
+    description: str
+    content: str
+    reference_time: Optional[datetime] = None
+
+
+class AddBulkDataRequest(BaseModel):
+    group_id: str
+    task_id: str
+    episodes: List[BulkEpisode]
+    batch_size: Optional[int] = None
+
+
 class DeleteRequest(BaseModel):
     episode_id: str
 
@@ -134,6 +170,7 @@ class SearchResult(BaseModel):
 class BuildCommunitiesRequest(BaseModel):
     group_id: str
     task_id: str
+    mode: str = "auto"
 
 
 class BuildCommunitiesResponse(BaseModel):
@@ -165,8 +202,12 @@ class TaskStatusResponse(BaseModel):
 
 
 @app.post("/search")
-async def search(request: SearchRequest):
-    """Endpoint to search the graph database"""
+async def search(request: SearchRequest, response: Response, x_agent_profile: Optional[str] = Header(None)):
+    """
+    Endpoint to search the graph database.
+    The `X-Agent-Profile` header ("cprofile" or "sample") profiles this run; per-node
+    metrics and the profile are available under /debug/agent/runs/{X-Agent-Run-Id}.
+    """
     initial_state = GraphSearchState(
         user_query=request.query,
         group_id=request.adventure_id,
@@ -185,7 +226,24 @@ async def search(request: SearchRequest):
         regeneration_count=0
     )
 
-    result = await agent.ainvoke(initial_state)
+    if x_agent_profile and x_agent_profile not in PROFILE_MODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid X-Agent-Profile: {x_agent_profile}. Must be one of: {', '.join(PROFILE_MODES)}"
+        )
+
+    started = time.perf_counter()
+    with agent_runs.profile(x_agent_profile) as profile:
+        result = await agent.ainvoke(initial_state)
+
+    run_id = agent_runs.record(
+        query=request.query,
+        group_id=request.adventure_id,
+        wall_seconds=time.perf_counter() - started,
+        node_metrics=result.get("node_metrics", []),
+        profile=profile
+    )
+    response.headers["X-Agent-Run-Id"] = run_id
     return SearchResult(content=result["final_answer"])
 
 
@@ -216,7 +274,7 @@ async def search_direct(request: SearchRequest):
         limit=10,
     )
 
-    results = await graphiti.search_(
+    results = await search_cache.search_(
         group_ids=[request.adventure_id],
         query=request.query,
         config=search_config
@@ -225,35 +283,44 @@ async def search_direct(request: SearchRequest):
     return results
 
 
+def enqueue_task(task_id: str, group_id: str, kind: str, payload: Dict[str, Any]):
+    """Persist a task in the durable queue, rejecting it with 429 when the queue is full"""
+    try:
+        task_queue.enqueue(task_id, group_id, kind, payload)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": "30"}
+        )
+
+
 @app.post("/build_communities", status_code=status.HTTP_202_ACCEPTED)
-async def build_communities(request: BuildCommunitiesRequest, background_tasks: BackgroundTasks):
+async def build_communities(request: BuildCommunitiesRequest):
     """Endpoint to build communities for a specific group_id as a background task
 
     Request body should contain:
     - group_id: str (group identifier to build communities for)
     - task_id: str (unique identifier for the task)
+    - mode: str (optional, "auto", "incremental" or "full", defaults to "auto")
 
-    Note: Community building is processed in the background.
+    Note: Community building is processed in the background, after every
+    episode queued earlier for the same group_id.
+    "auto" only re-clusters communities touched by entities changed since the last
+    build, unless the drift exceeds COMMUNITY_DRIFT_THRESHOLD; "full" always rebuilds.
     The endpoint returns immediately with a 202 Accepted status.
     Returns a task_id that can be used to check the status at /task/{task_id}
     """
-    # Create task tracking entry
-    task_store[request.task_id] = {
-        "task_id": request.task_id,
-        "episode_id": None,
-        "status": TaskStatus.PENDING,
-        "created_at": datetime.now(),
-        "completed_at": None,
-        "message": None,
-        "error": None
-    }
+    if request.mode not in ("auto", "incremental", "full"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid mode. Must be one of: auto, incremental, full"
+        )
 
-    # Add the community building to background tasks
-    background_tasks.add_task(
-        process_community_building,
-        task_id=request.task_id,
-        group_id=request.group_id
-    )
+    enqueue_task(request.task_id, request.group_id, "communities", {
+        "group_id": request.group_id,
+        "mode": request.mode
+    })
 
     return {
         "message": "Community building queued for processing",
@@ -262,79 +329,149 @@ async def build_communities(request: BuildCommunitiesRequest, background_tasks:
     }
 
 
-async def process_episode_addition(
-    task_id: str,
-    episode_type: EpisodeType,
-    description: str,
-    content: str,
-    group_id: str,
-    reference_time: datetime
-):
-    """Background task to process episode addition sequentially"""
-    # Update status to processing
-    task_store[task_id]["status"] = TaskStatus.PROCESSING
+# Ingestion throughput per path, so bulk and single-episode ingestion can be compared
+ingest_throughput = {
+    "single": {"episodes": 0, "seconds": 0.0},
+    "bulk": {"episodes": 0, "seconds": 0.0}
+}
 
+
+def record_throughput(path: str, episodes: int, seconds: float) -> float:
+    """Accumulate ingestion time for a path; returns the episodes per minute of this run"""
+    ingest_throughput[path]["episodes"] += episodes
+    ingest_throughput[path]["seconds"] += seconds
+    return episodes * 60 / seconds if seconds else 0.0
+
+
+def throughput_stats() -> Dict[str, Any]:
+    return {
+        path: {
+            **totals,
+            "episodes_per_minute": round(totals["episodes"] * 60 / totals["seconds"], 2) if totals["seconds"] else None
+        }
+        for path, totals in ingest_throughput.items()
+    }
+
+
+def parse_episode_type(episode_type: str) -> EpisodeType:
     try:
+        return EpisodeType.from_str(episode_type.lower())
+    except KeyError:
+        valid_types = [e.name for e in EpisodeType]
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid episode_type. Must be one of: {', '.join(valid_types)}"
+        )
+
+
+async def process_episode_addition(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Queued task adding one episode; episodes of a group are processed in order"""
+    group_id = payload["group_id"]
+
+    try:
+        started = time.perf_counter()
         result = await graphiti.add_episode(
-            name=description,
-            episode_body=content,
-            source=episode_type,
-            source_description=description,
-            reference_time=reference_time,
+            name=payload["description"],
+            episode_body=payload["content"],
+            source=EpisodeType(payload["episode_type"]),
+            source_description=payload["description"],
+            reference_time=datetime.fromisoformat(payload["reference_time"]),
             group_id=group_id
         )
         logger.info(f"Successfully added episode {result.episode.uuid} in background")
+        record_throughput("single", 1, time.perf_counter() - started)
+        community_tracker.record(group_id, [node.uuid for node in result.nodes])
 
-        # Update status to completed
-        task_store[task_id]["status"] = TaskStatus.COMPLETED
-        task_store[task_id]["episode_id"] = result.episode.uuid
-        task_store[task_id]["message"] = f"Episode {result.episode.uuid} added successfully"
-        task_store[task_id]["completed_at"] = datetime.now()
+        return {
+            "episode_id": result.episode.uuid,
+            "message": f"Episode {result.episode.uuid} added successfully"
+        }
 
-    except Exception as e:
-        logger.error(f"{type(e).__name__}: Error adding episode in background: {str(e)}")
+    finally:
+        # The episode may be partially written even on failure
+        search_cache.invalidate(group_id)
 
-        # Update status to failed
-        task_store[task_id]["status"] = TaskStatus.FAILED
-        task_store[task_id]["error"] = f"{type(e).__name__}: {str(e)}"
-        task_store[task_id]["completed_at"] = datetime.now()
 
+def utc_reference_time(reference_time: datetime) -> datetime:
+    """Episode times as UTC-aware datetimes, so naive and client-supplied aware ones can be compared"""
+    if reference_time.tzinfo is None:
+        return reference_time.replace(tzinfo=timezone.utc)
+    return reference_time.astimezone(timezone.utc)
 
-async def process_community_building(
-    task_id: str,
-    group_id: str
-):
-    """Background task to process community building"""
-    # Update status to processing
-    task_store[task_id]["status"] = TaskStatus.PROCESSING
+
+async def process_bulk_addition(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Queued task adding many episodes through Graphiti's bulk path.
+    Each batch extracts entities and edges concurrently and deduplicates the
+    extracted nodes and edges within the batch before writing them once.
+    Batches are processed in reference_time order, so each batch is resolved against
+    the ones before it. This does not give the temporal edge invalidation of /add:
+    episodes within a batch are resolved together, so a fact contradicted later in the
+    same batch stays valid, and older graphiti-core releases don't invalidate edges in
+    the bulk path at all. Episodes that must invalidate earlier facts go through /add.
+    """
+    group_id = payload["group_id"]
+    batch_size = payload["batch_size"]
+    episodes = sorted(
+        (
+            RawEpisode(
+                name=episode["description"],
+                content=episode["content"],
+                source=EpisodeType(episode["episode_type"]),
+                source_description=episode["description"],
+                reference_time=utc_reference_time(datetime.fromisoformat(episode["reference_time"]))
+            )
+            for episode in payload["episodes"]
+        ),
+        key=lambda episode: episode.reference_time
+    )
+
+    try:
+        started = time.perf_counter()
+        added = 0
+        for offset in range(0, len(episodes), batch_size):
+            batch = episodes[offset:offset + batch_size]
+            result = await graphiti.add_episode_bulk(batch, group_id=group_id)
+            community_tracker.record(group_id, [node.uuid for node in result.nodes])
+            added += len(batch)
+            logger.info(f"Bulk ingestion for group_id {group_id}: {added}/{len(episodes)} episodes added")
+
+        episodes_per_minute = record_throughput("bulk", added, time.perf_counter() - started)
+        return {"message": f"Added {added} episodes in bulk ({episodes_per_minute:.1f} episodes/min)"}
+
+    finally:
+        search_cache.invalidate(group_id)
+
+
+async def process_community_building(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Queued task rebuilding the communities of a group, incrementally when possible"""
+    group_id = payload["group_id"]
 
     try:
         logger.info(f"Building communities for group_id: {group_id}")
-        community_nodes, community_edges = await graphiti.build_communities(
-            group_ids=[group_id]
-        )
+        result = await community_builder.build(group_id, payload.get("mode", "auto"))
 
-        communities_count = len(community_nodes)
-        edges_count = len(community_edges)
+        logger.info(f"Successfully built communities for group_id {group_id}: {result}")
 
-        logger.info(f"Successfully built {communities_count} communities with {edges_count} edges for group_id: {group_id}")
+        return {
+            "message": f"Built {result['communities_count']} communities with {result['edges_count']} edges "
+                       f"({result['mode']} build)"
+        }
 
-        # Update status to completed
-        task_store[task_id]["status"] = TaskStatus.COMPLETED
-        task_store[task_id]["message"] = f"Built {communities_count} communities with {edges_count} edges"
-        task_store[task_id]["completed_at"] = datetime.now()
+    finally:
+        # Existing communities are removed before rebuilding, even if the rebuild fails
+        search_cache.invalidate(group_id)
 
-    except Exception as e:
-        logger.error(f"{type(e).__name__}: Error building communities in background: {str(e)}")
 
-        # Update status to failed
-        task_store[task_id]["status"] = TaskStatus.FAILED
-        task_store[task_id]["error"] = f"{type(e).__name__}: {str(e)}"
-        task_store[task_id]["completed_at"] = datetime.now()
+task_queue = DurableTaskQueue(handlers={
+    "episode": process_episode_addition,
+    "bulk": process_bulk_addition,
+    "communities": process_community_building
+})
 
 
 @app.post("/add", status_code=status.HTTP_202_ACCEPTED)
-async def add_data(data: AddDataRequest, background_tasks: BackgroundTasks):
+async def add_data(data: AddDataRequest):
     """Endpoint to add data to the graph database as a background task
 
     Request body should contain:
@@ -345,43 +482,71 @@ async def add_data(data: AddDataRequest, background_tasks: BackgroundTasks):
     - task_id: str (unique identifier for the episode)
     - reference_time: datetime (optional, timestamp for the episode)
 
-    Note: Episodes are processed sequentially in the background.
-    The endpoint returns immediately with a 202 Accepted status.
+    Note: Episodes are persisted in a durable queue and processed in the background,
+    in submission order per group_id. Different groups are processed in parallel.
+    The endpoint returns immediately with a 202 Accepted status, or 429 when the queue is full.
     Returns a task_id that can be used to check the status at /task/{task_id}
     """
-    try:
-        episode_type = EpisodeType.from_str(data.episode_type.lower())
-    except KeyError:
-        valid_types = [e.name for e in EpisodeType]
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid episode_type. Must be one of: {', '.join(valid_types)}"
-        )
+    episode_type = parse_episode_type(data.episode_type)
+
+    enqueue_task(data.task_id, data.group_id, "episode", {
+        "episode_type": episode_type.value,
+        "description": data.description,
+        "content": data.content,
+        "group_id": data.group_id,
+        "reference_time": (data.reference_time or datetime.now()).isoformat()
+    })
 
-    # Create task tracking entry
-    task_store[data.task_id] = {
+    return {
+        "message": "Episode queued for processing",
         "task_id": data.task_id,
-        "episode_id": None,
-        "status": TaskStatus.PENDING,
-        "created_at": datetime.now(),
-        "completed_at": None,
-        "message": None,
-        "error": None
+        "status": "accepted"
     }
 
-    # Add the episode processing to background tasks
-    background_tasks.add_task(
-        process_episode_addition,
-        task_id=data.task_id,
-        episode_type=episode_type,
-        description=data.description,
-        content=data.content,
-        group_id=data.group_id,
-        reference_time=data.reference_time or datetime.now()
-    )
+
+@app.post("/add/bulk", status_code=status.HTTP_202_ACCEPTED)
+async def add_data_bulk(data: AddBulkDataRequest):
+    """Endpoint to add many episodes of one group as a single background task
+
+    Request body should contain:
+    - group_id: str (group identifier for all episodes)
+    - task_id: str (unique identifier for the whole bulk task)
+    - episodes: list of {episode_type, description, content, reference_time}
+    - batch_size: int (optional, episodes per bulk batch, defaults to BULK_BATCH_SIZE)
+
+    Note: Meant for replaying history. Episodes are processed in batches through
+    Graphiti's bulk path, which is much faster than one /add per episode.
+    The bulk path does not reliably invalidate contradicted edges: episodes of one
+    batch don't invalidate each other's facts, and older graphiti-core releases skip
+    edge invalidation entirely. Send episodes that update or contradict earlier facts
+    through /add, one at a time.
+    Returns a task_id that can be used to check the status at /task/{task_id}
+    """
+    if not data.episodes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one episode is required"
+        )
+
+    reference_time = datetime.now(timezone.utc)
+    episodes = [
+        {
+            "episode_type": parse_episode_type(episode.episode_type).value,
+            "description": episode.description,
+            "content": episode.content,
+            "reference_time": utc_reference_time(episode.reference_time or reference_time).isoformat()
+        }
+        for episode in data.episodes
+    ]
+
+    enqueue_task(data.task_id, data.group_id, "bulk", {
+        "group_id": data.group_id,
+        "batch_size": max(1, data.batch_size or bulk_batch_size),
+        "episodes": episodes
+    })
 
     return {
-        "message": "Episode queued for processing",
+        "message": f"{len(episodes)} episodes queued for bulk processing",
         "task_id": data.task_id,
         "status": "accepted"
     }
@@ -399,13 +564,20 @@ async def get_task_status(task_id: str):
     - created_at: When the task was created
     - completed_at: When the task completed (if applicable)
     """
-    if task_id not in task_store:
+    task = task_queue.get(task_id)
+    if task is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Task {task_id} not found"
         )
 
-    return TaskStatusResponse(**task_store[task_id])
+    return TaskStatusResponse(**task)
+
+
+@app.get("/queue/stats")
+async def queue_stats():
+    """Task counts per status, the groups being processed and ingestion throughput"""
+    return {**task_queue.stats(), "throughput": throughput_stats()}
 
 
 @app.get("/episode/{episode_id}", response_model=EpisodeResponse)
@@ -442,7 +614,14 @@ async def get_episode(episode_id: str):
 async def delete_data(episode_id: str):
     """Endpoint to delete data from the graph database"""
     try:
-        await graphiti.remove_episode(episode_id)
+        from graphiti_core.nodes import EpisodicNode
+        episode = await EpisodicNode.get_by_uuid(graphiti.driver, episode_id)
+        mentioned = await community_builder.affected_by_episode(episode_id)
+        try:
+            await graphiti.remove_episode(episode_id)
+            community_tracker.record(episode.group_id, mentioned)
+        finally:
+            search_cache.invalidate(episode.group_id)
     except NodeNotFoundError as e:
         raise HTTPException(
             status_code=status.HTTP_204_NO_CONTENT,
@@ -459,8 +638,45 @@ async def delete_data(episode_id: str):
 @app.delete("/clear")
 async def clear():
     await clear_data(graphiti.driver)
+    search_cache.clear()
+    community_tracker.forget()
     await graphiti.build_indices_and_constraints()
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss statistics of the shared search and embedding caches"""
+    return {"search": search_cache.stats(), "embedding": embedding_cache.stats()}
+
+
+@app.get("/reranker/stats")
+async def reranker_stats():
+    """Batching, latency and queue wait of the cross-encoder reranker"""
+    return reranker.stats()
+
+
+@app.get("/neo4j/pool")
+async def neo4j_pool_stats():
+    """Connection pool configuration and saturation of the Neo4j driver"""
+    return driver.pool_stats()
+
+
+@app.get("/debug/agent/runs")
+async def agent_run_stats():
+    """Per-node latency, LLM calls, tokens and graph queries over the recent search agent runs"""
+    return {**agent_runs.stats(), "recent": [
+        {key: value for key, value in run.items() if key != "profile"} for run in list(agent_runs.runs)[-20:]
+    ]}
+
+
+@app.get("/debug/agent/runs/{run_id}")
+async def agent_run(run_id: str):
+    """Metrics of a single search agent run, including its profile if one was requested"""
+    run = agent_runs.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Agent run '{run_id}' not found")
+    return run
+
+
 @app.get("/", response_model=MessageResponse)
 async def root():
     """Root endpoint to verify API is running"""
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from shared_state import ProcessLock
+
+logger = logging.getLogger(__name__)
+
+MaintenanceRun = Callable[[Optional[List[str]]], Awaitable[Dict[str, Any]]]
+
+
+class BackgroundMaintainer:
+    """
+    Background loop shared by the store maintainers.
+
+    `request(dataset)` queues a check (e.g. after cognify); queued datasets and,
+    every `interval_seconds`, all datasets are checked in the background. With
+    several workers only the one holding `lock_name` runs a check at a time.
+    """
+
+    # Name of the ProcessLock serializing runs across workers, and of the stores in log messages
+    lock_name = "maintenance"
+    store_label = "Store"
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._pending: Set[str] = set()
+        self._wake = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+        self.failures = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def request(self, dataset: str) -> None:
+        self._pending.add(dataset)
+        self._wake.set()
+
+    def start(self, run: MaintenanceRun) -> None:
+        """`run(datasets)` maintains the given datasets (all of them for None) and reports per dataset"""
+        if self.interval_seconds > 0:
+            self._worker = asyncio.create_task(self._run(run))
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    async def _run(self, run: MaintenanceRun) -> None:
+        next_full_run = time.monotonic() + self.interval_seconds
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=max(0.0, next_full_run - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            full_run = time.monotonic() >= next_full_run
+            datasets = None if full_run else sorted(self._pending)
+            self._pending.clear()
+            if full_run:
+                next_full_run = time.monotonic() + self.interval_seconds
+
+            lock = ProcessLock(self.lock_name)
+            if not lock.try_acquire():
+                continue
+            started = time.perf_counter()
+            try:
+                report = await run(datasets)
+                self.last_run = {"datasets": len(report), "seconds": round(time.perf_counter() - started, 3)}
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"{type(e).__name__}: {self.store_label} maintenance failed: {str(e)}")
+            finally:
+                lock.release()
+
+    def background_stats(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "pending": sorted(self._pending),
+            "failures": self.failures,
+            "last_run": self.last_run
+        }
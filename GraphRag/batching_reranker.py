@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from graphiti_core.cross_encoder.client import CrossEncoderClient
+
+from inference_backend import DEFAULT_RERANKER_BACKEND, load_cross_encoder
+from latency_stats import percentile_ms
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RERANKER_MODEL = os.environ.get("RERANKER_MODEL", "BAAI/bge-reranker-v2-m3")
+DEFAULT_BATCH_WINDOW_MS = float(os.environ.get("RERANKER_BATCH_WINDOW_MS", 5))
+DEFAULT_MAX_BATCH_PAIRS = int(os.environ.get("RERANKER_MAX_BATCH_PAIRS", 256))
+DEFAULT_PREDICT_BATCH_SIZE = int(os.environ.get("RERANKER_PREDICT_BATCH_SIZE", 32))
+DEFAULT_WORKERS = int(os.environ.get("RERANKER_WORKERS", 1))
+# Intra-op threads of the model (torch or ONNX Runtime); 0 keeps the runtime default (one per core)
+DEFAULT_NUM_THREADS = int(os.environ.get("RERANKER_NUM_THREADS", 0))
+LATENCY_SAMPLES = 1000
+
+
+@dataclass
+class _RankRequest:
+    pairs: List[List[str]]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class BatchingCrossEncoderClient(CrossEncoderClient):
+    """
+    Cross-encoder reranker running on a dedicated worker pool.
+    The inference backend (torch, onnx or onnx-int8) is selected with RERANKER_BACKEND.
+
+    Concurrent `rank` calls are collected for up to `batch_window_ms` (or until
+    `max_batch_pairs` pairs are waiting) and scored with a single `predict` call,
+    so the event loop never runs model inference and the model sees larger batches.
+    """
+
+    def __init__(
+            self,
+            model: Any = None,
+            model_name: str = DEFAULT_RERANKER_MODEL,
+            backend: str = DEFAULT_RERANKER_BACKEND,
+            batch_window_ms: float = DEFAULT_BATCH_WINDOW_MS,
+            max_batch_pairs: int = DEFAULT_MAX_BATCH_PAIRS,
+            predict_batch_size: int = DEFAULT_PREDICT_BATCH_SIZE,
+            workers: int = DEFAULT_WORKERS,
+            num_threads: int = DEFAULT_NUM_THREADS
+    ):
+        if num_threads > 0:
+            import torch
+            torch.set_num_threads(num_threads)
+        if model is None:
+            model = load_cross_encoder(model_name, backend, num_threads)
+        self.model = model
+        self.model_name = model_name
+        self.backend = backend
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_pairs = max_batch_pairs
+        self.predict_batch_size = predict_batch_size
+        self.workers = max(1, workers)
+        self.num_threads = num_threads
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="reranker")
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._scoring: Set[asyncio.Task] = set()
+        self.requests = 0
+        self.pairs = 0
+        self.batches = 0
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self._queue_waits: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def _predict(self, pairs: List[List[str]]) -> List[float]:
+        return [float(score) for score in self.model.predict(
+            pairs, batch_size=self.predict_batch_size, show_progress_bar=False
+        )]
+
+    async def warmup(self) -> None:
+        """Run one inference so weights and kernels are loaded before the first search"""
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._predict, [["warmup", "warmup passage"]])
+        logger.info(f"Reranker {self.model_name} warmed up in {time.perf_counter() - started:.2f}s")
+
+    async def rank(self, query: str, passages: list[str]) -> list[tuple[str, float]]:
+        if not passages:
+            return []
+
+        self._ensure_collector()
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_RankRequest([[query, passage] for passage in passages], future))
+        scores = await future
+        self.requests += 1
+        self._latencies.append(time.perf_counter() - started)
+
+        return sorted(
+            [(passage, score) for passage, score in zip(passages, scores)],
+            key=lambda x: x[1],
+            reverse=True
+        )
+
+    def _ensure_collector(self) -> None:
+        if self._collector is None or self._collector.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.workers)
+            self._collector = asyncio.create_task(self._collect())
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # Wait for a free worker first, so requests keep accumulating while all workers are busy
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            size = len(batch[0].pairs)
+            deadline = loop.time() + self.batch_window
+            while size < self.max_batch_pairs:
+                if not self._queue.empty():
+                    request = self._queue.get_nowait()
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        request = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        break
+                batch.append(request)
+                size += len(request.pairs)
+            task = asyncio.create_task(self._score(batch))
+            self._scoring.add(task)
+            task.add_done_callback(self._scoring.discard)
+
+    async def _score(self, batch: List[_RankRequest]) -> None:
+        try:
+            now = time.perf_counter()
+            self._queue_waits.extend(now - request.enqueued_at for request in batch)
+            pairs = [pair for request in batch for pair in request.pairs]
+            loop = asyncio.get_running_loop()
+            scores = await loop.run_in_executor(self._executor, self._predict, pairs)
+            self.batches += 1
+            self.pairs += len(pairs)
+
+            offset = 0
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_result(scores[offset:offset + len(request.pairs)])
+                offset += len(request.pairs)
+        except Exception as e:
+            logger.error(f"{type(e).__name__}: Reranking batch of {len(batch)} requests failed: {str(e)}")
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    async def close(self) -> None:
+        if self._collector is not None:
+            self._collector.cancel()
+            await asyncio.gather(self._collector, return_exceptions=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = list(self._latencies)
+        waits = list(self._queue_waits)
+        return {
+            "model": self.model_name,
+            "backend": self.backend,
+            "workers": self.workers,
+            "num_threads": self.num_threads or None,
+            "batch_window_ms": self.batch_window * 1000,
+            "requests": self.requests,
+            "pairs": self.pairs,
+            "batches": self.batches,
+            "avg_pairs_per_batch": round(self.pairs / self.batches, 2) if self.batches else None,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "latency_ms": {"p50": percentile_ms(latencies, 50), "p95": percentile_ms(latencies, 95)},
+            "queue_wait_ms": {"p50": percentile_ms(waits, 50), "p95": percentile_ms(waits, 95)}
+        }
@@ -0,0 +1,59 @@
+"""
+Search agent microbenchmark against a running Graphiti service (api_graphiti_old.py).
+
+Sends the queries sequentially to /search, then reports the end-to-end latency and
+the per-node breakdown (wall time, LLM calls, tokens, graph queries) collected by
+the agent instrumentation. With --profile, the last run is profiled and its report
+is included in the output.
+
+    python benchmarks/agent_benchmark.py --url http://localhost:8112 --adventure-id <group> --repeats 3
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from rerank_benchmark import QUERIES, percentile_ms  # noqa: E402
+
+
+def main(args) -> None:
+    latencies = []
+    last_run_id = None
+    with httpx.Client(base_url=args.url, timeout=args.timeout) as client:
+        total = len(QUERIES) * args.repeats
+        for i in range(total):
+            headers = {"X-Agent-Profile": args.profile} if args.profile and i == total - 1 else {}
+            started = time.perf_counter()
+            response = client.post(
+                "/search", json={"adventure_id": args.adventure_id, "query": QUERIES[i % len(QUERIES)]},
+                headers=headers
+            )
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+            last_run_id = response.headers.get("X-Agent-Run-Id")
+
+        results = {
+            "requests": total,
+            "p50_ms": percentile_ms(latencies, 50),
+            "p95_ms": percentile_ms(latencies, 95)
+        }
+        results["agent"] = {key: value for key, value in client.get("/debug/agent/runs").json().items() if key != "recent"}
+        if args.profile and last_run_id:
+            results["profile"] = client.get(f"/debug/agent/runs/{last_run_id}").json()["profile"]
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8112")
+    parser.add_argument("--adventure-id", required=True)
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--profile", choices=["cprofile", "sample"])
+    parser.add_argument("--timeout", type=float, default=300)
+    main(parser.parse_args())
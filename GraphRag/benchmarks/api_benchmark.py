@@ -0,0 +1,399 @@
+"""
+End-to-end load benchmark of the cognee API (api.py), runnable offline.
+
+Starts fake_openai_server.py as the LLM and embedding endpoint, then api.py on
+fresh temporary data/system directories, seeds synthetic adventures and drives
+/add, /cognify, (optionally /memify,) /search and /update at the target concurrency. For every phase
+it reports throughput, p50/p95/p99 latency, errors and the API process memory,
+and writes the results as JSON tagged with the current commit.
+
+    python benchmarks/api_benchmark.py --adventures 4 --documents 20 --concurrency 8 --llm-latency-ms 150
+    python benchmarks/api_benchmark.py --baseline benchmarks/results/<earlier>.json
+    python benchmarks/api_benchmark.py --compare <current>.json <baseline>.json
+
+The embedding tokenizer is tiktoken, which downloads its encoding on first use;
+offline runs need a warm cache, e.g. TIKTOKEN_CACHE_DIR pointing at a populated directory.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DIR = os.path.dirname(BENCHMARK_DIR)
+DEFAULT_RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+PHASES = ("add", "cognify", "memify", "search", "update")
+
+sys.path.insert(0, SERVICE_DIR)
+
+from latency_stats import percentile_ms  # noqa: E402
+
+CHARACTERS = ["Aldric", "Brenna", "Corvin", "Dara", "Elowen", "Fenwick", "Garrick", "Hesper", "Isolde", "Jorund"]
+PLACES = ["the Sunken Keep", "Ravenford", "the Ashen Woods", "Mistral Harbor", "the Glass Spire", "Oldmere"]
+ITEMS = ["a silver key", "the ember crown", "a cracked map", "an iron oath ring", "the moonlit blade"]
+ACTIONS = ["travels to", "hides in", "defends", "betrays an ally at", "searches", "bargains for passage to"]
+QUESTIONS = [
+    "Where is {character} now?",
+    "What does {character} know about {item}?",
+    "Who was last seen in {place}?",
+    "What happened between {character} and {other}?",
+]
+
+
+def synthetic_document(rng: random.Random, words: int) -> str:
+    sentences = []
+    while sum(len(s.split()) for s in sentences) < words:
+        character, other = rng.sample(CHARACTERS, 2)
+        sentences.append(
+            f"{character} {rng.choice(ACTIONS)} {rng.choice(PLACES)} with {other}, carrying {rng.choice(ITEMS)}."
+        )
+    return " ".join(sentences)
+
+
+def synthetic_question(rng: random.Random) -> str:
+    character, other = rng.sample(CHARACTERS, 2)
+    return rng.choice(QUESTIONS).format(
+        character=character, other=other, item=rng.choice(ITEMS), place=rng.choice(PLACES)
+    )
+
+
+def _children(pid: int) -> List[int]:
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as children_file:
+                children.extend(int(child) for child in children_file.read().split())
+    except OSError:
+        pass
+    return children
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """
+    Resident set size of a process and its children (the uvicorn workers),
+    from /proc or psutil when available
+    """
+    if os.path.exists(f"/proc/{pid}/status"):
+        total, pending = 0, [pid]
+        while pending:
+            current = pending.pop()
+            try:
+                with open(f"/proc/{current}/status") as status_file:
+                    total += next((int(line.split()[1]) for line in status_file if line.startswith("VmRSS:")), 0)
+            except OSError:
+                continue
+            pending.extend(_children(current))
+        return total / 1024
+    try:
+        import psutil
+        process = psutil.Process(pid)
+        return sum(p.memory_info().rss for p in [process] + process.children(recursive=True)) / (1024 * 1024)
+    except Exception:
+        return None
+
+
+class MemorySampler:
+    """Samples the RSS of a process in a background thread while a phase runs"""
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[float] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.samples = []
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            value = rss_mb(self.pid)
+            if value is not None:
+                self.samples.append(value)
+            self._stop.wait(self.interval)
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        if not self.samples:
+            return {"rss_mb_start": None, "rss_mb_peak": None, "rss_mb_end": None}
+        return {
+            "rss_mb_start": round(self.samples[0], 1),
+            "rss_mb_peak": round(max(self.samples), 1),
+            "rss_mb_end": round(self.samples[-1], 1)
+        }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process for {url} exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{url} did not come up within {timeout}s")
+
+
+def service_env(args, fake_url: str, workdir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "LLM_PROVIDER": "openai",
+        "LLM_MODEL": "openai/gpt-4o-mini",
+        "LLM_ENDPOINT": f"{fake_url}/v1",
+        "LLM_API_KEY": "benchmark",
+        "LLM_INSTRUCTOR_MODE": "json_schema_mode",
+        "EMBEDDING_PROVIDER": "openai",
+        "EMBEDDING_MODEL": "openai/text-embedding-3-large",
+        "EMBEDDING_ENDPOINT": f"{fake_url}/v1",
+        "EMBEDDING_API_KEY": "benchmark",
+        "EMBEDDING_DIMENSIONS": str(args.dimensions),
+        "DATA_ROOT_DIRECTORY": os.path.join(workdir, "data"),
+        "SYSTEM_ROOT_DIRECTORY": os.path.join(workdir, "system"),
+        "TELEMETRY_DISABLED": "1",
+        "WEB_CONCURRENCY": str(args.workers),
+        "LITELLM_LOG": "ERROR",
+    })
+    return env
+
+
+async def run_phase(name: str, requests: List[Dict[str, Any]], concurrency: int,
+                    client: httpx.AsyncClient, pid: int) -> Dict[str, Any]:
+    """Send every request with at most `concurrency` in flight; returns the phase summary and response bodies"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    responses: List[Any] = [None] * len(requests)
+
+    async def send(index: int, request: Dict[str, Any]) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.request(request["method"], request["path"], json=request["json"])
+                latencies.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+                else:
+                    responses[index] = response.json()
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+    with MemorySampler(pid) as sampler:
+        started = time.perf_counter()
+        await asyncio.gather(*(send(i, request) for i, request in enumerate(requests)))
+        elapsed = time.perf_counter() - started
+
+    summary = {
+        "requests": len(requests),
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "p50_ms": percentile_ms(latencies, 50),
+        "p95_ms": percentile_ms(latencies, 95),
+        "p99_ms": percentile_ms(latencies, 99),
+        **sampler.summary()
+    }
+    print(f"{name}: {json.dumps(summary)}", file=sys.stderr)
+    return {"summary": summary, "responses": responses}
+
+
+async def drive(args, api_url: str, pid: int) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    adventures = [f"bench-adventure-{i}" for i in range(args.adventures)]
+    results: Dict[str, Any] = {}
+
+    async with httpx.AsyncClient(base_url=api_url, timeout=args.request_timeout) as client:
+        add_requests = [
+            {"method": "POST", "path": "/add",
+             "json": {"content": [synthetic_document(rng, args.document_words)], "adventure_ids": [adventure]}}
+            for adventure in adventures for _ in range(args.documents)
+        ]
+        added = await run_phase("add", add_requests, args.concurrency, client, pid)
+        results["add"] = added["summary"]
+
+        cognify_requests = [
+            {"method": "POST", "path": "/cognify", "json": {"adventure_ids": [adventure]}}
+            for adventure in adventures
+        ]
+        results["cognify"] = (await run_phase(
+            "cognify", cognify_requests, min(args.concurrency, len(adventures)), client, pid
+        ))["summary"]
+
+        if args.memify:
+            memify_requests = [
+                {"method": "POST", "path": "/memify", "json": {"adventure_ids": [adventure]}}
+                for adventure in adventures
+            ]
+            results["memify"] = (await run_phase(
+                "memify", memify_requests, min(args.concurrency, len(adventures)), client, pid
+            ))["summary"]
+
+        search_requests = [
+            {"method": "POST", "path": "/search",
+             "json": {"adventure_ids": [rng.choice(adventures)], "query": synthetic_question(rng),
+                      "search_type": args.search_type}}
+            for _ in range(args.searches)
+        ]
+        results["search"] = (await run_phase("search", search_requests, args.concurrency, client, pid))["summary"]
+
+        # /add returns {adventure_id: {file_name: data_id}}
+        data_ids = [
+            (adventure, data_id)
+            for response in added["responses"] if response
+            for adventure, files in response.items()
+            for data_id in files.values()
+        ]
+        update_requests = [
+            {"method": "PUT", "path": "/update",
+             "json": {"adventure_id": adventure, "data_id": data_id,
+                      "content": synthetic_document(rng, args.document_words)}}
+            for adventure, data_id in rng.sample(data_ids, min(args.updates, len(data_ids)))
+        ]
+        results["update"] = (await run_phase("update", update_requests, args.concurrency, client, pid))["summary"]
+
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """Relative change per phase and metric; positive latency or negative throughput is a regression"""
+    changes = {}
+    for phase in PHASES:
+        now, before = current["phases"].get(phase), baseline["phases"].get(phase)
+        if not now or not before:
+            continue
+        changes[phase] = {
+            metric: round((now[metric] - before[metric]) / before[metric], 4)
+            for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "rss_mb_peak")
+            if now.get(metric) is not None and before.get(metric)
+        }
+    return {"baseline_commit": baseline.get("commit"), "changes": changes}
+
+
+def main(args) -> None:
+    if args.compare:
+        with open(args.compare[0]) as current_file, open(args.compare[1]) as baseline_file:
+            print(json.dumps(compare(json.load(current_file), json.load(baseline_file)), indent=2))
+        return
+
+    workdir = tempfile.mkdtemp(prefix="fablecraft-bench-")
+    fake_port, api_port = free_port(), free_port()
+    fake_url, api_url = f"http://127.0.0.1:{fake_port}", f"http://127.0.0.1:{api_port}"
+    processes = []
+    try:
+        fake = subprocess.Popen([
+            sys.executable, os.path.join(BENCHMARK_DIR, "fake_openai_server.py"),
+            "--port", str(fake_port), "--latency-ms", str(args.llm_latency_ms),
+            "--jitter-ms", str(args.llm_jitter_ms), "--dimensions", str(args.dimensions), "--seed", str(args.seed),
+            "--max-concurrency", str(args.llm_max_concurrency), "--requests-per-second", str(args.llm_requests_per_second)
+        ])
+        processes.append(fake)
+        wait_until_up(f"{fake_url}/v1/models", fake, args.startup_timeout)
+
+        with open(os.path.join(workdir, "api.log"), "w") as api_log:
+            api = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(api_port),
+                 "--workers", str(args.workers)],
+                cwd=SERVICE_DIR, env=service_env(args, fake_url, workdir), stdout=api_log, stderr=subprocess.STDOUT
+            )
+            processes.append(api)
+            wait_until_up(f"{api_url}/health", api, args.startup_timeout)
+
+            started_rss = rss_mb(api.pid)
+            phases = asyncio.run(drive(args, api_url, api.pid))
+
+        results = {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "compare")},
+            "idle_rss_mb": round(started_rss, 1) if started_rss is not None else None,
+            "fake_llm_requests": httpx.get(f"{fake_url}/stats").json(),
+            "phases": phases
+        }
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if args.keep_data:
+            print(f"Benchmark data and api.log kept in {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{results['commit'] or 'nocommit'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            results["comparison"] = compare(results, json.load(baseline_file))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--adventures", type=int, default=2)
+    parser.add_argument("--documents", type=int, default=10, help="Documents added per adventure")
+    parser.add_argument("--document-words", type=int, default=200)
+    parser.add_argument("--searches", type=int, default=50)
+    parser.add_argument("--updates", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=1, help="API worker processes (WEB_CONCURRENCY)")
+    parser.add_argument("--search-type", default="GRAPH_COMPLETION")
+    parser.add_argument("--llm-latency-ms", type=float, default=100)
+    parser.add_argument("--llm-jitter-ms", type=float, default=0)
+    parser.add_argument("--llm-max-concurrency", type=int, default=0, help="Provider concurrency limit; 0 for none")
+    parser.add_argument("--llm-requests-per-second", type=float, default=0, help="Provider rate limit; 0 for none")
+    parser.add_argument("--memify", action="store_true", help="Also run /memify on every adventure after cognify")
+    parser.add_argument("--dimensions", type=int, default=3072)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--request-timeout", type=float, default=600)
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--keep-data", action="store_true", help="Keep the temporary data directories and api.log")
+    parser.add_argument("--output", help="Results file; defaults to benchmarks/results/<time>-<commit>.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare this run against")
+    parser.add_argument("--compare", nargs=2, metavar=("CURRENT", "BASELINE"),
+                        help="Only compare two existing results files")
+    main(parser.parse_args())
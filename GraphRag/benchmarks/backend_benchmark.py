@@ -0,0 +1,88 @@
+"""
+Reranker inference backends compared against the fp32 PyTorch model.
+
+For every backend, reports per-query latency (p50/p95) and ranking agreement
+with the fp32 reference on the fixed query/fact set of rerank_benchmark.py:
+NDCG@k using the reference scores as graded relevance, and top-1 agreement.
+
+    python benchmarks/backend_benchmark.py --backends onnx onnx-int8 --threads 4
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from batching_reranker import DEFAULT_RERANKER_MODEL  # noqa: E402
+from inference_backend import load_cross_encoder  # noqa: E402
+from latency_stats import percentile_ms  # noqa: E402
+from rerank_benchmark import FACTS, QUERIES  # noqa: E402
+
+
+def score_all(model, repeats: int) -> tuple:
+    """Scores per query plus the latency of every predict call"""
+    scores, latencies = [], []
+    for _ in range(repeats):
+        scores = []
+        for query in QUERIES:
+            started = time.perf_counter()
+            scores.append([float(s) for s in model.predict([[query, fact] for fact in FACTS], show_progress_bar=False)])
+            latencies.append(time.perf_counter() - started)
+    return scores, latencies
+
+
+def ndcg(reference: list, candidate: list, k: int) -> float:
+    """NDCG@k of the candidate ordering, with gains taken from the reference scores"""
+    floor = min(reference)
+    gains = [score - floor for score in reference]
+    order = sorted(range(len(candidate)), key=lambda i: candidate[i], reverse=True)[:k]
+    ideal = sorted(gains, reverse=True)[:k]
+    dcg = sum(gains[i] / math.log2(rank + 2) for rank, i in enumerate(order))
+    idcg = sum(gain / math.log2(rank + 2) for rank, gain in enumerate(ideal))
+    return dcg / idcg if idcg else 1.0
+
+
+def main(args) -> None:
+    reference_model = load_cross_encoder(args.model, "torch", args.threads)
+    score_all(reference_model, 1)  # Warm up
+    reference, latencies = score_all(reference_model, args.repeats)
+    results = {
+        "model": args.model,
+        "queries": len(QUERIES),
+        "facts_per_query": len(FACTS),
+        "k": args.k,
+        "backends": {
+            "torch": {"p50_ms": percentile_ms(latencies, 50), "p95_ms": percentile_ms(latencies, 95)}
+        }
+    }
+
+    for backend in args.backends:
+        model = load_cross_encoder(args.model, backend, args.threads)
+        score_all(model, 1)
+        scores, latencies = score_all(model, args.repeats)
+        ndcgs = [ndcg(ref, cand, args.k) for ref, cand in zip(reference, scores)]
+        top1 = [max(range(len(ref)), key=ref.__getitem__) == max(range(len(cand)), key=cand.__getitem__)
+                for ref, cand in zip(reference, scores)]
+        results["backends"][backend] = {
+            "p50_ms": percentile_ms(latencies, 50),
+            "p95_ms": percentile_ms(latencies, 95),
+            f"ndcg@{args.k}": round(sum(ndcgs) / len(ndcgs), 4),
+            "min_ndcg": round(min(ndcgs), 4),
+            "top1_agreement": round(sum(top1) / len(top1), 4)
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_RERANKER_MODEL)
+    parser.add_argument("--backends", nargs="+", default=["onnx", "onnx-int8"])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--k", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,178 @@
+"""
+Search latency of the cognee API (api.py) while a large cognify runs, runnable offline.
+
+Starts fake_openai_server.py and api.py like api_benchmark.py, cognifies a small
+"probe" adventure, then measures /search on it twice: with the service idle, and
+while /cognify processes a large "bulk" adventure. Run it with and without the
+chunking pool to see how much ingestion slows interactive searches:
+
+    python benchmarks/cognify_contention_benchmark.py --chunk-workers 0
+    python benchmarks/cognify_contention_benchmark.py --chunk-workers 4 --bulk-documents 40 --bulk-document-words 5000
+
+Every search asks a distinct question, so the search result cache doesn't hide the contention.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api_benchmark import (  # noqa: E402
+    BENCHMARK_DIR,
+    SERVICE_DIR,
+    free_port,
+    percentile_ms,
+    service_env,
+    synthetic_document,
+    synthetic_question,
+    wait_until_up
+)
+
+PROBE_ADVENTURE = "contention-probe"
+BULK_ADVENTURE = "contention-bulk"
+
+
+async def search_until(client: httpx.AsyncClient, args, rng: random.Random, done: asyncio.Event,
+                       minimum: int) -> Dict[str, Any]:
+    """Search the probe adventure at the target concurrency until `done` is set and `minimum` searches ran"""
+    latencies: List[float] = []
+    errors = 0
+    counter = 0
+
+    async def searcher() -> None:
+        nonlocal errors, counter
+        while not done.is_set() or len(latencies) + errors < minimum:
+            counter += 1
+            query = f"{synthetic_question(rng)} (#{counter})"
+            started = time.perf_counter()
+            try:
+                response = await client.post("/search", json={
+                    "adventure_ids": [PROBE_ADVENTURE], "query": query, "search_type": args.search_type
+                })
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+            except httpx.HTTPError:
+                errors += 1
+            await asyncio.sleep(args.search_interval)
+
+    await asyncio.gather(*(searcher() for _ in range(args.concurrency)))
+    return {
+        "searches": len(latencies),
+        "errors": errors,
+        "p50_ms": percentile_ms(latencies, 50),
+        "p95_ms": percentile_ms(latencies, 95),
+        "p99_ms": percentile_ms(latencies, 99),
+        "max_ms": round(max(latencies) * 1000, 2) if latencies else 0.0
+    }
+
+
+async def drive(args, api_url: str) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    async with httpx.AsyncClient(base_url=api_url, timeout=args.request_timeout) as client:
+        probe_documents = [synthetic_document(rng, 200) for _ in range(args.probe_documents)]
+        (await client.post("/add", json={"content": probe_documents, "adventure_ids": [PROBE_ADVENTURE]})).raise_for_status()
+        (await client.post("/cognify", json={"adventure_ids": [PROBE_ADVENTURE]})).raise_for_status()
+
+        bulk_documents = [synthetic_document(rng, args.bulk_document_words) for _ in range(args.bulk_documents)]
+        (await client.post("/add", json={"content": bulk_documents, "adventure_ids": [BULK_ADVENTURE]})).raise_for_status()
+
+        idle_done = asyncio.Event()
+        idle_done.set()
+        idle = await search_until(client, args, rng, idle_done, args.searches)
+        print(f"idle: {json.dumps(idle)}", file=sys.stderr)
+
+        cognify_done = asyncio.Event()
+
+        async def cognify_bulk() -> float:
+            started = time.perf_counter()
+            try:
+                (await client.post("/cognify", json={"adventure_ids": [BULK_ADVENTURE]})).raise_for_status()
+            finally:
+                cognify_done.set()
+            return time.perf_counter() - started
+
+        cognify_seconds, during = await asyncio.gather(
+            cognify_bulk(), search_until(client, args, rng, cognify_done, args.searches)
+        )
+        print(f"during cognify: {json.dumps(during)}", file=sys.stderr)
+
+        writes = (await client.get("/writes/stats")).json()
+
+    return {
+        "idle": idle,
+        "during_cognify": during,
+        "cognify_seconds": round(cognify_seconds, 3),
+        "p95_slowdown": round(during["p95_ms"] / idle["p95_ms"], 3) if idle["p95_ms"] else None,
+        "chunking": writes.get("chunking")
+    }
+
+
+def main(args) -> None:
+    workdir = tempfile.mkdtemp(prefix="fablecraft-contention-")
+    fake_port, api_port = free_port(), free_port()
+    fake_url, api_url = f"http://127.0.0.1:{fake_port}", f"http://127.0.0.1:{api_port}"
+    processes = []
+    try:
+        fake = subprocess.Popen([
+            sys.executable, os.path.join(BENCHMARK_DIR, "fake_openai_server.py"),
+            "--port", str(fake_port), "--latency-ms", str(args.llm_latency_ms),
+            "--dimensions", str(args.dimensions), "--seed", str(args.seed)
+        ])
+        processes.append(fake)
+        wait_until_up(f"{fake_url}/v1/models", fake, args.startup_timeout)
+
+        env = service_env(args, fake_url, workdir)
+        env["COGNIFY_CHUNK_WORKERS"] = str(args.chunk_workers)
+        with open(os.path.join(workdir, "api.log"), "w") as api_log:
+            api = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(api_port),
+                 "--workers", str(args.workers)],
+                cwd=SERVICE_DIR, env=env, stdout=api_log, stderr=subprocess.STDOUT
+            )
+            processes.append(api)
+            wait_until_up(f"{api_url}/health", api, args.startup_timeout)
+            results = asyncio.run(drive(args, api_url))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if args.keep_data:
+            print(f"Benchmark data and api.log kept in {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results["config"] = vars(args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-workers", type=int, default=0, help="COGNIFY_CHUNK_WORKERS of the service")
+    parser.add_argument("--probe-documents", type=int, default=5)
+    parser.add_argument("--bulk-documents", type=int, default=20)
+    parser.add_argument("--bulk-document-words", type=int, default=3000)
+    parser.add_argument("--searches", type=int, default=30, help="Minimum searches per measurement")
+    parser.add_argument("--search-interval", type=float, default=0.1, help="Pause between a searcher's requests")
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=1, help="API worker processes (WEB_CONCURRENCY)")
+    parser.add_argument("--search-type", default="CHUNKS")
+    parser.add_argument("--llm-latency-ms", type=float, default=50)
+    parser.add_argument("--dimensions", type=int, default=3072)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--request-timeout", type=float, default=1800)
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--keep-data", action="store_true", help="Keep the temporary data directories and api.log")
+    main(parser.parse_args())
@@ -0,0 +1,371 @@
+"""
+Deterministic OpenAI-compatible stand-in for the LLM and embedding endpoints.
+
+Point LLM_ENDPOINT and EMBEDDING_ENDPOINT of either service at http://<host>:<port>/v1
+to benchmark ingestion (cognify, memify, episodes) and agent search without network
+access or a real model:
+
+- Embeddings are unit vectors derived from a hash of the input text, so the same
+  text always embeds identically. Their size is `--dimensions`, or the request's
+  `dimensions` parameter when given.
+- Structured-output requests (json_schema response format, json_object mode with the
+  schema in the prompt, or tool calls) get an instance of the requested schema.
+  Arrays of objects receive `--array-items` entries whose names and ids are taken
+  from capitalised words of the prompt, so extraction produces a small, connected graph.
+- Plain completions use the first matching template of `--templates` (a JSON list of
+  {"match": <regex>, "response": <template>} with {query} and {entities} placeholders),
+  or a short canned answer.
+- Every response waits `--latency-ms` (plus jitter and `--tokens-per-second` generation
+  time); `--max-concurrency` and `--requests-per-second` cap throughput like a
+  rate-limited provider. GET /stats reports request counts and time spent queued.
+
+    python benchmarks/fake_openai_server.py --port 8199 --latency-ms 200 --dimensions 3072
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+# cognee's json_mode embeds the schema after "json_schema", graphiti's json_object mode after "following format:"
+SCHEMA_MARKER = re.compile(r"json_schema:?\s*|in the following format:\s*", re.IGNORECASE)
+ENTITY_PATTERN = re.compile(r"\b[A-Z][a-z]{2,}(?:\s+[A-Z][a-z]{2,})*\b")
+DEFAULT_RESPONSE = "Benchmark answer to: {query}"
+
+
+class FakeOpenAI:
+    def __init__(
+            self,
+            latency_ms: float = 0,
+            jitter_ms: float = 0,
+            dimensions: int = 3072,
+            seed: int = 0,
+            array_items: int = 3,
+            templates: Optional[List[Dict[str, str]]] = None,
+            max_concurrency: int = 0,
+            requests_per_second: float = 0,
+            tokens_per_second: float = 0
+    ):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.dimensions = dimensions
+        self.random = random.Random(seed)
+        self.array_items = array_items
+        self.templates = [(re.compile(t["match"], re.IGNORECASE | re.DOTALL), t["response"]) for t in templates or []]
+        self.tokens_per_second = tokens_per_second
+        self._slots = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self._interval = 1 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot_at = 0.0
+        self.requests: Dict[str, int] = {"chat": 0, "embeddings": 0}
+        self.completion_tokens = 0
+        self.queued_seconds = 0.0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def admit(self) -> None:
+        """Wait for a rate limit slot"""
+        if not self._interval:
+            return
+        now = time.monotonic()
+        wait = max(0.0, self._next_slot_at - now)
+        self._next_slot_at = max(now, self._next_slot_at) + self._interval
+        if wait:
+            self.queued_seconds += wait
+            await asyncio.sleep(wait)
+
+    async def serve(self, kind: str, respond, output_tokens=lambda result: 0):
+        """Run `respond` under the concurrency and rate limits, taking the simulated latency"""
+        self.requests[kind] += 1
+        queued = time.perf_counter()
+        if self._slots is not None:
+            await self._slots.acquire()
+        self.queued_seconds += time.perf_counter() - queued
+        try:
+            await self.admit()
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                result = respond()
+                tokens = output_tokens(result)
+                self.completion_tokens += tokens
+                delay = self.latency + (self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+                if self.tokens_per_second:
+                    delay += tokens / self.tokens_per_second
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                return result
+            finally:
+                self.in_flight -= 1
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+    def embed(self, text: str, dimensions: Optional[int] = None) -> List[float]:
+        """Deterministic unit vector derived from the text"""
+        rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+        vector = [rng.gauss(0.0, 1.0) for _ in range(dimensions or self.dimensions)]
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def complete(self, messages: List[Dict[str, Any]]) -> str:
+        query = _last_user_text(messages)
+        prompt = "\n".join(m["content"] for m in messages if isinstance(m.get("content"), str))
+        template = next((response for pattern, response in self.templates if pattern.search(prompt)), DEFAULT_RESPONSE)
+        return template.format(query=query[:200], entities=", ".join(_entities(query)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.requests,
+            "completion_tokens": self.completion_tokens,
+            "queued_seconds": round(self.queued_seconds, 3),
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight
+        }
+
+
+def _entities(text: str) -> List[str]:
+    found = list(dict.fromkeys(ENTITY_PATTERN.findall(text)))
+    return found or ["Entity One", "Entity Two", "Entity Three"]
+
+
+class SchemaFiller:
+    """
+    Builds an instance of a JSON schema. Arrays of objects get `array_items` entries,
+    with name/id-like string fields cycling through the entities of the prompt and
+    source/target fields pointing at consecutive entities so generated edges connect.
+    """
+
+    def __init__(self, root: Dict[str, Any], entities: List[str], array_items: int):
+        self.root = root
+        self.entities = entities
+        self.array_items = array_items
+
+    def _resolve(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        while "$ref" in schema:
+            target = self.root
+            for part in schema["$ref"].lstrip("#/").split("/"):
+                target = target[part]
+            schema = target
+        return schema
+
+    def _string(self, name: str, index: int) -> str:
+        name = name.lower()
+        # Only the first `array_items` entities become nodes, so edges stay within them
+        pool = self.entities[:self.array_items] if self.array_items else self.entities
+        entity = pool[(index + (1 if "target" in name else 0)) % len(pool)]
+        if "relation" in name:
+            return "RELATES_TO"
+        if "type" in name or "label" in name:
+            return "Entity"
+        if name.endswith("id") or "name" in name or "source" in name or "target" in name:
+            return entity
+        return f"{entity} is part of the benchmark story."
+
+    def _integer(self, schema: Dict[str, Any], name: str, index: int) -> int:
+        name = name.lower()
+        if "source" in name or "target" in name or name.endswith("id"):
+            value = (index + (1 if "target" in name else 0)) % max(1, self.array_items)
+        else:
+            value = 0
+        return max(value, schema.get("minimum", value))
+
+    def fill(self, schema: Dict[str, Any], name: str = "", index: int = 0, depth: int = 0) -> Any:
+        schema = self._resolve(schema)
+        for combinator in ("anyOf", "oneOf", "allOf"):
+            if combinator in schema:
+                options = [self._resolve(option) for option in schema[combinator]]
+                non_null = [option for option in options if option.get("type") != "null"]
+                return self.fill((non_null or options)[0], name, index, depth)
+        if "const" in schema:
+            return schema["const"]
+        if "enum" in schema:
+            return schema["enum"][0]
+
+        kind = schema.get("type", "object")
+        if isinstance(kind, list):
+            kind = next((k for k in kind if k != "null"), "null")
+        if kind == "object":
+            properties = schema.get("properties", {})
+            return {
+                prop_name: self.fill(prop, prop_name, index, depth + 1)
+                for prop_name, prop in properties.items()
+                if prop_name in schema.get("required", properties.keys())
+            }
+        if kind == "array":
+            items = self._resolve(schema.get("items", {}))
+            count = self.array_items if items.get("type", "object") == "object" and depth < 4 else 0
+            count = max(count, schema.get("minItems", 0))
+            return [self.fill(items, name, i, depth + 1) for i in range(count)]
+        if kind == "string":
+            return self._string(name, index)
+        if kind == "integer":
+            return self._integer(schema, name, index)
+        if kind == "number":
+            return float(schema.get("minimum", 0))
+        if kind == "boolean":
+            return False
+        return None
+
+
+def instance_of(schema: Dict[str, Any], root: Dict[str, Any], entities: Optional[List[str]] = None,
+                array_items: int = 0) -> Any:
+    """Instance of the schema; with the default `array_items` of 0 the smallest valid one"""
+    return SchemaFiller(root, entities or _entities(""), array_items).fill(schema)
+
+
+def _schema_from_messages(messages: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """json_object modes put the schema into the prompt text after a marker; the last one wins"""
+    for message in reversed(messages):
+        content = message.get("content")
+        if not isinstance(content, str):
+            continue
+        for match in reversed(list(SCHEMA_MARKER.finditer(content))):
+            start = content.find("{", match.end())
+            if start == -1:
+                continue
+            try:
+                schema, _ = json.JSONDecoder().raw_decode(content[start:])
+                return schema
+            except ValueError:
+                continue
+    return None
+
+
+def _last_user_text(messages: List[Dict[str, Any]]) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user" and isinstance(message.get("content"), str):
+            return message["content"]
+    return ""
+
+
+def _tokens(text: Optional[str]) -> int:
+    return len(text.split()) if text else 0
+
+
+def create_app(fake: FakeOpenAI) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "fake-llm", "object": "model"}, {"id": "fake-embedding", "object": "model"}]}
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+
+        def respond():
+            return [fake.embed(str(text), body.get("dimensions")) for text in inputs]
+
+        vectors = await fake.serve("embeddings", respond)
+        return {
+            "object": "list",
+            "model": body.get("model", "fake-embedding"),
+            "data": [{"object": "embedding", "index": i, "embedding": vector} for i, vector in enumerate(vectors)],
+            "usage": {"prompt_tokens": sum(_tokens(str(t)) for t in inputs), "total_tokens": sum(_tokens(str(t)) for t in inputs)}
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        response_format = body.get("response_format") or {}
+        tools = body.get("tools") or []
+        entities = _entities(_last_user_text(messages))
+
+        def respond() -> Dict[str, Any]:
+            message: Dict[str, Any] = {"role": "assistant", "content": None}
+            if tools:
+                function = tools[0]["function"]
+                parameters = function.get("parameters", {})
+                arguments = instance_of(parameters, parameters, entities, fake.array_items)
+                message["tool_calls"] = [{
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {"name": function["name"], "arguments": json.dumps(arguments)}
+                }]
+            elif response_format.get("type") == "json_schema":
+                schema = response_format["json_schema"].get("schema", {})
+                message["content"] = json.dumps(instance_of(schema, schema, entities, fake.array_items))
+            elif response_format.get("type") == "json_object":
+                schema = _schema_from_messages(messages)
+                message["content"] = json.dumps(instance_of(schema, schema, entities, fake.array_items) if schema else {})
+            else:
+                message["content"] = fake.complete(messages)
+            return message
+
+        def output_tokens(message: Dict[str, Any]) -> int:
+            if message.get("tool_calls"):
+                return _tokens(message["tool_calls"][0]["function"]["arguments"])
+            return _tokens(message["content"])
+
+        message = await fake.serve("chat", respond, output_tokens)
+        prompt_tokens = sum(_tokens(m.get("content")) for m in messages if isinstance(m.get("content"), str))
+        completion_tokens = output_tokens(message)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake-llm"),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if tools else "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return fake.stats()
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8199)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--dimensions", type=int, default=3072)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--array-items", type=int, default=3,
+                        help="Entries generated for arrays of objects in structured output; 0 for empty arrays")
+    parser.add_argument("--templates", help="JSON file with a list of {\"match\": <regex>, \"response\": <template>}")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="Requests served at once; 0 for no limit")
+    parser.add_argument("--requests-per-second", type=float, default=0, help="0 for no limit")
+    parser.add_argument("--tokens-per-second", type=float, default=0,
+                        help="Simulated generation speed added to the latency; 0 to disable")
+    args = parser.parse_args()
+
+    templates = None
+    if args.templates:
+        with open(args.templates) as templates_file:
+            templates = json.load(templates_file)
+
+    fake_openai = FakeOpenAI(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        dimensions=args.dimensions,
+        seed=args.seed,
+        array_items=args.array_items,
+        templates=templates,
+        max_concurrency=args.max_concurrency,
+        requests_per_second=args.requests_per_second,
+        tokens_per_second=args.tokens_per_second
+    )
+    uvicorn.run(create_app(fake_openai), host=args.host, port=args.port, log_level="warning")
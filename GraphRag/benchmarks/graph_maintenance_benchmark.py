@@ -0,0 +1,156 @@
+"""
+Graph search latency of the cognee API (api.py) before and after Kuzu maintenance, runnable offline.
+
+Starts fake_openai_server.py and api.py like api_benchmark.py with background graph
+maintenance disabled, grows one adventure's graph over several add + cognify rounds
+(each leaves its writes in the Kuzu WAL), then measures /search, checkpoints the graph
+through POST /admin/graph/{adventure_id}/maintain and measures /search again:
+
+    python benchmarks/graph_maintenance_benchmark.py
+    python benchmarks/graph_maintenance_benchmark.py --rounds 10 --documents-per-round 10 --search-type GRAPH_COMPLETION
+
+Every search asks a distinct question, so the search result cache doesn't hide the difference.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api_benchmark import (  # noqa: E402
+    BENCHMARK_DIR,
+    SERVICE_DIR,
+    free_port,
+    percentile_ms,
+    service_env,
+    synthetic_document,
+    synthetic_question,
+    wait_until_up
+)
+
+ADVENTURE = "graph-maintenance"
+
+
+async def measure(client: httpx.AsyncClient, args, rng: random.Random) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    for index in range(args.searches):
+        query = f"{synthetic_question(rng)} (#{index})"
+        started = time.perf_counter()
+        try:
+            response = await client.post("/search", json={
+                "adventure_ids": [ADVENTURE], "query": query, "search_type": args.search_type
+            })
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+        except httpx.HTTPError:
+            errors += 1
+    return {
+        "searches": len(latencies),
+        "errors": errors,
+        "p50_ms": percentile_ms(latencies, 50),
+        "p95_ms": percentile_ms(latencies, 95),
+        "max_ms": round(max(latencies) * 1000, 2) if latencies else 0.0
+    }
+
+
+async def drive(args, api_url: str) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    async with httpx.AsyncClient(base_url=api_url, timeout=args.request_timeout) as client:
+        for round_index in range(args.rounds):
+            documents = [synthetic_document(rng, args.document_words) for _ in range(args.documents_per_round)]
+            (await client.post("/add", json={"content": documents, "adventure_ids": [ADVENTURE]})).raise_for_status()
+            (await client.post("/cognify", json={"adventure_ids": [ADVENTURE]})).raise_for_status()
+            print(f"round {round_index + 1}/{args.rounds} cognified", file=sys.stderr)
+
+        graph_before = (await client.get(f"/admin/graph/{ADVENTURE}")).json()
+        before = await measure(client, args, rng)
+        print(f"before: {json.dumps(before)}", file=sys.stderr)
+
+        started = time.perf_counter()
+        maintenance = await client.post(f"/admin/graph/{ADVENTURE}/maintain", params={"checkpoint": "true"})
+        maintenance.raise_for_status()
+        maintenance_seconds = time.perf_counter() - started
+
+        graph_after = (await client.get(f"/admin/graph/{ADVENTURE}")).json()
+        after = await measure(client, args, rng)
+        print(f"after: {json.dumps(after)}", file=sys.stderr)
+
+    return {
+        "graph_before": graph_before,
+        "graph_after": graph_after,
+        "before": before,
+        "after": after,
+        "maintenance": maintenance.json(),
+        "maintenance_seconds": round(maintenance_seconds, 3),
+        "p50_speedup": round(before["p50_ms"] / after["p50_ms"], 3) if after["p50_ms"] else None
+    }
+
+
+def main(args) -> None:
+    workdir = tempfile.mkdtemp(prefix="fablecraft-graph-maintenance-")
+    fake_port, api_port = free_port(), free_port()
+    fake_url, api_url = f"http://127.0.0.1:{fake_port}", f"http://127.0.0.1:{api_port}"
+    processes = []
+    try:
+        fake = subprocess.Popen([
+            sys.executable, os.path.join(BENCHMARK_DIR, "fake_openai_server.py"),
+            "--port", str(fake_port), "--latency-ms", str(args.llm_latency_ms),
+            "--dimensions", str(args.dimensions), "--seed", str(args.seed)
+        ])
+        processes.append(fake)
+        wait_until_up(f"{fake_url}/v1/models", fake, args.startup_timeout)
+
+        env = service_env(args, fake_url, workdir)
+        # Only the benchmark's explicit maintenance call may checkpoint the graph
+        env["KUZU_MAINTENANCE_INTERVAL_SECONDS"] = "0"
+        with open(os.path.join(workdir, "api.log"), "w") as api_log:
+            api = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(api_port),
+                 "--workers", str(args.workers)],
+                cwd=SERVICE_DIR, env=env, stdout=api_log, stderr=subprocess.STDOUT
+            )
+            processes.append(api)
+            wait_until_up(f"{api_url}/health", api, args.startup_timeout)
+            results = asyncio.run(drive(args, api_url))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if args.keep_data:
+            print(f"Benchmark data and api.log kept in {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results["config"] = vars(args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5, help="add + cognify rounds before measuring")
+    parser.add_argument("--documents-per-round", type=int, default=5)
+    parser.add_argument("--document-words", type=int, default=400)
+    parser.add_argument("--searches", type=int, default=30, help="Searches per measurement")
+    parser.add_argument("--workers", type=int, default=1, help="API worker processes (WEB_CONCURRENCY)")
+    parser.add_argument("--search-type", default="GRAPH_COMPLETION")
+    parser.add_argument("--llm-latency-ms", type=float, default=5)
+    parser.add_argument("--dimensions", type=int, default=3072)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--request-timeout", type=float, default=1800)
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--keep-data", action="store_true", help="Keep the temporary data directories and api.log")
+    main(parser.parse_args())
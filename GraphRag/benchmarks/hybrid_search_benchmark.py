@@ -0,0 +1,163 @@
+"""
+Latency of the HYBRID search fast path of the cognee API (api.py) against completion searches, runnable offline.
+
+Starts fake_openai_server.py and api.py like api_benchmark.py, cognifies one adventure,
+then runs the same number of distinct queries with each search type and reports their
+latency. HYBRID (BM25 + vector, fused, no LLM) is compared with the LLM-backed types:
+
+    python benchmarks/hybrid_search_benchmark.py
+    python benchmarks/hybrid_search_benchmark.py --tokens-per-second 30 --search-types HYBRID,GRAPH_COMPLETION
+
+--llm-latency-ms applies to every fake provider call (embeddings included), while
+--tokens-per-second only slows completions, standing in for a real model's generation time.
+Every search asks a distinct question, so the search result cache doesn't hide the difference.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api_benchmark import (  # noqa: E402
+    BENCHMARK_DIR,
+    SERVICE_DIR,
+    free_port,
+    percentile_ms,
+    service_env,
+    synthetic_document,
+    synthetic_question,
+    wait_until_up
+)
+
+ADVENTURE = "hybrid-search"
+BASELINE = "GRAPH_COMPLETION"
+
+
+async def measure(client: httpx.AsyncClient, args, rng: random.Random, search_type: str) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: List[float] = []
+    results: List[int] = []
+    errors = 0
+
+    async def one(index: int) -> None:
+        nonlocal errors
+        query = f"{synthetic_question(rng)} (#{index})"
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.post("/search", json={
+                    "adventure_ids": [ADVENTURE], "query": query, "search_type": search_type
+                })
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+                results.append(len(response.json()["results"]))
+            except httpx.HTTPError:
+                errors += 1
+
+    # One search first so per-adventure indexes are built outside the measurement
+    await one(-1)
+    latencies.clear()
+    results.clear()
+    await asyncio.gather(*(one(index) for index in range(args.searches)))
+    return {
+        "searches": len(latencies),
+        "errors": errors,
+        "mean_results": round(sum(results) / len(results), 2) if results else 0.0,
+        "p50_ms": percentile_ms(latencies, 50),
+        "p95_ms": percentile_ms(latencies, 95),
+        "max_ms": round(max(latencies) * 1000, 2) if latencies else 0.0
+    }
+
+
+async def drive(args, api_url: str) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    async with httpx.AsyncClient(base_url=api_url, timeout=args.request_timeout) as client:
+        documents = [synthetic_document(rng, args.document_words) for _ in range(args.documents)]
+        (await client.post("/add", json={"content": documents, "adventure_ids": [ADVENTURE]})).raise_for_status()
+        (await client.post("/cognify", json={"adventure_ids": [ADVENTURE]})).raise_for_status()
+
+        search_types = {}
+        for search_type in args.search_types.split(","):
+            search_types[search_type] = await measure(client, args, rng, search_type)
+            print(f"{search_type}: {json.dumps(search_types[search_type])}", file=sys.stderr)
+        stats = (await client.get("/cache/stats")).json()
+
+    baseline = search_types.get(BASELINE, {}).get("p50_ms")
+    return {
+        "search_types": search_types,
+        f"p50_speedup_vs_{BASELINE.lower()}": {
+            search_type: round(baseline / result["p50_ms"], 3)
+            for search_type, result in search_types.items() if baseline and result["p50_ms"]
+        },
+        "hybrid": stats.get("hybrid")
+    }
+
+
+def main(args) -> None:
+    workdir = tempfile.mkdtemp(prefix="fablecraft-hybrid-")
+    fake_port, api_port = free_port(), free_port()
+    fake_url, api_url = f"http://127.0.0.1:{fake_port}", f"http://127.0.0.1:{api_port}"
+    processes = []
+    try:
+        fake = subprocess.Popen([
+            sys.executable, os.path.join(BENCHMARK_DIR, "fake_openai_server.py"),
+            "--port", str(fake_port), "--latency-ms", str(args.llm_latency_ms),
+            "--tokens-per-second", str(args.tokens_per_second),
+            "--dimensions", str(args.dimensions), "--seed", str(args.seed)
+        ])
+        processes.append(fake)
+        wait_until_up(f"{fake_url}/v1/models", fake, args.startup_timeout)
+
+        env = service_env(args, fake_url, workdir)
+        with open(os.path.join(workdir, "api.log"), "w") as api_log:
+            api = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(api_port),
+                 "--workers", str(args.workers)],
+                cwd=SERVICE_DIR, env=env, stdout=api_log, stderr=subprocess.STDOUT
+            )
+            processes.append(api)
+            wait_until_up(f"{api_url}/health", api, args.startup_timeout)
+            results = asyncio.run(drive(args, api_url))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if args.keep_data:
+            print(f"Benchmark data and api.log kept in {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results["config"] = vars(args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--search-types", default="HYBRID,CHUNKS_LEXICAL,CHUNKS,GRAPH_COMPLETION",
+                        help="Comma separated search types to compare")
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--document-words", type=int, default=400)
+    parser.add_argument("--searches", type=int, default=50, help="Searches per search type")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=1, help="API worker processes (WEB_CONCURRENCY)")
+    parser.add_argument("--llm-latency-ms", type=float, default=50)
+    parser.add_argument("--tokens-per-second", type=float, default=100, help="Generation speed of the fake LLM")
+    parser.add_argument("--dimensions", type=int, default=3072)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--request-timeout", type=float, default=1800)
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--keep-data", action="store_true", help="Keep the temporary data directories and api.log")
+    main(parser.parse_args())
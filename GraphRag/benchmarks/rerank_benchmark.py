@@ -0,0 +1,119 @@
+"""
+Rerank latency and throughput under concurrent searches.
+
+Compares the per-request executor path of graphiti's BGERerankerClient with
+BatchingCrossEncoderClient on a fixed query/fact set and prints JSON.
+
+    python benchmarks/rerank_benchmark.py --concurrency 1 8 32 --requests 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batching_reranker import BatchingCrossEncoderClient, DEFAULT_RERANKER_MODEL  # noqa: E402
+from latency_stats import percentile_ms  # noqa: E402
+
+QUERIES = [
+    "Who guards the northern gate of the city?",
+    "What happened to the merchant's missing caravan?",
+    "Where is the ancient library hidden?",
+    "Which faction controls the harbour?",
+    "What does the innkeeper know about the stranger?",
+    "Why did the knight abandon his oath?",
+    "How can the cursed amulet be destroyed?",
+    "Who is the leader of the thieves' guild?"
+]
+
+FACTS = [
+    "Captain Aldric commands the guards stationed at the northern gate.",
+    "The merchant's caravan was ambushed by bandits near the Blackwood.",
+    "The ancient library lies beneath the ruined monastery on the hill.",
+    "The Sea Wolves faction took control of the harbour after the storm.",
+    "The innkeeper saw the stranger pay with coins from a forgotten kingdom.",
+    "Sir Roderic abandoned his oath after the king executed his brother.",
+    "The cursed amulet can only be destroyed in the dragon's forge.",
+    "Mira Nightshade secretly leads the thieves' guild from the tannery.",
+    "The city council meets every full moon in the marble hall.",
+    "A blacksmith named Torvin forges weapons for the city watch.",
+    "The Blackwood is said to be haunted by the spirits of fallen soldiers.",
+    "The monastery was abandoned a century ago after a plague.",
+    "Smugglers use the old sewer tunnels to move goods past the harbour.",
+    "The stranger asked about the location of the dragon's forge.",
+    "The king's advisor has been seen meeting with Sea Wolves captains.",
+    "Torvin owes a large debt to the thieves' guild."
+]
+
+
+async def run_baseline(model, requests: int, concurrency: int) -> dict:
+    """One predict call per request on the default executor, as BGERerankerClient does"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            pairs = [[QUERIES[i % len(QUERIES)], fact] for fact in FACTS]
+            await asyncio.get_running_loop().run_in_executor(None, model.predict, pairs)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(requests)])
+    return _summary(latencies, requests, time.perf_counter() - started)
+
+
+async def run_batching(client: BatchingCrossEncoderClient, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await client.rank(QUERIES[i % len(QUERIES)], FACTS)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(requests)])
+    return _summary(latencies, requests, time.perf_counter() - started)
+
+
+def _summary(latencies: list, requests: int, elapsed: float) -> dict:
+    return {
+        "p50_ms": percentile_ms(latencies, 50),
+        "p95_ms": percentile_ms(latencies, 95),
+        "requests_per_second": round(requests / elapsed, 2),
+        "pairs_per_second": round(requests * len(FACTS) / elapsed, 2)
+    }
+
+
+async def main(args) -> None:
+    client = BatchingCrossEncoderClient(
+        model_name=args.model,
+        batch_window_ms=args.window_ms,
+        num_threads=args.threads
+    )
+    await client.warmup()
+
+    results = {"model": args.model, "facts_per_request": len(FACTS), "runs": []}
+    for concurrency in args.concurrency:
+        baseline = await run_baseline(client.model, args.requests, concurrency)
+        batching = await run_batching(client, args.requests, concurrency)
+        results["runs"].append({"concurrency": concurrency, "baseline": baseline, "batching": batching})
+    results["batching_stats"] = client.stats()
+    await client.close()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_RERANKER_MODEL)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--window-ms", type=float, default=5)
+    parser.add_argument("--threads", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+from uuid import NAMESPACE_OID, uuid5
+
+from cognee.modules.chunking.TextChunker import TextChunker
+from cognee.modules.chunking.models.DocumentChunk import DocumentChunk
+from cognee.tasks.chunks import chunk_by_paragraph
+
+logger = logging.getLogger(__name__)
+
+# Processes that split and tokenize documents during cognify; 0 keeps chunking on the event loop
+DEFAULT_CHUNK_WORKERS = int(os.environ.get("COGNIFY_CHUNK_WORKERS", 0))
+# Shorter texts are chunked inline, where they cost less than the round trip to a worker
+DEFAULT_OFFLOAD_MIN_CHARS = int(os.environ.get("COGNIFY_CHUNK_OFFLOAD_MIN_CHARS", 2000))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_stats = {"offloaded": 0, "inline": 0, "offloaded_seconds": 0.0, "failures": 0}
+
+
+def _load_tokenizer() -> None:
+    # Workers load the embedding engine's tokenizer once, before their first document
+    from cognee.infrastructure.databases.vector.embeddings import get_embedding_engine
+
+    get_embedding_engine()
+
+
+def _split_paragraphs(text: str, max_chunk_size: int) -> List[Dict[str, Any]]:
+    return list(chunk_by_paragraph(text, max_chunk_size, batch_paragraphs=True))
+
+
+def start_chunking_pool(workers: int = DEFAULT_CHUNK_WORKERS) -> bool:
+    """
+    Start the worker processes; returns False when chunking stays inline.
+    Workers are spawned rather than forked, so they don't inherit the server's threads and
+    event loop; each uvicorn worker owns its pool.
+    """
+    global _pool
+    if workers <= 0 or _pool is not None:
+        return _pool is not None
+    _pool = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=_load_tokenizer
+    )
+    logger.info("Cognify chunking runs in %s worker processes", workers)
+    return True
+
+
+def shutdown_chunking_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def chunking_stats() -> Dict[str, Any]:
+    return {
+        "workers": _pool._max_workers if _pool is not None else 0,
+        **_stats,
+        "offloaded_seconds": round(_stats["offloaded_seconds"], 3)
+    }
+
+
+async def _paragraph_chunks(text: str, max_chunk_size: int) -> List[Dict[str, Any]]:
+    global _pool
+    if _pool is not None and len(text) >= DEFAULT_OFFLOAD_MIN_CHARS:
+        started = time.perf_counter()
+        try:
+            chunks = await asyncio.get_running_loop().run_in_executor(_pool, _split_paragraphs, text, max_chunk_size)
+        except BrokenProcessPool as e:
+            # A worker died (e.g. out of memory); keep ingesting inline rather than failing cognify
+            logger.error(f"{type(e).__name__}: Chunking pool failed, chunking inline from now on: {str(e)}")
+            _stats["failures"] += 1
+            shutdown_chunking_pool()
+        else:
+            _stats["offloaded"] += 1
+            _stats["offloaded_seconds"] += time.perf_counter() - started
+            return chunks
+    _stats["inline"] += 1
+    return _split_paragraphs(text, max_chunk_size)
+
+
+class ProcessPoolTextChunker(TextChunker):
+    """
+    TextChunker whose sentence splitting and tokenization run in the chunking pool.
+    Chunks are merged exactly as TextChunker merges them, so ids and boundaries don't change.
+    """
+
+    def _chunk(self, chunk_id, text: str, chunk_size: int, cut_type: str) -> DocumentChunk:
+        return DocumentChunk(
+            id=chunk_id,
+            text=text,
+            chunk_size=chunk_size,
+            is_part_of=self.document,
+            chunk_index=self.chunk_index,
+            cut_type=cut_type,
+            contains=[],
+            metadata={"index_fields": ["text"]},
+        )
+
+    def _merged_chunk(self, paragraph_chunks: List[Dict[str, Any]]) -> DocumentChunk:
+        return self._chunk(
+            uuid5(NAMESPACE_OID, f"{str(self.document.id)}-{self.chunk_index}"),
+            " ".join(chunk["text"] for chunk in paragraph_chunks),
+            self.chunk_size,
+            paragraph_chunks[-1]["cut_type"]
+        )
+
+    async def read(self):
+        paragraph_chunks = []
+        async for content_text in self.get_text():
+            for chunk_data in await _paragraph_chunks(content_text, self.max_chunk_size):
+                if self.chunk_size + chunk_data["chunk_size"] <= self.max_chunk_size:
+                    paragraph_chunks.append(chunk_data)
+                    self.chunk_size += chunk_data["chunk_size"]
+                    continue
+
+                if not paragraph_chunks:
+                    yield self._chunk(
+                        chunk_data["chunk_id"], chunk_data["text"], chunk_data["chunk_size"], chunk_data["cut_type"]
+                    )
+                    self.chunk_size = 0
+                else:
+                    yield self._merged_chunk(paragraph_chunks)
+                    paragraph_chunks = [chunk_data]
+                    self.chunk_size = chunk_data["chunk_size"]
+                self.chunk_index += 1
+
+        if paragraph_chunks:
+            yield self._merged_chunk(paragraph_chunks)
@@ -0,0 +1,275 @@
+import logging
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from graphiti_core.helpers import semaphore_gather
+from graphiti_core.nodes import EntityNode
+from graphiti_core.utils.maintenance.community_operations import (
+    Neighbor,
+    build_community,
+    label_propagation,
+)
+
+from task_queue import DEFAULT_QUEUE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Share of the group's entities that may change before an automatic full rebuild
+DEFAULT_DRIFT_THRESHOLD = float(os.environ.get("COMMUNITY_DRIFT_THRESHOLD", 0.3))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS community_changes (
+    group_id TEXT NOT NULL,
+    entity_uuid TEXT NOT NULL,
+    changed_at TEXT NOT NULL,
+    PRIMARY KEY (group_id, entity_uuid)
+);
+CREATE TABLE IF NOT EXISTS community_drift (
+    group_id TEXT NOT NULL,
+    entity_uuid TEXT NOT NULL,
+    PRIMARY KEY (group_id, entity_uuid)
+);
+CREATE TABLE IF NOT EXISTS community_builds (
+    group_id TEXT PRIMARY KEY,
+    entity_count INTEGER NOT NULL,
+    full_built_at TEXT NOT NULL,
+    incremental_built_at TEXT
+);
+"""
+
+# Communities containing one of the changed entities or one of their direct neighbours
+_AFFECTED_COMMUNITIES = """
+MATCH (n:Entity {group_id: $group_id}) WHERE n.uuid IN $uuids
+OPTIONAL MATCH (n)-[:RELATES_TO]-(m:Entity {group_id: $group_id})
+WITH collect(DISTINCT n) + collect(DISTINCT m) AS entities
+UNWIND entities AS e
+MATCH (c:Community {group_id: $group_id})-[:HAS_MEMBER]->(e)
+WITH DISTINCT c
+MATCH (c)-[:HAS_MEMBER]->(member:Entity)
+RETURN c.uuid AS community_uuid, collect(member.uuid) AS member_uuids
+"""
+
+# Edge counts between entities of the region being re-clustered
+_REGION_PROJECTION = """
+MATCH (n:Entity {group_id: $group_id})-[e:RELATES_TO]-(m:Entity {group_id: $group_id})
+WHERE n.uuid IN $uuids AND m.uuid IN $uuids
+WITH n.uuid AS uuid, m.uuid AS neighbor, count(e) AS count
+RETURN uuid, neighbor, count
+"""
+
+
+class CommunityChangeTracker:
+    """
+    Persists the entities changed per group since the last community build, and
+    separately every entity changed since the last full build (the drift)
+    """
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def record(self, group_id: str, entity_uuids: Iterable[str]) -> None:
+        now = datetime.now().isoformat()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO community_changes (group_id, entity_uuid, changed_at) VALUES (?, ?, ?)",
+            [(group_id, uuid, now) for uuid in set(entity_uuids)]
+        )
+        self._db.executemany(
+            "INSERT OR IGNORE INTO community_drift (group_id, entity_uuid) VALUES (?, ?)",
+            [(group_id, uuid) for uuid in set(entity_uuids)]
+        )
+
+    def changed(self, group_id: str) -> List[str]:
+        return [row["entity_uuid"] for row in self._db.execute(
+            "SELECT entity_uuid FROM community_changes WHERE group_id = ?", (group_id,)
+        )]
+
+    def drifted(self, group_id: str) -> int:
+        """Distinct entities changed since the last full build, incremental builds notwithstanding"""
+        return self._db.execute(
+            "SELECT count(*) FROM community_drift WHERE group_id = ?", (group_id,)
+        ).fetchone()[0]
+
+    def last_build(self, group_id: str) -> Optional[Dict[str, Any]]:
+        row = self._db.execute("SELECT * FROM community_builds WHERE group_id = ?", (group_id,)).fetchone()
+        return dict(row) if row else None
+
+    def mark_full_build(self, group_id: str, entity_count: int) -> None:
+        self._db.execute("DELETE FROM community_changes WHERE group_id = ?", (group_id,))
+        self._db.execute("DELETE FROM community_drift WHERE group_id = ?", (group_id,))
+        self._db.execute(
+            "INSERT OR REPLACE INTO community_builds (group_id, entity_count, full_built_at) VALUES (?, ?, ?)",
+            (group_id, entity_count, datetime.now().isoformat())
+        )
+
+    def mark_incremental_build(self, group_id: str, entity_uuids: Iterable[str]) -> None:
+        self._db.executemany(
+            "DELETE FROM community_changes WHERE group_id = ? AND entity_uuid = ?",
+            [(group_id, uuid) for uuid in entity_uuids]
+        )
+        self._db.execute(
+            "UPDATE community_builds SET incremental_built_at = ? WHERE group_id = ?",
+            (datetime.now().isoformat(), group_id)
+        )
+
+    def forget(self, group_id: Optional[str] = None) -> None:
+        """Drop tracking state of a group, or of every group when none is given"""
+        if group_id is None:
+            self._db.execute("DELETE FROM community_changes")
+            self._db.execute("DELETE FROM community_drift")
+            self._db.execute("DELETE FROM community_builds")
+            return
+        self._db.execute("DELETE FROM community_changes WHERE group_id = ?", (group_id,))
+        self._db.execute("DELETE FROM community_drift WHERE group_id = ?", (group_id,))
+        self._db.execute("DELETE FROM community_builds WHERE group_id = ?", (group_id,))
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class IncrementalCommunityBuilder:
+    """
+    Keeps Graphiti communities up to date without rebuilding the whole group.
+
+    Incremental builds re-run label propagation only over the communities touching
+    changed entities (plus the changed entities themselves) and regenerate summaries
+    only for clusters whose membership actually changed. A full rebuild runs when
+    requested, when the group was never built, or when the share of changed entities
+    since the last full build exceeds the drift threshold.
+    """
+
+    def __init__(self, graphiti, tracker: CommunityChangeTracker, drift_threshold: float = DEFAULT_DRIFT_THRESHOLD):
+        self.graphiti = graphiti
+        self.tracker = tracker
+        self.drift_threshold = drift_threshold
+
+    async def build(self, group_id: str, mode: str = "auto") -> Dict[str, Any]:
+        """Build the communities of a group; mode is "auto", "incremental" or "full" """
+        changed = self.tracker.changed(group_id)
+        last_build = self.tracker.last_build(group_id)
+        drift = self.tracker.drifted(group_id) / max(last_build["entity_count"], 1) if last_build else None
+
+        if mode == "full" or last_build is None or (mode == "auto" and drift > self.drift_threshold):
+            return await self._full_build(group_id, drift)
+        return await self._incremental_build(group_id, changed, drift)
+
+    async def _full_build(self, group_id: str, drift: Optional[float]) -> Dict[str, Any]:
+        logger.info(f"Full community rebuild for group_id {group_id} (drift: {drift})")
+        community_nodes, community_edges = await self.graphiti.build_communities(group_ids=[group_id])
+        records, _, _ = await self.graphiti.driver.execute_query(
+            "MATCH (n:Entity {group_id: $group_id}) RETURN count(n) AS count",
+            group_id=group_id
+        )
+        self.tracker.mark_full_build(group_id, records[0]["count"] if records else 0)
+        return {
+            "mode": "full",
+            "drift": drift,
+            "communities_count": len(community_nodes),
+            "edges_count": len(community_edges)
+        }
+
+    async def _incremental_build(self, group_id: str, changed: List[str], drift: Optional[float]) -> Dict[str, Any]:
+        result = {
+            "mode": "incremental",
+            "drift": drift,
+            "changed_entities": len(changed),
+            "affected_communities": 0,
+            "kept_communities": 0,
+            "communities_count": 0,
+            "edges_count": 0
+        }
+        if not changed:
+            return result
+
+        driver = self.graphiti.driver
+        records, _, _ = await driver.execute_query(_AFFECTED_COMMUNITIES, group_id=group_id, uuids=changed)
+        affected = {record["community_uuid"]: frozenset(record["member_uuids"]) for record in records}
+        changed_set = set(changed)
+
+        region: Set[str] = set().union(*affected.values()) | changed_set
+        projection = await self._project(group_id, region)
+        clusters = [frozenset(cluster) for cluster in label_propagation(projection)]
+
+        # Clusters identical to an existing community without changed members keep their summary
+        unchanged = {members: uuid for uuid, members in affected.items() if not members & changed_set}
+        kept = [unchanged[cluster] for cluster in clusters if cluster in unchanged]
+        rebuilt = [cluster for cluster in clusters if cluster not in unchanged]
+        stale = [uuid for uuid in affected if uuid not in kept]
+
+        entity_clusters = await semaphore_gather(
+            *[EntityNode.get_by_uuids(driver, list(cluster)) for cluster in rebuilt],
+            max_coroutines=self.graphiti.max_coroutines
+        )
+        communities = await semaphore_gather(
+            *[
+                build_community(
+                    self.graphiti.llm_client,
+                    entities,
+                    clients=self.graphiti.clients,
+                    max_coroutines=self.graphiti.max_coroutines
+                )
+                for entities in entity_clusters if entities
+            ],
+            max_coroutines=self.graphiti.max_coroutines
+        )
+        community_nodes = [community[0] for community in communities]
+        community_edges = [edge for community in communities for edge in community[1]]
+
+        await semaphore_gather(
+            *[node.generate_name_embedding(self.graphiti.embedder) for node in community_nodes],
+            max_coroutines=self.graphiti.max_coroutines
+        )
+        if stale:
+            await driver.execute_query(
+                "MATCH (c:Community) WHERE c.uuid IN $uuids DETACH DELETE c",
+                uuids=stale
+            )
+        await semaphore_gather(*[node.save(driver) for node in community_nodes],
+                               max_coroutines=self.graphiti.max_coroutines)
+        await semaphore_gather(*[edge.save(driver) for edge in community_edges],
+                               max_coroutines=self.graphiti.max_coroutines)
+
+        self.tracker.mark_incremental_build(group_id, changed)
+        logger.info(
+            f"Incremental community build for group_id {group_id}: {len(changed)} changed entities, "
+            f"{len(affected)} affected communities, {len(community_nodes)} rebuilt, {len(kept)} kept"
+        )
+        result.update({
+            "affected_communities": len(affected),
+            "kept_communities": len(kept),
+            "communities_count": len(community_nodes),
+            "edges_count": len(community_edges)
+        })
+        return result
+
+    async def _project(self, group_id: str, region: Set[str]) -> Dict[str, List[Neighbor]]:
+        """Label propagation input restricted to the region, dropping entities deleted since they changed"""
+        records, _, _ = await self.graphiti.driver.execute_query(
+            "MATCH (n:Entity {group_id: $group_id}) WHERE n.uuid IN $uuids RETURN n.uuid AS uuid",
+            group_id=group_id,
+            uuids=list(region)
+        )
+        projection: Dict[str, List[Neighbor]] = {record["uuid"]: [] for record in records}
+        records, _, _ = await self.graphiti.driver.execute_query(
+            _REGION_PROJECTION,
+            group_id=group_id,
+            uuids=list(projection)
+        )
+        for record in records:
+            projection[record["uuid"]].append(Neighbor(node_uuid=record["neighbor"], edge_count=record["count"]))
+        return projection
+
+    async def affected_by_episode(self, episode_uuid: str) -> List[str]:
+        """Entities mentioned by an episode, recorded before the episode is removed"""
+        records, _, _ = await self.graphiti.driver.execute_query(
+            "MATCH (:Episodic {uuid: $uuid})-[:MENTIONS]->(n:Entity) RETURN n.uuid AS uuid",
+            uuid=episode_uuid
+        )
+        return [record["uuid"] for record in records]
@@ -0,0 +1,227 @@
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+# ==================== PACKING DEFAULTS ====================
+DEFAULT_CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", 12000))
+DEFAULT_TOKENIZER_ENCODING = os.environ.get("CONTEXT_TOKENIZER_ENCODING", "o200k_base")
+RECENCY_WEIGHT = 0.15  # Bonus added to relevance for the most recent fact
+NEAR_DUPLICATE_THRESHOLD = 0.9  # Word-set Jaccard similarity above which facts are duplicates
+SYNTHESIS_SCORE = 1.0  # Intermediate syntheses are condensed, so they rank ahead of raw items
+MAX_REPORTED_DROPS = 25  # Dropped items listed individually in the report
+
+
+@dataclass
+class PackedContext:
+    """Items selected for the prompt, grouped per section, plus a packing report"""
+    nodes: List[Dict[str, Any]] = field(default_factory=list)
+    edges: List[Dict[str, Any]] = field(default_factory=list)
+    communities: List[Dict[str, Any]] = field(default_factory=list)
+    syntheses: List[str] = field(default_factory=list)
+    report: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class _Candidate:
+    kind: str
+    item: Any
+    text: str
+    score: float
+    tokens: int = 0
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    """Convert a valid_at value (datetime, neo4j DateTime or ISO string) to a POSIX timestamp"""
+    if value is None:
+        return None
+    if hasattr(value, "to_native"):
+        value = value.to_native()
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        try:
+            return value.timestamp()
+        except (OverflowError, OSError, ValueError):
+            return None
+    return None
+
+
+def _word_set(text: str) -> frozenset:
+    return frozenset(re.findall(r"\w+", text.lower()))
+
+
+def _is_near_duplicate(words: frozenset, kept: List[frozenset], threshold: float) -> bool:
+    if not words:
+        return False
+    for other in kept:
+        union = len(words | other)
+        if union and len(words & other) / union >= threshold:
+            return True
+    return False
+
+
+class ContextPacker:
+    """
+    Selects graph data for the final-answer prompt under a token budget.
+    Items are ranked by relevance score with a recency bonus from `valid_at`,
+    near-identical facts are collapsed, and the budget is filled greedily.
+    """
+
+    def __init__(
+            self,
+            token_budget: int = DEFAULT_CONTEXT_TOKEN_BUDGET,
+            model: Optional[str] = None,
+            recency_weight: float = RECENCY_WEIGHT,
+            duplicate_threshold: float = NEAR_DUPLICATE_THRESHOLD
+    ):
+        self.token_budget = token_budget
+        self.recency_weight = recency_weight
+        self.duplicate_threshold = duplicate_threshold
+        self._encoding = self._load_encoding(model)
+
+    @staticmethod
+    def _load_encoding(model: Optional[str]):
+        """Load the tokenizer for the model, falling back to the configured encoding"""
+        try:
+            if model:
+                try:
+                    return tiktoken.encoding_for_model(model.split("/")[-1])
+                except KeyError:
+                    pass
+            return tiktoken.get_encoding(DEFAULT_TOKENIZER_ENCODING)
+        except Exception as e:
+            # The BPE files are downloaded on first use; keep serving without them
+            logger.warning(f"Tokenizer unavailable, approximating token counts: {e}")
+            return None
+
+    def count_tokens(self, text: str) -> int:
+        if self._encoding is None:
+            return max(1, len(text) // 4)
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def pack(
+            self,
+            nodes: List[Dict[str, Any]],
+            edges: List[Dict[str, Any]],
+            communities: List[Dict[str, Any]],
+            syntheses: List[str],
+            render: Dict[str, Callable[[Dict[str, Any]], str]]
+    ) -> PackedContext:
+        """
+        Fill the token budget with the best-ranked items.
+        `render` maps "node", "edge" and "community" to the function that formats
+        a single prompt line, so the budget is measured on the exact prompt text.
+        """
+
+        candidates = [_Candidate("synthesis", text, text, SYNTHESIS_SCORE) for text in syntheses if text]
+        candidates += [
+            _Candidate("node", node, render["node"](node), node.get("relevance_score", 0.0))
+            for node in nodes
+        ]
+        candidates += [
+            _Candidate("community", comm, render["community"](comm), comm.get("relevance_score", 0.0))
+            for comm in communities
+        ]
+        candidates += self._score_edges(edges, render["edge"])
+        candidates.sort(key=lambda c: c.score, reverse=True)
+
+        packed = PackedContext()
+        sections = {
+            "node": packed.nodes,
+            "edge": packed.edges,
+            "community": packed.communities,
+            "synthesis": packed.syntheses
+        }
+        kept_fact_words: List[frozenset] = []
+        seen_texts = set()
+        duplicates: List[_Candidate] = []
+        over_budget: List[_Candidate] = []
+        tokens_used = 0
+
+        for candidate in candidates:
+            normalized = " ".join(candidate.text.lower().split())
+            if normalized in seen_texts:
+                duplicates.append(candidate)
+                continue
+
+            words = None
+            if candidate.kind == "edge":
+                words = _word_set(candidate.item.get("fact", "") or candidate.text)
+                if _is_near_duplicate(words, kept_fact_words, self.duplicate_threshold):
+                    duplicates.append(candidate)
+                    continue
+
+            candidate.tokens = self.count_tokens(candidate.text) + 1  # Trailing newline
+            if tokens_used + candidate.tokens > self.token_budget:
+                over_budget.append(candidate)
+                continue
+
+            tokens_used += candidate.tokens
+            seen_texts.add(normalized)
+            if words is not None:
+                kept_fact_words.append(words)
+            sections[candidate.kind].append(candidate.item)
+
+        packed.report = self._build_report(candidates, sections, duplicates, over_budget, tokens_used)
+        return packed
+
+    def _score_edges(
+            self,
+            edges: List[Dict[str, Any]],
+            render: Callable[[Dict[str, Any]], str]
+    ) -> List[_Candidate]:
+        """Rank edges by relevance plus a recency bonus normalized over the edges' valid_at range"""
+        timestamps = [_timestamp(edge.get("valid_at")) for edge in edges]
+        known = [ts for ts in timestamps if ts is not None]
+        oldest, newest = (min(known), max(known)) if known else (0.0, 0.0)
+        span = newest - oldest
+
+        scored = []
+        for edge, ts in zip(edges, timestamps):
+            recency = 0.0
+            if ts is not None:
+                recency = (ts - oldest) / span if span else 1.0
+            score = edge.get("relevance_score", 0.0) + self.recency_weight * recency
+            scored.append(_Candidate("edge", edge, render(edge), score))
+        return scored
+
+    def _build_report(
+            self,
+            candidates: List[_Candidate],
+            sections: Dict[str, List[Any]],
+            duplicates: List[_Candidate],
+            over_budget: List[_Candidate],
+            tokens_used: int
+    ) -> Dict[str, Any]:
+        totals: Dict[str, int] = {}
+        for candidate in candidates:
+            totals[candidate.kind] = totals.get(candidate.kind, 0) + 1
+
+        def describe(candidate: _Candidate) -> Dict[str, Any]:
+            return {
+                "kind": candidate.kind,
+                "text": candidate.text[:120],
+                "score": round(candidate.score, 3),
+                "tokens": candidate.tokens or None
+            }
+
+        return {
+            "token_budget": self.token_budget,
+            "tokens_used": tokens_used,
+            "approximate_tokens": self._encoding is None,
+            "total": totals,
+            "kept": {kind: len(items) for kind, items in sections.items()},
+            "dropped_duplicates": len(duplicates),
+            "dropped_over_budget": len(over_budget),
+            "dropped": [describe(c) for c in (duplicates + over_budget)[:MAX_REPORTED_DROPS]]
+        }
@@ -0,0 +1,111 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, func, or_, select
+
+from cognee.infrastructure.databases.relational import get_relational_engine
+from cognee.modules.data.models import Data, Dataset
+
+STREAM_BATCH_SIZE = 500
+DATA_FIELDS = tuple(Data.__table__.columns.keys())
+
+
+class InvalidListingError(ValueError):
+    """Raised for unknown projection fields or malformed cursors"""
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Comma separated column names; all columns when not given"""
+    if not fields:
+        return list(DATA_FIELDS)
+    selected = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in selected if field not in DATA_FIELDS]
+    if unknown:
+        raise InvalidListingError(f"Unknown fields: {', '.join(unknown)}. Must be among: {', '.join(DATA_FIELDS)}")
+    return selected
+
+
+def encode_cursor(created_at: datetime, data_id: Any) -> str:
+    payload = json.dumps([created_at.isoformat(), str(data_id)])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        created_at, data_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_at), UUID(data_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidListingError(f"Invalid cursor: {cursor}") from e
+
+
+def _query(dataset_id: UUID, fields: List[str], since: Optional[datetime]):
+    columns = [Data.__table__.c[field] for field in fields]
+    query = select(*columns).join(Data.datasets).where(Dataset.id == dataset_id)
+    if since is not None:
+        query = query.where(func.coalesce(Data.updated_at, Data.created_at) >= since)
+    return query
+
+
+async def stream_dataset_data(
+        dataset_id: UUID,
+        fields: List[str],
+        since: Optional[datetime] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield the dataset's data rows one by one, fetched from the database in batches"""
+    query = _query(dataset_id, fields, since).order_by(Data.data_size.desc())
+    db_engine = get_relational_engine()
+    async with db_engine.get_async_session() as session:
+        result = await session.stream(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for row in result:
+            yield jsonable_encoder(dict(row._mapping))
+
+
+async def stream_dataset_json(dataset_id: UUID, fields: List[str], since: Optional[datetime] = None):
+    """The dataset's data as a JSON array, encoded row by row"""
+    yield "["
+    first = True
+    async for item in stream_dataset_data(dataset_id, fields, since):
+        yield ("" if first else ",") + json.dumps(item)
+        first = False
+    yield "]"
+
+
+async def get_dataset_page(
+        dataset_id: UUID,
+        fields: List[str],
+        limit: int,
+        cursor: Optional[str] = None,
+        since: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    One page of the dataset's data in (created_at, id) order.
+    `next_cursor` resumes after the last returned row and is None on the last page.
+    """
+    # The keyset columns are always selected, and dropped again if not requested
+    query_fields = list(dict.fromkeys(fields + ["created_at", "id"]))
+    query = _query(dataset_id, query_fields, since)
+    if cursor:
+        created_at, data_id = decode_cursor(cursor)
+        query = query.where(or_(
+            Data.created_at > created_at,
+            and_(Data.created_at == created_at, Data.id > data_id)
+        ))
+    query = query.order_by(Data.created_at, Data.id).limit(limit + 1)
+
+    db_engine = get_relational_engine()
+    async with db_engine.get_async_session() as session:
+        rows = [dict(row._mapping) for row in (await session.execute(query)).all()]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+    return {
+        "items": [jsonable_encoder({field: row[field] for field in fields}) for row in rows],
+        "next_cursor": next_cursor
+    }
@@ -0,0 +1,303 @@
+import hashlib
+import logging
+import os
+import re
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from shared_state import ProcessLock
+
+try:
+    from graphiti_core.embedder.client import EmbedderClient
+except ImportError:
+    # The cognee service shares this module without graphiti installed
+    EmbedderClient = object
+
+logger = logging.getLogger(__name__)
+
+# Defaults to the mounted system directory so the cache survives container restarts
+DEFAULT_CACHE_DIR = os.environ.get(
+    "EMBEDDING_CACHE_DIR",
+    os.path.join(os.environ.get("SYSTEM_ROOT_DIRECTORY", "."), "embedding_cache")
+)
+DEFAULT_DTYPE = os.environ.get("EMBEDDING_CACHE_DTYPE", "float16")
+# Memory held by the in-memory LRU per process, counted as the float32 vectors it keeps
+DEFAULT_MEMORY_BYTES = int(os.environ.get("EMBEDDING_CACHE_MEMORY_BYTES", 256 * 1024 * 1024))
+DEFAULT_DISK_ENTRIES = int(os.environ.get("EMBEDDING_CACHE_DISK_ENTRIES", 500000))
+INITIAL_DISK_CAPACITY = 1024
+DIGEST_SIZE = 16
+
+
+def _digest(namespace: str, text: str) -> bytes:
+    return hashlib.blake2b(f"{namespace}\x1f{text}".encode("utf-8"), digest_size=DIGEST_SIZE).digest()
+
+
+class _DiskStore:
+    """
+    Append-only vector store: a memory-mapped matrix of vectors plus an index
+    file of content digests, where the n-th digest owns the n-th row.
+    New digests are only appended by `flush`, after their rows were synced to disk,
+    so a crash loses the unflushed rows instead of indexing rows that were never written.
+
+    Several worker processes can share one store: rows are assigned and written
+    under a ProcessLock kept beside the files, and each process picks up the
+    digests appended by the others when a lookup misses.
+    """
+
+    def __init__(self, directory: str, name: str, dimensions: int, dtype: str, max_entries: int):
+        os.makedirs(directory, exist_ok=True)
+        self.dimensions = dimensions
+        self.dtype = np.dtype(dtype)
+        self.max_entries = max_entries
+        self.vectors_path = os.path.join(directory, f"{name}.vectors")
+        self.index_path = os.path.join(directory, f"{name}.index")
+        self.slots: Dict[bytes, int] = {}
+        self._unflushed: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._row_bytes = self.dimensions * self.dtype.itemsize
+        self._indexed = 0
+        self._lock = ProcessLock(f"embedding-cache:{name}", directory)
+
+        self._lock.acquire_blocking()
+        try:
+            stored_rows = os.path.getsize(self.vectors_path) // self._row_bytes if os.path.exists(self.vectors_path) else 0
+            self.capacity = max(INITIAL_DISK_CAPACITY, stored_rows)
+            self._map = self._open(self.capacity)
+            self._index_file = open(self.index_path, "ab")
+            self._refresh()
+            # Digests without a full row are dropped; rows without a digest are just unused, as the file is preallocated
+            if stored_rows < self._indexed:
+                self.slots = {digest: slot for digest, slot in self.slots.items() if slot < stored_rows}
+                self._indexed = stored_rows
+            self._index_file.truncate(self._indexed * DIGEST_SIZE)
+        finally:
+            self._lock.release()
+
+    def _open(self, capacity: int) -> np.memmap:
+        required = capacity * self._row_bytes
+        with open(self.vectors_path, "ab") as vectors_file:
+            if vectors_file.tell() < required:
+                vectors_file.truncate(required)
+        return np.memmap(self.vectors_path, dtype=self.dtype, mode="r+", shape=(capacity, self.dimensions))
+
+    def _refresh(self) -> None:
+        """Index the digests other processes appended since the last look"""
+        indexed_bytes = self._indexed * DIGEST_SIZE
+        size = os.path.getsize(self.index_path)
+        if size - indexed_bytes < DIGEST_SIZE:
+            return
+        with open(self.index_path, "rb") as index_file:
+            index_file.seek(indexed_bytes)
+            raw = index_file.read(size - indexed_bytes)
+        complete = len(raw) - len(raw) % DIGEST_SIZE
+        for offset in range(0, complete, DIGEST_SIZE):
+            self.slots[raw[offset:offset + DIGEST_SIZE]] = self._indexed
+            self._indexed += 1
+        if self._indexed > self.capacity:
+            # Another process grew the vectors file
+            self.capacity = os.path.getsize(self.vectors_path) // self._row_bytes
+            self._map = np.memmap(self.vectors_path, dtype=self.dtype, mode="r+", shape=(self.capacity, self.dimensions))
+
+    def get(self, digest: bytes) -> Optional[np.ndarray]:
+        vector = self._unflushed.get(digest)
+        if vector is not None:
+            return vector.astype(np.float32)
+        slot = self.slots.get(digest)
+        if slot is None:
+            self._refresh()
+            slot = self.slots.get(digest)
+            if slot is None:
+                return None
+        return self._map[slot].astype(np.float32)
+
+    def put(self, digest: bytes, vector: List[float]) -> None:
+        if digest not in self.slots:
+            self._unflushed[digest] = np.asarray(vector, dtype=self.dtype)
+
+    def flush(self) -> None:
+        """Write the new rows and sync them to disk, then index them"""
+        if not self._unflushed:
+            return
+        self._lock.acquire_blocking()
+        try:
+            self._refresh()
+            # Drop a digest torn by a process that crashed while appending
+            self._index_file.truncate(self._indexed * DIGEST_SIZE)
+            indexed: List[bytes] = []
+            for digest, vector in self._unflushed.items():
+                if digest in self.slots:
+                    continue
+                slot = self._indexed
+                if slot >= self.max_entries:
+                    break
+                if slot >= self.capacity:
+                    self._map.flush()
+                    self.capacity = min(self.capacity * 2, self.max_entries)
+                    self._map = self._open(self.capacity)
+                self._map[slot] = vector
+                self.slots[digest] = slot
+                self._indexed += 1
+                indexed.append(digest)
+            if indexed:
+                self._map.flush()
+                self._index_file.write(b"".join(indexed))
+                self._index_file.flush()
+        finally:
+            self._lock.release()
+            self._unflushed.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self._index_file.close()
+
+    @property
+    def bytes_used(self) -> int:
+        return self._indexed * (self._row_bytes + DIGEST_SIZE)
+
+    @property
+    def bytes_allocated(self) -> int:
+        return self.capacity * self._row_bytes + self._indexed * DIGEST_SIZE
+
+
+class EmbeddingCache:
+    """
+    Content-hash keyed embedding cache: an in-memory LRU in front of a
+    memory-mapped on-disk store that survives restarts.
+    Vectors are kept as float32 arrays and only turned into lists when returned.
+    The namespace (usually the embedding model name) is part of the key,
+    so switching models never returns vectors from another model.
+    """
+
+    def __init__(
+            self,
+            namespace: str,
+            dimensions: int,
+            directory: str = DEFAULT_CACHE_DIR,
+            dtype: str = DEFAULT_DTYPE,
+            memory_bytes: int = DEFAULT_MEMORY_BYTES,
+            disk_entries: int = DEFAULT_DISK_ENTRIES
+    ):
+        self.namespace = namespace
+        self.dimensions = dimensions
+        self.memory_bytes = memory_bytes
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._memory_used = 0
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", namespace).strip("_") or "default"
+        self._disk: Optional[_DiskStore] = None
+        try:
+            self._disk = _DiskStore(directory, f"{slug}-{dimensions}-{dtype}", dimensions, dtype, disk_entries)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Embedding cache disk store unavailable, using memory only: {e}")
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.skipped = 0
+
+    def get(self, text: str) -> Optional[List[float]]:
+        digest = _digest(self.namespace, text)
+        vector = self._memory.get(digest)
+        if vector is not None:
+            self._memory.move_to_end(digest)
+            self.memory_hits += 1
+            return vector.tolist()
+        if self._disk is not None:
+            vector = self._disk.get(digest)
+            if vector is not None:
+                self._remember(digest, vector)
+                self.disk_hits += 1
+                return vector.tolist()
+        self.misses += 1
+        return None
+
+    def put(self, text: str, vector: List[float]) -> None:
+        if len(vector) != self.dimensions:
+            # Unexpected shape (e.g. a misconfigured dimension); don't persist it
+            self.skipped += 1
+            return
+        digest = _digest(self.namespace, text)
+        self._remember(digest, np.asarray(vector, dtype=np.float32))
+        if self._disk is not None:
+            self._disk.put(digest, vector)
+
+    def _remember(self, digest: bytes, vector: np.ndarray) -> None:
+        previous = self._memory.pop(digest, None)
+        if previous is not None:
+            self._memory_used -= previous.nbytes
+        self._memory[digest] = vector
+        self._memory_used += vector.nbytes
+        while self._memory_used > self.memory_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= evicted.nbytes
+
+    async def embed(
+            self,
+            texts: List[str],
+            compute: Callable[[List[str]], Awaitable[List[List[float]]]]
+    ) -> List[List[float]]:
+        """Return embeddings for `texts`, computing only the misses in a single batch"""
+        results: List[Optional[List[float]]] = [self.get(text) for text in texts]
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, results) if vector is None))
+        if missing:
+            computed = dict(zip(missing, await compute(missing)))
+            for text, vector in computed.items():
+                self.put(text, vector)
+            self.flush()
+            results = [vector if vector is not None else computed[text] for text, vector in zip(texts, results)]
+        return results
+
+    def wrap(self, embed_text: Callable[[List[str]], Awaitable[List[List[float]]]]):
+        """Wrap a batch embedding coroutine (such as cognee's `embed_text`) with this cache"""
+
+        async def cached_embed_text(text: List[str]) -> List[List[float]]:
+            return await self.embed(list(text), embed_text)
+
+        return cached_embed_text
+
+    def flush(self) -> None:
+        if self._disk is not None:
+            self._disk.flush()
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "dimensions": self.dimensions,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_used,
+            "max_memory_bytes": self.memory_bytes,
+            "disk_entries": len(self._disk.slots) if self._disk is not None else 0,
+            "disk_bytes_used": self._disk.bytes_used if self._disk is not None else 0,
+            "disk_bytes_allocated": self._disk.bytes_allocated if self._disk is not None else 0,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+        }
+
+
+class CachedGraphitiEmbedder(EmbedderClient):
+    """Graphiti embedder whose `create` and `create_batch` go through an EmbeddingCache"""
+
+    def __init__(self, embedder, cache: EmbeddingCache):
+        self.embedder = embedder
+        self.cache = cache
+        self.config = getattr(embedder, "config", None)
+
+    async def create(self, input_data: str | list[str] | Iterable[int] | Iterable[Iterable[int]]) -> list[float]:
+        if isinstance(input_data, str):
+            async def compute(texts: List[str]) -> List[List[float]]:
+                return [await self.embedder.create(texts[0])]
+
+            return (await self.cache.embed([input_data], compute))[0]
+        # Token ids and pre-batched input are not cached
+        return await self.embedder.create(input_data)
+
+    async def create_batch(self, input_data_list: list[str]) -> list[list[float]]:
+        return await self.cache.embed(input_data_list, self.embedder.create_batch)
@@ -0,0 +1,185 @@
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from background_maintenance import BackgroundMaintainer
+
+logger = logging.getLogger(__name__)
+
+# Kuzu only checkpoints by itself once the WAL reaches 16MB; searches pay for replaying and scanning it until then
+DEFAULT_CHECKPOINT_MIN_WAL_BYTES = int(os.environ.get("KUZU_CHECKPOINT_MIN_WAL_BYTES", 1024 * 1024))
+DEFAULT_INTERVAL_SECONDS = float(os.environ.get("KUZU_MAINTENANCE_INTERVAL_SECONDS", 1800))
+# Extra index statements run on every graph, separated by ";", e.g.
+# CALL CREATE_FTS_INDEX('Node', 'node_name', ['name']) once the FTS extension is installed
+DEFAULT_INDEX_STATEMENTS = [
+    statement.strip() for statement in os.environ.get("KUZU_INDEX_STATEMENTS", "").split(";") if statement.strip()
+]
+
+NODE_TABLE = "Node"
+EDGE_TABLE = "EDGE"
+
+
+def _file_size(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(directory, name))
+            for directory, _, names in os.walk(path) for name in names
+        )
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def graph_stamp(path: str) -> Tuple[Any, ...]:
+    """Changes whenever a write to the Kuzu graph commits (to its WAL or, after a checkpoint, its file)"""
+    stamp = []
+    for file_path in (path, f"{path}.wal"):
+        try:
+            info = os.stat(file_path)
+            stamp.append((info.st_mtime_ns, info.st_size))
+        except FileNotFoundError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+async def dataset_graph_paths() -> Dict[str, str]:
+    """Kuzu file of every dataset with its own graph store, by dataset id"""
+    from sqlalchemy import select
+    from cognee.base_config import get_base_config
+    from cognee.infrastructure.databases.relational import get_relational_engine
+    from cognee.modules.users.models import DatasetDatabase
+
+    # cognee opens them from $SYSTEM_ROOT_DIRECTORY/databases/<owner id>/<graph database name>
+    databases_directory = os.path.join(get_base_config().system_root_directory, "databases")
+    async with get_relational_engine().get_async_session() as session:
+        rows = await session.execute(
+            select(DatasetDatabase.dataset_id, DatasetDatabase.owner_id, DatasetDatabase.graph_database_name)
+            .where(DatasetDatabase.graph_database_provider == "kuzu")
+        )
+        return {
+            str(dataset_id): os.path.join(databases_directory, str(owner_id), name)
+            for dataset_id, owner_id, name in rows if name
+        }
+
+
+async def dataset_graph_engine(dataset_id: str, owner_id: str):
+    """
+    The graph adapter of a dataset, opened through cognee's engine factory so it is the
+    same handle searches and cognify use (a Kuzu database can only be open once per process).
+    Sets the dataset's database context variables in the calling task.
+    """
+    from uuid import UUID
+    from cognee.context_global_variables import set_database_global_context_variables
+    from cognee.infrastructure.databases.graph import get_graph_engine
+
+    await set_database_global_context_variables(UUID(dataset_id), UUID(owner_id))
+    return await get_graph_engine()
+
+
+class GraphMaintainer(BackgroundMaintainer):
+    """
+    Keeps the per-adventure Kuzu graphs compact.
+
+    - Checkpoints a graph once its write-ahead log exceeds `checkpoint_min_wal_bytes`,
+      folding cognify's writes into the main file instead of leaving them to be replayed.
+    - Checks the primary-key index on Node.id, which serves the id lookups and MERGEs
+      of cognify and search; Kuzu has no secondary property indexes, so further indexes
+      (full-text, vector) are created from `index_statements`.
+    - Reports nodes, edges, node types and file sizes per graph.
+
+    `due(path)` tells from the graph's files alone whether it needs opening at all.
+    `request(dataset)` queues a check (e.g. after cognify); queued datasets and,
+    every `interval_seconds`, all datasets are checked in the background.
+    """
+
+    lock_name = "graph-maintenance"
+    store_label = "Kuzu"
+
+    def __init__(
+            self,
+            checkpoint_min_wal_bytes: int = DEFAULT_CHECKPOINT_MIN_WAL_BYTES,
+            index_statements: Optional[List[str]] = None,
+            interval_seconds: float = DEFAULT_INTERVAL_SECONDS
+    ):
+        super().__init__(interval_seconds)
+        self.checkpoint_min_wal_bytes = checkpoint_min_wal_bytes
+        self.index_statements = DEFAULT_INDEX_STATEMENTS if index_statements is None else index_statements
+        self._indexed: Set[str] = set()
+        self.checkpoints = 0
+        self.skipped = 0
+
+    # ==================== GRAPHS ====================
+
+    async def inspect(self, engine) -> Dict[str, Any]:
+        """Size, WAL and index state of a Kuzu graph"""
+        path = engine.db_path
+        nodes = await engine.query(f"MATCH (n:{NODE_TABLE}) RETURN count(n)")
+        edges = await engine.query(f"MATCH ()-[r:{EDGE_TABLE}]->() RETURN count(r)")
+        types = await engine.query(f"MATCH (n:{NODE_TABLE}) RETURN n.type, count(n) ORDER BY count(n) DESC")
+        columns = await engine.query(f"CALL TABLE_INFO('{NODE_TABLE}') RETURN name, `primary key`")
+        indexes = await engine.query("CALL SHOW_INDEXES() RETURN table_name, index_name, index_type")
+        return {
+            "nodes": nodes[0][0] if nodes else 0,
+            "edges": edges[0][0] if edges else 0,
+            "node_types": {node_type: count for node_type, count in types},
+            "bytes": _file_size(path),
+            "wal_bytes": _file_size(f"{path}.wal"),
+            "primary_key": next((name for name, primary in columns if primary), None),
+            "indexes": [
+                {"table": table, "name": name, "type": index_type} for table, name, index_type in indexes
+            ]
+        }
+
+    def due(self, path: str, force_checkpoint: bool = False) -> bool:
+        """Whether the graph at `path` needs a checkpoint or its index statements, without opening it"""
+        if force_checkpoint or _file_size(f"{path}.wal") >= self.checkpoint_min_wal_bytes:
+            return True
+        if self.index_statements and path not in self._indexed:
+            return True
+        self.skipped += 1
+        return False
+
+    async def maintain(self, engine, force_checkpoint: bool = False,
+                       write_lock: Optional[Callable[[], Any]] = None) -> List[str]:
+        """
+        Checkpoint and index a Kuzu graph as needed; returns what was done.
+        `write_lock` returns a context manager held while the checkpoint runs.
+        """
+        path = engine.db_path
+        done = []
+
+        if path not in self._indexed:
+            columns = await engine.query(f"CALL TABLE_INFO('{NODE_TABLE}') RETURN name, `primary key`")
+            if ("id", True) not in [tuple(column) for column in columns]:
+                logger.warning("Kuzu graph %s has no primary key on %s.id; id lookups scan the table", path, NODE_TABLE)
+            for statement in self.index_statements:
+                try:
+                    await engine.query(statement)
+                    done.append(f"ran {statement}")
+                except Exception as e:
+                    if "already exists" not in str(e):
+                        raise
+            self._indexed.add(path)
+
+        wal_bytes = _file_size(f"{path}.wal")
+        if force_checkpoint or wal_bytes >= self.checkpoint_min_wal_bytes:
+            started = time.perf_counter()
+            if write_lock is not None:
+                async with write_lock():
+                    await engine.query("CHECKPOINT")
+            else:
+                await engine.query("CHECKPOINT")
+            self.checkpoints += 1
+            done.append(f"checkpointed {wal_bytes} WAL bytes in {time.perf_counter() - started:.1f}s")
+
+        if done:
+            logger.info("Kuzu graph %s: %s", path, ", ".join(done))
+        return done
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "checkpoint_min_wal_bytes": self.checkpoint_min_wal_bytes,
+            "index_statements": self.index_statements,
+            "checkpoints": self.checkpoints,
+            "skipped": self.skipped,
+            **self.background_stats()
+        }
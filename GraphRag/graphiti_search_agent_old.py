@@ -1,10 +1,12 @@
 import logging
+import operator
 import os
-from typing import List, Dict, Any, Optional
+from typing import Annotated, List, Dict, Any, Optional
 
 from langchain_core.messages import HumanMessage
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
+from neo4j import RoutingControl
 from pydantic import BaseModel, Field, SecretStr
 
 from graphiti_core import Graphiti
@@ -12,6 +14,9 @@ from graphiti_core.search.search import SearchConfig
 from graphiti_core.search.search_config import NodeSearchConfig, EdgeReranker, EdgeSearchMethod, EdgeSearchConfig, \
     NodeSearchMethod, NodeReranker
 
+from agent_instrumentation import LLMUsageCallback, instrument_node, record
+from context_packer import ContextPacker, DEFAULT_CONTEXT_TOKEN_BUDGET, PackedContext
+
 logger = logging.getLogger(__name__)
 
 # ==================== RELEVANCE THRESHOLDS ====================
@@ -42,12 +47,16 @@ class GraphSearchState(BaseModel):
     # Synthesis
     intermediate_syntheses: List[str] = Field(default_factory=list)
     final_answer: str = ""
+    context_report: Dict[str, Any] = Field(default_factory=dict)
 
     # Reflection
     reflection_feedback: Optional[str] = None
     needs_regeneration: bool = False
     regeneration_count: int = 0
 
+    # Instrumentation: one entry per node execution, appended by parallel branches alike
+    node_metrics: Annotated[List[Dict[str, Any]], operator.add] = Field(default_factory=list)
+
 
 # ==================== CONFIGURATION ====================
 
@@ -57,24 +66,30 @@ class GraphAgentConfig:
     def __init__(
             self,
             graphiti_client: Graphiti,
+            search_client=None,
             search_depth: int = 3,
             max_results_per_round: int = 15,
             enable_reflection: bool = True,
-            max_regenerations: int = 2
+            max_regenerations: int = 2,
+            context_token_budget: int = DEFAULT_CONTEXT_TOKEN_BUDGET
     ):
         api_key = os.environ.get("LLM_API_KEY")
         model = os.environ.get("LLM_MODEL")
         base_url = os.environ.get("LLM_ENDPOINT")
         self.graphiti = graphiti_client
+        # Anything exposing graphiti's `search_` signature, e.g. a shared result cache
+        self.search_client = search_client or graphiti_client
         self.llm = ChatOpenAI(
             base_url=base_url,
             model=model,
             temperature=0.3,
-            api_key=SecretStr(api_key))
+            api_key=SecretStr(api_key),
+            callbacks=[LLMUsageCallback()])
         self.search_depth = search_depth
         self.max_results_per_round = max_results_per_round
         self.enable_reflection = enable_reflection
         self.max_regenerations = max_regenerations
+        self.context_packer = ContextPacker(token_budget=context_token_budget, model=model)
 
 
 # ==================== NODE IMPLEMENTATIONS ====================
@@ -195,6 +210,7 @@ class GraphToolsNode:
     def __init__(self, config: GraphAgentConfig):
         self.config = config
         self.graphiti = config.graphiti
+        self.search_client = config.search_client
 
     async def __call__(self, state: GraphSearchState) -> Dict[str, Any]:
         """Execute graph searches and aggregate results"""
@@ -234,7 +250,8 @@ class GraphToolsNode:
                 limit=10,
             )
 
-            results = await self.graphiti.search_(
+            record("graph_queries")
+            results = await self.search_client.search_(
                 group_ids=[state.group_id],
                 query=query,
                 config=config
@@ -353,8 +370,8 @@ class GraphToolsNode:
                 continue
 
             # Custom Cypher query to find edges connected to this node
-            cypher_query = f"""
-            MATCH (n:Entity {{uuid: '{node_uuid}'}})-[r]->(m:Entity)
+            cypher_query = """
+            MATCH (n:Entity {uuid: $uuid})-[r]->(m:Entity)
             RETURN r.uuid as uuid, r.name as name, r.fact as fact, 
                    r.source_node_uuid as source_node_uuid,
                    r.target_node_uuid as target_node_uuid,
@@ -366,22 +383,24 @@ class GraphToolsNode:
 
             # Execute via graphiti's driver
             try:
-                # Use the driver's execute_query method correctly
+                # Read-only: routed to a read replica on clusters, database from the driver config
+                record("graph_queries")
                 records, summary, keys = await self.graphiti.driver.execute_query(
                     cypher_query,
-                    database_="neo4j"
+                    params={"uuid": node_uuid},
+                    routing_=RoutingControl.READ
                 )
 
-                for record in records:
+                for row in records:
                     expanded_edges.append({
-                        "uuid": record.get("uuid"),
-                        "name": record.get("name"),
-                        "fact": record.get("fact"),
-                        "source_node_uuid": record.get("source_node_uuid"),
-                        "target_node_uuid": record.get("target_node_uuid"),
-                        "episodes": record.get("episodes"),
-                        "valid_at": record.get("valid_at"),
-                        "invalid_at": record.get("invalid_at"),
+                        "uuid": row.get("uuid"),
+                        "name": row.get("name"),
+                        "fact": row.get("fact"),
+                        "source_node_uuid": row.get("source_node_uuid"),
+                        "target_node_uuid": row.get("target_node_uuid"),
+                        "episodes": row.get("episodes"),
+                        "valid_at": row.get("valid_at"),
+                        "invalid_at": row.get("invalid_at"),
                         "depth_discovered": -1,  # Mark as BFS-discovered
                         "relevance_score": 0.6  # Default score for structural expansion
                     })
@@ -431,7 +450,8 @@ class GraphToolsNode:
                     limit=5,
                 )
 
-                results = await self.graphiti.search_(
+                record("graph_queries")
+                results = await self.search_client.search_(
                     group_ids=[group_id],
                     query=fact,
                     config=config
@@ -484,26 +504,46 @@ class SynthesisNode:
         self.llm = config.llm
 
     async def __call__(self, state: GraphSearchState) -> Dict[str, Any]:
-        """Synthesize answer from all retrieved information"""
+        """Synthesize the final answer from all retrieved information"""
+
+        packed = self.config.context_packer.pack(
+            nodes=state.nodes,
+            edges=state.edges,
+            communities=state.communities,
+            syntheses=state.intermediate_syntheses,
+            render={
+                "node": self._format_node,
+                "edge": self._format_edge,
+                "community": self._format_community
+            }
+        )
+        report = packed.report
+        logger.info(
+            f"Packed final context: {report['tokens_used']}/{report['token_budget']} tokens, "
+            f"kept {report['kept']}, dropped {report['dropped_duplicates']} duplicates "
+            f"and {report['dropped_over_budget']} over budget"
+        )
+
+        answer = await self._generate_final_answer(state, packed)
+        return {
+            "final_answer": answer,
+            "context_report": report
+        }
 
-        current_depth = state.current_depth
-        is_final = current_depth >= state.search_depth
+    async def intermediate(self, state: GraphSearchState) -> Dict[str, Any]:
+        """
+        Summarize the round that just finished.
+        Runs as a fan-out branch next to the following exploration round, so it
+        only touches `intermediate_syntheses` and never the exploration fields.
+        """
 
-        if is_final:
-            # Generate comprehensive final answer
-            answer = await self._generate_final_answer(state)
-            return {
-                "final_answer": answer
-            }
-        else:
-            # Generate intermediate synthesis
-            intermediate = await self._generate_intermediate_synthesis(state, current_depth)
-            # Append to existing syntheses
-            updated_syntheses = list(state.intermediate_syntheses)
-            updated_syntheses.append(intermediate)
-            return {
-                "intermediate_syntheses": updated_syntheses
-            }
+        intermediate = await self._generate_intermediate_synthesis(state)
+        # Append to existing syntheses
+        updated_syntheses = list(state.intermediate_syntheses)
+        updated_syntheses.append(intermediate)
+        return {
+            "intermediate_syntheses": updated_syntheses
+        }
 
     async def _generate_intermediate_synthesis(
             self,
@@ -530,17 +570,17 @@ class SynthesisNode:
         response = await self.llm.ainvoke([HumanMessage(content=prompt)])
         return response.content
 
-    async def _generate_final_answer(self, state: GraphSearchState) -> str:
-        """Generate comprehensive final answer from all accumulated data"""
-
-        all_edges = state.edges
-        all_nodes = state.nodes
-        all_communities = state.communities
+    async def _generate_final_answer(self, state: GraphSearchState, packed: PackedContext) -> str:
+        """Generate comprehensive final answer from the packed subset of accumulated data"""
 
         # Check if we have no knowledge to answer the query
-        if not all_edges and not all_nodes and not all_communities:
+        if not state.edges and not state.nodes and not state.communities:
             return "I don't have information about that in the knowledge graph."
 
+        all_edges = packed.edges
+        all_nodes = packed.nodes
+        all_communities = packed.communities
+
         # Build comprehensive prompt
         prompt = f"""
         You are synthesizing a comprehensive answer based on knowledge graph exploration.
@@ -549,17 +589,17 @@ class SynthesisNode:
 
         KNOWLEDGE GRAPH DATA RETRIEVED:
 
-        === ENTITIES ({len(all_nodes)} total) ===
+        === ENTITIES ({len(all_nodes)} of {len(state.nodes)} total) ===
         {self._format_nodes(all_nodes)}
 
-        === FACTS/RELATIONSHIPS ({len(all_edges)} total) ===
+        === FACTS/RELATIONSHIPS ({len(all_edges)} of {len(state.edges)} total) ===
         {self._format_edges(all_edges)}
 
-        === COMMUNITIES ({len(all_communities)} total) ===
+        === COMMUNITIES ({len(all_communities)} of {len(state.communities)} total) ===
         {self._format_communities(all_communities)}
 
         === INTERMEDIATE FINDINGS ===
-        {chr(10).join(state.intermediate_syntheses)}
+        {chr(10).join(packed.syntheses)}
 
         INSTRUCTIONS:
         1. Synthesize a comprehensive, detailed answer that fully addresses the user's query
@@ -583,46 +623,39 @@ class SynthesisNode:
         if not nodes:
             return "None"
 
-        formatted = []
-        for node in nodes:  # Limit for context window
-            formatted.append(
-                f"- {node.get('name', 'Unknown')}: {node.get('summary', 'No summary')}"
-            )
-
-        return "\n".join(formatted)
+        return "\n".join(self._format_node(node) for node in nodes)
 
     def _format_edges(self, edges: List[Dict]) -> str:
         """Format edges/facts for prompt"""
         if not edges:
             return "None"
 
-        formatted = []
-        for edge in edges[:50]:  # Limit for context window
-            fact = edge.get('fact', '')
-            relation = edge.get('name', '')
-            temporal = ""
-            if edge.get('valid_at'):
-                temporal = f" (valid from {edge['valid_at']})"
-
-            formatted.append(f"- [{relation}] {fact}{temporal}")
-
-        if len(edges) > 50:
-            formatted.append(f"... and {len(edges) - 50} more facts")
-
-        return "\n".join(formatted)
+        return "\n".join(self._format_edge(edge) for edge in edges)
 
     def _format_communities(self, communities: List[Dict]) -> str:
         """Format community summaries for prompt"""
         if not communities:
             return "None"
 
-        formatted = []
-        for comm in communities[:10]:
-            formatted.append(
-                f"- {comm.get('name', 'Community')}: {comm.get('summary', 'No summary')}"
-            )
+        return "\n".join(self._format_community(comm) for comm in communities)
+
+    @staticmethod
+    def _format_node(node: Dict) -> str:
+        return f"- {node.get('name', 'Unknown')}: {node.get('summary', 'No summary')}"
+
+    @staticmethod
+    def _format_edge(edge: Dict) -> str:
+        fact = edge.get('fact', '')
+        relation = edge.get('name', '')
+        temporal = ""
+        if edge.get('valid_at'):
+            temporal = f" (valid from {edge['valid_at']})"
+
+        return f"- [{relation}] {fact}{temporal}"
 
-        return "\n".join(formatted)
+    @staticmethod
+    def _format_community(comm: Dict) -> str:
+        return f"- {comm.get('name', 'Community')}: {comm.get('summary', 'No summary')}"
 
 
 class ReflectionNode:
@@ -696,15 +729,17 @@ class ReflectionNode:
 
 # ==================== GRAPH CONSTRUCTION ====================
 
-def create_graph_search_agent(graphiti):
+def create_graph_search_agent(graphiti, search_client=None):
     """
     Construct the LangGraph workflow for comprehensive graph search.
     :param graphiti:
+    :param search_client: optional replacement for `graphiti.search_`, e.g. a CachedGraphitiSearch
     """
 
     # Create configuration
     config = GraphAgentConfig(
         graphiti_client=graphiti,
+        search_client=search_client,
         search_depth=3,  # 3 rounds of exploration
         max_results_per_round=15,
         enable_reflection=True,
@@ -720,41 +755,50 @@ def create_graph_search_agent(graphiti):
     # Create state graph
     workflow = StateGraph(GraphSearchState)
 
-    # Add nodes
-    workflow.add_node("graph_query", graph_query)
-    workflow.add_node("graph_tools", graph_tools)
-    workflow.add_node("synthesis", synthesis)
-    workflow.add_node("reflection", reflection)
+    # Add nodes, each timed and counted into `node_metrics`
+    workflow.add_node("graph_query", instrument_node("graph_query", graph_query))
+    workflow.add_node("graph_tools", instrument_node("graph_tools", graph_tools))
+    workflow.add_node("synthesis", instrument_node("synthesis", synthesis))
+    workflow.add_node("intermediate_synthesis", instrument_node("intermediate_synthesis", synthesis.intermediate))
+    workflow.add_node("reflection", instrument_node("reflection", reflection))
 
     # Define edges
     workflow.set_entry_point("graph_query")
     workflow.add_edge("graph_query", "graph_tools")
 
-    # Conditional edge after graph_tools: continue exploring or synthesize
-    def should_continue_exploration(state: GraphSearchState) -> str:
+    # Conditional edge after graph_tools: continue exploring or synthesize.
+    # When exploring further, the summary of the finished round is fanned out
+    # next to the next round's query generation instead of running before it.
+    # Both branches share a superstep, so every intermediate synthesis is joined
+    # before graph_tools runs again and therefore before the final synthesis.
+    def should_continue_exploration(state: GraphSearchState) -> List[str]:
         current_depth = state.current_depth
         max_depth = state.search_depth
 
         # Early termination: if depth 1 returned no results, skip to synthesis
         if current_depth == 1 and not state.nodes and not state.edges and not state.communities:
-            return "synthesis"
+            return ["synthesis"]
 
         if current_depth < max_depth:
-            # Continue exploring
-            return "graph_query"
+            # Continue exploring while summarizing the previous round
+            return ["graph_query", "intermediate_synthesis"]
         else:
             # Done exploring, synthesize
-            return "synthesis"
+            return ["synthesis"]
 
     workflow.add_conditional_edges(
         "graph_tools",
         should_continue_exploration,
         {
             "graph_query": "graph_query",
+            "intermediate_synthesis": "intermediate_synthesis",
             "synthesis": "synthesis"
         }
     )
 
+    # The intermediate branch ends on its own; exploration carries on in parallel
+    workflow.add_edge("intermediate_synthesis", END)
+
     # After synthesis, go to reflection
     workflow.add_edge("synthesis", "reflection")
 
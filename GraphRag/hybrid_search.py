@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import math
+import os
+import re
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from graph_maintenance import dataset_graph_engine, graph_stamp
+
+logger = logging.getLogger(__name__)
+
+# search_type selecting the hybrid fast path of /search
+HYBRID_SEARCH_TYPE = "HYBRID"
+DEFAULT_TOP_K = int(os.environ.get("HYBRID_TOP_K", 10))
+# Candidates each ranker contributes to the fusion
+DEFAULT_CANDIDATES = int(os.environ.get("HYBRID_CANDIDATES", 50))
+# Reciprocal rank fusion constant; larger values flatten the difference between top ranks
+DEFAULT_RRF_K = int(os.environ.get("HYBRID_RRF_K", 60))
+# Lexical indexes of this many graphs are kept in memory
+DEFAULT_MAX_INDEXES = int(os.environ.get("HYBRID_MAX_INDEXES", 32))
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+CHUNK_COLLECTION = "DocumentChunk_text"
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    # Same tokens as cognee's CHUNKS_LEXICAL (JaccardChunksRetriever)
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """Okapi BM25 over the document chunks of one graph, with an inverted index so only matching chunks are scored"""
+
+    def __init__(self, chunks: Dict[str, str]):
+        self.ids = list(chunks)
+        self.texts = [chunks[chunk_id] for chunk_id in self.ids]
+        self._positions = {chunk_id: position for position, chunk_id in enumerate(self.ids)}
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._lengths: List[int] = []
+        for position, text in enumerate(self.texts):
+            tokens = tokenize(text)
+            self._lengths.append(len(tokens))
+            for token, count in Counter(tokens).items():
+                self._postings.setdefault(token, []).append((position, count))
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        """The `limit` best chunks as (chunk id, score), best first"""
+        documents = len(self.ids)
+        scores: Dict[int, float] = {}
+        for token in set(tokenize(query)):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, count in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[position] / self._average_length)
+                scores[position] = scores.get(position, 0.0) + idf * count * (BM25_K1 + 1) / (count + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(self.ids[position], score) for position, score in best]
+
+    def text(self, chunk_id: str) -> Optional[str]:
+        position = self._positions.get(chunk_id)
+        return self.texts[position] if position is not None else None
+
+
+def reciprocal_rank_fusion(rankings: Dict[str, List[str]], k: int = DEFAULT_RRF_K) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: every id scores sum(1 / (k + rank)) over the lists it appears in (ranks from 1)"""
+    fused: Dict[str, float] = {}
+    for ranking in rankings.values():
+        for rank, item_id in enumerate(ranking, start=1):
+            fused[item_id] = fused.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridChunkSearch:
+    """
+    Retrieval without an LLM: BM25 over an adventure's chunks and vector search on
+    cognee's DocumentChunk_text collection run side by side and are fused with
+    reciprocal rank fusion; the best chunks are returned with their scores.
+
+    The BM25 index of a graph is built on first use and rebuilt after the graph
+    changed, unlike CHUNKS_LEXICAL, which reloads and scores every chunk per query.
+    """
+
+    def __init__(
+            self,
+            candidates: int = DEFAULT_CANDIDATES,
+            rrf_k: int = DEFAULT_RRF_K,
+            max_indexes: int = DEFAULT_MAX_INDEXES
+    ):
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.max_indexes = max_indexes
+        self._indexes: "OrderedDict[str, Tuple[Tuple[Any, ...], BM25Index]]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.searches = 0
+        self.builds = 0
+        self.build_seconds = 0.0
+
+    async def _lexical_index(self, engine) -> BM25Index:
+        path = engine.db_path
+        async with self._locks.setdefault(path, asyncio.Lock()):
+            stamp = graph_stamp(path)
+            entry = self._indexes.get(path)
+            if entry is not None and entry[0] == stamp:
+                self._indexes.move_to_end(path)
+                return entry[1]
+            started = time.perf_counter()
+            nodes, _ = await engine.get_filtered_graph_data([{"type": ["DocumentChunk"]}])
+            chunks = {str(node_id): node["text"] for node_id, node in nodes if node.get("text")}
+            index = await asyncio.to_thread(BM25Index, chunks)
+            self.builds += 1
+            self.build_seconds += time.perf_counter() - started
+            # A write that committed while the chunks were read makes the next search rebuild
+            self._indexes[path] = (stamp if graph_stamp(path) == stamp else None, index)
+            self._indexes.move_to_end(path)
+            while len(self._indexes) > self.max_indexes:
+                evicted, _ = self._indexes.popitem(last=False)
+                self._locks.pop(evicted, None)
+            return index
+
+    async def _search_dataset(self, dataset_name: str, dataset_id: str, owner_id: str,
+                              query: str, top_k: int) -> List[Dict[str, Any]]:
+        from cognee.infrastructure.databases.vector import get_vector_engine
+        from cognee.infrastructure.databases.vector.exceptions.exceptions import CollectionNotFoundError
+
+        engine = await dataset_graph_engine(dataset_id, owner_id)
+        vector_engine = get_vector_engine()
+
+        async def vector_search():
+            try:
+                return await vector_engine.search(CHUNK_COLLECTION, query, limit=self.candidates, include_payload=True)
+            except CollectionNotFoundError:
+                # Nothing was cognified yet
+                return []
+
+        vector_task = asyncio.create_task(vector_search())
+        try:
+            index = await self._lexical_index(engine)
+            lexical = index.search(query, self.candidates)
+        finally:
+            found = await vector_task
+
+        vector_texts = {str(result.id): (result.payload or {}).get("text") for result in found}
+        rankings = {
+            "lexical": [chunk_id for chunk_id, _ in lexical],
+            "vector": [str(result.id) for result in found]
+        }
+        lexical_scores = dict(lexical)
+        # Distances normalized to 0..1 by cognee: lower is closer
+        vector_distances = {str(result.id): result.score for result in found}
+        results = []
+        for chunk_id, score in reciprocal_rank_fusion(rankings, self.rrf_k)[:top_k]:
+            text = vector_texts.get(chunk_id) or index.text(chunk_id)
+            if not text:
+                continue
+            results.append({
+                "dataset_name": dataset_name,
+                "id": chunk_id,
+                "text": text,
+                "score": score,
+                "lexical_score": lexical_scores.get(chunk_id),
+                "vector_distance": vector_distances.get(chunk_id)
+            })
+        return results
+
+    async def search(self, datasets: List[Tuple[str, str, str]], query: str,
+                     top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Search (name, id, owner id) datasets in parallel; returns at most `top_k` chunks
+        (HYBRID_TOP_K by default) over all of them, best fused score first.
+        """
+        top_k = top_k or DEFAULT_TOP_K
+        self.searches += 1
+        # Each dataset searches in its own task, as it switches cognee to that dataset's stores
+        per_dataset = await asyncio.gather(*(
+            self._search_dataset(name, dataset_id, owner_id, query, top_k) for name, dataset_id, owner_id in datasets
+        ))
+        results = [result for dataset_results in per_dataset for result in dataset_results]
+        results.sort(key=lambda result: result["score"], reverse=True)
+        return results[:top_k]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "searches": self.searches,
+            "indexes": len(self._indexes),
+            "max_indexes": self.max_indexes,
+            "builds": self.builds,
+            "build_seconds": round(self.build_seconds, 3),
+            "candidates": self.candidates,
+            "rrf_k": self.rrf_k
+        }
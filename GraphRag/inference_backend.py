@@ -0,0 +1,84 @@
+import glob
+import logging
+import os
+import platform
+import re
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# "torch" (fp32 PyTorch), "onnx" (ONNX Runtime fp32) or "onnx-int8" (ONNX Runtime, dynamic int8 quantization)
+SUPPORTED_BACKENDS = ("torch", "onnx", "onnx-int8")
+DEFAULT_RERANKER_BACKEND = os.environ.get("RERANKER_BACKEND", "torch")
+DEFAULT_EMBEDDING_BACKEND = os.environ.get("LOCAL_EMBEDDING_BACKEND", "torch")
+# Instruction set the int8 kernels are tuned for: arm64, avx2, avx512 or avx512_vnni
+DEFAULT_QUANTIZATION = os.environ.get(
+    "ONNX_QUANTIZATION",
+    "arm64" if platform.machine().lower() in ("arm64", "aarch64") else "avx2"
+)
+# Quantized exports are written once and reused across restarts
+DEFAULT_EXPORT_DIR = os.environ.get(
+    "ONNX_EXPORT_DIR",
+    os.path.join(os.environ.get("SYSTEM_ROOT_DIRECTORY", "."), "onnx_models")
+)
+
+
+def _model_kwargs(backend: str, num_threads: int) -> Optional[Dict[str, Any]]:
+    if backend == "torch" or num_threads <= 0:
+        return None
+    import onnxruntime
+    session_options = onnxruntime.SessionOptions()
+    session_options.intra_op_num_threads = num_threads
+    return {"session_options": session_options}
+
+
+def _quantized_file(directory: str, quantization: str) -> Optional[str]:
+    matches = sorted(glob.glob(os.path.join(directory, "onnx", f"model_*_{quantization}.onnx")))
+    return os.path.relpath(matches[0], directory) if matches else None
+
+
+def load_model(
+        model_cls,
+        model_name: str,
+        backend: str,
+        num_threads: int = 0,
+        quantization: str = DEFAULT_QUANTIZATION,
+        export_dir: str = DEFAULT_EXPORT_DIR
+):
+    """
+    Load a sentence-transformers model (CrossEncoder or SentenceTransformer) on the given backend.
+    The int8 backend exports and quantizes the model on first use, then loads the cached export.
+    """
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend}. Must be one of: {', '.join(SUPPORTED_BACKENDS)}")
+
+    model_kwargs = _model_kwargs(backend, num_threads)
+    if backend == "torch":
+        return model_cls(model_name)
+    if backend == "onnx":
+        return model_cls(model_name, backend="onnx", model_kwargs=model_kwargs)
+
+    target = os.path.join(export_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+    file_name = _quantized_file(target, quantization)
+    if file_name is None:
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        logger.info(f"Exporting {model_name} to ONNX with int8 dynamic quantization ({quantization})")
+        model = model_cls(model_name, backend="onnx")
+        model.save_pretrained(target)
+        export_dynamic_quantized_onnx_model(model, quantization, target)
+        file_name = _quantized_file(target, quantization)
+
+    logger.info(f"Loading int8 model {model_name} from {os.path.join(target, file_name)}")
+    return model_cls(target, backend="onnx", model_kwargs={**(model_kwargs or {}), "file_name": file_name})
+
+
+def load_cross_encoder(model_name: str, backend: str = DEFAULT_RERANKER_BACKEND, num_threads: int = 0):
+    from sentence_transformers import CrossEncoder
+    return load_model(CrossEncoder, model_name, backend, num_threads)
+
+
+def load_sentence_transformer(model_name: str, backend: str = DEFAULT_EMBEDDING_BACKEND, num_threads: int = 0):
+    """For locally computed embeddings; both services currently embed through a remote endpoint"""
+    from sentence_transformers import SentenceTransformer
+    return load_model(SentenceTransformer, model_name, backend, num_threads)
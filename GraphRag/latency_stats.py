@@ -0,0 +1,10 @@
+from typing import Iterable, Optional
+
+
+def percentile_ms(samples: Iterable[float], percentile: float) -> Optional[float]:
+    """Percentile of latencies in seconds, in milliseconds (the closest sample; None without samples)"""
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+    return round(ordered[index] * 1000, 2)
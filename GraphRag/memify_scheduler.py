@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# A memify run starts once no new request for its dataset arrived for this long
+DEFAULT_DEBOUNCE_SECONDS = float(os.environ.get("MEMIFY_DEBOUNCE_SECONDS", 5))
+# ... but no later than this after the first request it serves, even if requests keep coming
+DEFAULT_MAX_DELAY_SECONDS = float(os.environ.get("MEMIFY_MAX_DELAY_SECONDS", 30))
+# Memify runs at once across datasets; each one makes many LLM calls
+DEFAULT_MAX_CONCURRENT_RUNS = int(os.environ.get("MEMIFY_MAX_CONCURRENT", 2))
+
+
+@dataclass
+class _PendingRun:
+    future: asyncio.Future
+    first_request: float
+    last_request: float
+    requests: int = 1
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+
+class MemifyScheduler:
+    """
+    Debounces and coalesces memify runs per dataset.
+
+    - Requests for a dataset are collected for `debounce_seconds` after the latest one
+      (at most `max_delay_seconds` after the first) and served by a single run.
+    - A run only starts once the dataset's previous run finished; requests arriving
+      until then join it, so every request is served by a run that started after it.
+    - Runs of different datasets proceed in parallel, at most `max_concurrent` at once.
+
+    Every request gets the result (or exception) of the run that served it. With several
+    workers each process coalesces its own requests; the write locks still serialize them.
+    """
+
+    def __init__(
+            self,
+            debounce_seconds: float = DEFAULT_DEBOUNCE_SECONDS,
+            max_delay_seconds: float = DEFAULT_MAX_DELAY_SECONDS,
+            max_concurrent: int = DEFAULT_MAX_CONCURRENT_RUNS
+    ):
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max(max_delay_seconds, debounce_seconds)
+        self.max_concurrent = max_concurrent
+        self._pending: Dict[str, _PendingRun] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._slots = asyncio.Semaphore(max_concurrent) if max_concurrent > 0 else None
+        self._tasks: Set[asyncio.Task] = set()
+        self.running = 0
+        self.requests = 0
+        self.runs = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    async def memify(self, dataset: str, run: Callable[[str], Awaitable[Any]]) -> Any:
+        """Request a memify of `dataset`; `run(dataset)` performs it and its result is returned to every merged request"""
+        now = time.monotonic()
+        self.requests += 1
+        pending = self._pending.get(dataset)
+        if pending is None:
+            pending = _PendingRun(future=asyncio.get_running_loop().create_future(), first_request=now, last_request=now)
+            self._pending[dataset] = pending
+            pending.task = asyncio.create_task(self._run(dataset, pending, run))
+            self._tasks.add(pending.task)
+            pending.task.add_done_callback(self._tasks.discard)
+        else:
+            pending.requests += 1
+            pending.last_request = now
+            self.coalesced += 1
+        # The run goes on for the other requests if this one is cancelled
+        return await asyncio.shield(pending.future)
+
+    async def _run(self, dataset: str, pending: _PendingRun, run: Callable[[str], Awaitable[Any]]) -> None:
+        try:
+            while True:
+                start_at = min(pending.last_request + self.debounce_seconds, pending.first_request + self.max_delay_seconds)
+                delay = start_at - time.monotonic()
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+
+            lock = self._locks.setdefault(dataset, asyncio.Lock())
+            async with lock:
+                if self._slots is not None:
+                    await self._slots.acquire()
+                try:
+                    # Requests arriving from now on need a run of their own
+                    self._pending.pop(dataset, None)
+                    if pending.requests > 1:
+                        logger.info("Memify of %s serves %d requests", dataset, pending.requests)
+                    self.running += 1
+                    try:
+                        result = await run(dataset)
+                    finally:
+                        self.running -= 1
+                        self.runs += 1
+                finally:
+                    if self._slots is not None:
+                        self._slots.release()
+            if not lock.locked() and dataset not in self._pending:
+                self._locks.pop(dataset, None)
+        except asyncio.CancelledError:
+            if self._pending.get(dataset) is pending:
+                del self._pending[dataset]
+            pending.future.cancel()
+            raise
+        except Exception as e:
+            self.failures += 1
+            pending.future.set_exception(e)
+            # Mark the exception as retrieved in case every request was cancelled
+            pending.future.exception()
+        else:
+            pending.future.set_result(result)
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "debounce_seconds": self.debounce_seconds,
+            "max_delay_seconds": self.max_delay_seconds,
+            "max_concurrent": self.max_concurrent,
+            "pending": sorted(self._pending),
+            "running": self.running,
+            "requests": self.requests,
+            "runs": self.runs,
+            "coalesced": self.coalesced,
+            "failures": self.failures
+        }
@@ -0,0 +1,159 @@
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+from neo4j import AsyncGraphDatabase
+from neo4j.exceptions import ConnectionAcquisitionTimeoutError
+
+from graphiti_core.driver.neo4j_driver import Neo4jDriver
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATABASE = os.environ.get("NEO4J_DATABASE", "neo4j")
+DEFAULT_MAX_POOL_SIZE = int(os.environ.get("NEO4J_MAX_POOL_SIZE", 100))
+DEFAULT_ACQUISITION_TIMEOUT = float(os.environ.get("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", 60.0))
+DEFAULT_FETCH_SIZE = int(os.environ.get("NEO4J_FETCH_SIZE", 1000))
+DEFAULT_MAX_CONNECTION_LIFETIME = float(os.environ.get("NEO4J_MAX_CONNECTION_LIFETIME", 3600))
+
+
+class _TrackedSession:
+    """Session proxy counting the session as in flight while it is open"""
+
+    def __init__(self, session, driver: "PooledNeo4jDriver"):
+        self._session = session
+        self._driver = driver
+
+    async def __aenter__(self):
+        self._driver._begin()
+        try:
+            await self._session.__aenter__()
+        except BaseException:
+            self._driver._end(0.0)
+            raise
+        self._started = time.perf_counter()
+        return self._session
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            return await self._session.__aexit__(exc_type, exc, tb)
+        finally:
+            self._driver._end(time.perf_counter() - self._started)
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+class PooledNeo4jDriver(Neo4jDriver):
+    """
+    Graphiti Neo4j driver with a configurable connection pool.
+
+    Every query, session and transaction counts as one borrowed connection while
+    it runs, so pool saturation (in-flight vs pool size, peak usage and
+    acquisition timeouts) can be observed instead of queueing silently.
+    """
+
+    def __init__(
+            self,
+            uri: str,
+            user: str | None,
+            password: str | None,
+            database: str = DEFAULT_DATABASE,
+            max_pool_size: int = DEFAULT_MAX_POOL_SIZE,
+            acquisition_timeout: float = DEFAULT_ACQUISITION_TIMEOUT,
+            fetch_size: int = DEFAULT_FETCH_SIZE,
+            max_connection_lifetime: float = DEFAULT_MAX_CONNECTION_LIFETIME
+    ):
+        super().__init__(uri, user, password, database=database)
+        # Replace the default client built by the base class before it opened any connection
+        default_client = self.client
+        self.client = AsyncGraphDatabase.driver(
+            uri=uri,
+            auth=(user or "", password or ""),
+            max_connection_pool_size=max_pool_size,
+            connection_acquisition_timeout=acquisition_timeout,
+            fetch_size=fetch_size,
+            max_connection_lifetime=max_connection_lifetime
+        )
+        self._default_client = default_client
+        self.database = database
+        self.max_pool_size = max_pool_size
+        self.acquisition_timeout = acquisition_timeout
+        self.fetch_size = fetch_size
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.acquisition_timeouts = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def _begin(self) -> None:
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        if self.in_flight > self.max_pool_size:
+            logger.warning(f"Neo4j pool saturated: {self.in_flight} operations for {self.max_pool_size} connections")
+
+    def _end(self, seconds: float) -> None:
+        self.in_flight -= 1
+        self.completed += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    async def execute_query(self, cypher_query_, **kwargs: Any):
+        self._begin()
+        started = time.perf_counter()
+        try:
+            return await super().execute_query(cypher_query_, **kwargs)
+        except ConnectionAcquisitionTimeoutError:
+            self.acquisition_timeouts += 1
+            raise
+        finally:
+            self._end(time.perf_counter() - started)
+
+    @asynccontextmanager
+    async def transaction(self):
+        self._begin()
+        started = time.perf_counter()
+        try:
+            async with super().transaction() as tx:
+                yield tx
+        except ConnectionAcquisitionTimeoutError:
+            self.acquisition_timeouts += 1
+            raise
+        finally:
+            self._end(time.perf_counter() - started)
+
+    def session(self, database: str | None = None):
+        return _TrackedSession(super().session(database), self)
+
+    async def close(self) -> None:
+        await super().close()
+        await self._default_client.close()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        stats = {
+            "database": self.database,
+            "max_pool_size": self.max_pool_size,
+            "acquisition_timeout_seconds": self.acquisition_timeout,
+            "fetch_size": self.fetch_size,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "saturation": round(self.in_flight / self.max_pool_size, 4) if self.max_pool_size else None,
+            "completed": self.completed,
+            "acquisition_timeouts": self.acquisition_timeouts,
+            "avg_seconds": round(self.total_seconds / self.completed, 4) if self.completed else None,
+            "max_seconds": round(self.max_seconds, 4)
+        }
+        # Connection counts come from the driver's private pool and may be missing in other versions
+        pool = getattr(self.client, "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is not None:
+            stats["connections"] = {
+                str(address): {
+                    "open": len(conns),
+                    "in_use": pool.in_use_connection_count(address)
+                }
+                for address, conns in list(connections.items())
+            }
+        return stats
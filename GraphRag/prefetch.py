@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PENDING = int(os.environ.get("PREFETCH_MAX_PENDING", 200))
+IDLE_POLL_SECONDS = 0.05
+
+PrefetchJob = Callable[[], Awaitable[Any]]
+
+
+class PrefetchScheduler:
+    """
+    Low-priority background runner for cache warming jobs.
+
+    Jobs run one at a time and only while no foreground request (wrapped in
+    `foreground()`) is in progress, so prefetching never competes with
+    latency-sensitive searches. When the backlog is full, new jobs are dropped.
+    """
+
+    def __init__(self, max_pending: int = DEFAULT_MAX_PENDING):
+        self.max_pending = max_pending
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._active = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.deferred_seconds = 0.0
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    @asynccontextmanager
+    async def foreground(self):
+        """Mark a latency-sensitive request as running; prefetch jobs wait until none are"""
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+
+    def submit(self, job: PrefetchJob) -> bool:
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            job = await self._queue.get()
+            started = time.perf_counter()
+            while self._active:
+                await asyncio.sleep(IDLE_POLL_SECONDS)
+            self.deferred_seconds += time.perf_counter() - started
+            try:
+                await job()
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"{type(e).__name__}: Prefetch job failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "max_pending": self.max_pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "deferred_seconds": round(self.deferred_seconds, 3)
+        }
@@ -0,0 +1,336 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from uuid import UUID
+
+from shared_state import ALL_DATASETS, DEFAULT_STATE_DIRECTORY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOMBSTONE_PATH = os.environ.get("TOMBSTONE_PATH", os.path.join(DEFAULT_STATE_DIRECTORY, "tombstones.db"))
+# Pause between reclamation steps, so the compactor never saturates the disk or the relational database
+DEFAULT_STEP_PAUSE_SECONDS = float(os.environ.get("RECLAIM_STEP_PAUSE_SECONDS", 0.05))
+DEFAULT_RESULT_TTL_SECONDS = int(os.environ.get("RECLAIM_RESULT_TTL_SECONDS", 24 * 60 * 60))
+POLL_SECONDS = 5.0
+WAIT_POLL_SECONDS = 0.2
+# A reclamation without progress for this long was interrupted (crash or restart) and is retried
+STALE_SECONDS = 600
+
+PENDING = "pending"
+RECLAIMING = "reclaiming"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tombstones (
+    dataset_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    owner_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    steps_done INTEGER NOT NULL DEFAULT 0,
+    steps_total INTEGER,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_tombstones_name_state ON tombstones (name, state);
+"""
+
+# reclaim(tombstone, progress) deletes a dataset's data; progress(done, total) reports each step
+Reclaimer = Callable[[Dict[str, Any], Callable[[int, Optional[int]], Awaitable[None]]], Awaitable[None]]
+
+
+class TombstoneCompactor:
+    """
+    Logical deletion of adventures with background reclamation.
+
+    `tombstone()` only records the dataset as deleted, so /delete and /nuke return at once;
+    endpoints hide tombstoned adventures. The compactor then reclaims one dataset at a time
+    with pauses between steps. Tombstones live in SQLite next to the other shared state, so
+    every worker hides the same adventures and exactly one worker claims each reclamation.
+    Writing to a tombstoned name first finishes its reclamation (`reclaim_now`), since the
+    new data would otherwise land in the dataset that is being deleted.
+
+    /nuke records a single tombstone named ALL_DATASETS: it hides every adventure, and its
+    reclamation wipes all of cognee's data and system state. Any write finishes it first,
+    so the wipe never deletes data written after the nuke.
+    """
+
+    def __init__(
+            self,
+            reclaim: Reclaimer,
+            path: str = DEFAULT_TOMBSTONE_PATH,
+            step_pause_seconds: float = DEFAULT_STEP_PAUSE_SECONDS,
+            result_ttl_seconds: int = DEFAULT_RESULT_TTL_SECONDS
+    ):
+        self.reclaim = reclaim
+        self.path = path
+        self.step_pause_seconds = step_pause_seconds
+        self.result_ttl = timedelta(seconds=result_ttl_seconds)
+        self._db: Optional[sqlite3.Connection] = None
+        self._wake = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+
+    # ==================== LIFECYCLE ====================
+
+    def start(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # ==================== PUBLIC API ====================
+
+    def tombstone(self, dataset_id: str, name: str, owner_id: str) -> Dict[str, Any]:
+        now = datetime.now().isoformat()
+        self._db.execute(
+            "INSERT INTO tombstones (dataset_id, name, owner_id, state, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(dataset_id) DO UPDATE SET state = excluded.state, error = NULL, updated_at = excluded.updated_at "
+            "WHERE tombstones.state IN (?, ?)",
+            (dataset_id, name, owner_id, PENDING, now, now, DONE, FAILED)
+        )
+        self._wake.set()
+        return self.get(dataset_id)
+
+    def hidden(self, names: Iterable[str]) -> List[str]:
+        """The given adventure names that are tombstoned and not yet fully reclaimed"""
+        names = list(names)
+        if not names:
+            return []
+        if self._pending(ALL_DATASETS):
+            return list(dict.fromkeys(names))
+        placeholders = ",".join("?" * len(names))
+        rows = self._db.execute(
+            f"SELECT DISTINCT name FROM tombstones WHERE state != ? AND name IN ({placeholders})",
+            (DONE, *names)
+        ).fetchall()
+        return [row["name"] for row in rows]
+
+    def visible(self, names: Iterable[str]) -> List[str]:
+        names = list(names)
+        hidden = set(self.hidden(names))
+        return [name for name in names if name not in hidden]
+
+    async def reclaim_now(self, names: Iterable[str]) -> None:
+        """
+        Finish the reclamation of any of these tombstoned adventures before they are written again,
+        after a pending wipe of all adventures
+        """
+        for name in [ALL_DATASETS] + list(dict.fromkeys(names)):
+            attempted = set()
+            while True:
+                row = self._db.execute(
+                    "SELECT * FROM tombstones WHERE name = ? AND state != ? ORDER BY created_at LIMIT 1",
+                    (name, DONE)
+                ).fetchone()
+                if row is None:
+                    break
+                if row["state"] == FAILED:
+                    if row["dataset_id"] in attempted:
+                        raise RuntimeError(f"Reclamation of deleted adventure '{name}' failed: {row['error']}")
+                    # Retry a reclamation that failed earlier
+                    self._finish(row["dataset_id"], PENDING, row["error"])
+                    continue
+                if self._claim(row["dataset_id"]):
+                    attempted.add(row["dataset_id"])
+                    logger.info("Reclaiming deleted adventure %s before it is written again", name)
+                    await self._reclaim(dict(row))
+                else:
+                    await asyncio.sleep(WAIT_POLL_SECONDS)
+
+    def _pending(self, name: str) -> bool:
+        return self._db.execute(
+            "SELECT 1 FROM tombstones WHERE name = ? AND state != ? LIMIT 1", (name, DONE)
+        ).fetchone() is not None
+
+    def get(self, dataset_id: str) -> Optional[Dict[str, Any]]:
+        row = self._db.execute("SELECT * FROM tombstones WHERE dataset_id = ?", (dataset_id,)).fetchone()
+        return self._record(row) if row is not None else None
+
+    def status(self, name: Optional[str] = None) -> Dict[str, Any]:
+        if name is None:
+            rows = self._db.execute("SELECT * FROM tombstones ORDER BY created_at DESC").fetchall()
+        else:
+            rows = self._db.execute(
+                "SELECT * FROM tombstones WHERE name = ? ORDER BY created_at DESC", (name,)
+            ).fetchall()
+        counts = {state: 0 for state in (PENDING, RECLAIMING, DONE, FAILED)}
+        for row in rows:
+            counts[row["state"]] += 1
+        return {"counts": counts, "tombstones": [self._record(row) for row in rows]}
+
+    # ==================== COMPACTION ====================
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                self._expire_finished()
+                row = self._next()
+                if row is not None and self._claim(row["dataset_id"]):
+                    await self._reclaim(dict(row))
+                    self._wake.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"{type(e).__name__}: Error in the reclamation loop: {str(e)}")
+
+    def _next(self) -> Optional[sqlite3.Row]:
+        stale = (datetime.now() - timedelta(seconds=STALE_SECONDS)).isoformat()
+        return self._db.execute(
+            "SELECT * FROM tombstones WHERE state = ? OR (state = ? AND updated_at < ?) ORDER BY created_at LIMIT 1",
+            (PENDING, RECLAIMING, stale)
+        ).fetchone()
+
+    def _claim(self, dataset_id: str) -> bool:
+        """Atomically take a pending (or stale) reclamation; only one worker wins"""
+        now = datetime.now()
+        stale = (now - timedelta(seconds=STALE_SECONDS)).isoformat()
+        return self._db.execute(
+            "UPDATE tombstones SET state = ?, updated_at = ? "
+            "WHERE dataset_id = ? AND (state = ? OR (state = ? AND updated_at < ?))",
+            (RECLAIMING, now.isoformat(), dataset_id, PENDING, RECLAIMING, stale)
+        ).rowcount == 1
+
+    async def _reclaim(self, tombstone: Dict[str, Any]) -> None:
+        dataset_id = tombstone["dataset_id"]
+        started = time.perf_counter()
+
+        async def progress(done: int, total: Optional[int]) -> None:
+            self._db.execute(
+                "UPDATE tombstones SET steps_done = ?, steps_total = COALESCE(?, steps_total), updated_at = ? "
+                "WHERE dataset_id = ?",
+                (done, total, datetime.now().isoformat(), dataset_id)
+            )
+            await asyncio.sleep(self.step_pause_seconds)
+
+        try:
+            wiped_before = datetime.now().isoformat()
+            await self.reclaim(tombstone, progress)
+            self._finish(dataset_id, DONE)
+            if tombstone["name"] == ALL_DATASETS:
+                # The wipe also removed every adventure tombstoned before it
+                self._db.execute(
+                    "UPDATE tombstones SET state = ?, error = NULL, updated_at = ? "
+                    "WHERE state != ? AND name != ? AND created_at <= ?",
+                    (DONE, datetime.now().isoformat(), DONE, ALL_DATASETS, wiped_before)
+                )
+            logger.info("Reclaimed adventure %s in %.1fs", tombstone["name"], time.perf_counter() - started)
+        except asyncio.CancelledError:
+            # Shutdown: left as reclaiming, so it is retried once stale
+            raise
+        except Exception as e:
+            logger.error(f"{type(e).__name__}: Error reclaiming adventure {tombstone['name']}: {str(e)}")
+            self._finish(dataset_id, FAILED, f"{type(e).__name__}: {str(e)}")
+
+    def _finish(self, dataset_id: str, state: str, error: Optional[str] = None) -> None:
+        self._db.execute(
+            "UPDATE tombstones SET state = ?, error = ?, updated_at = ? WHERE dataset_id = ?",
+            (state, error, datetime.now().isoformat(), dataset_id)
+        )
+
+    def _expire_finished(self) -> None:
+        cutoff = (datetime.now() - self.result_ttl).isoformat()
+        self._db.execute("DELETE FROM tombstones WHERE state = ? AND updated_at < ?", (DONE, cutoff))
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "adventure_id": row["name"],
+            "dataset_id": row["dataset_id"],
+            "state": row["state"],
+            "steps_done": row["steps_done"],
+            "steps_total": row["steps_total"],
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"]
+        }
+
+
+# ==================== COGNEE RECLAMATION STEPS ====================
+
+async def prune_everything() -> None:
+    """Delete all stored data files and every graph, vector and relational database, with their caches"""
+    import cognee
+
+    await cognee.prune.prune_data()
+    await cognee.prune.prune_system(metadata=True)
+
+
+async def dataset_data_ids(dataset_id: str) -> List[UUID]:
+    """Data items linked to a dataset, read directly so it works after the dataset row is gone"""
+    from sqlalchemy import select
+    from cognee.infrastructure.databases.relational import get_relational_engine
+    from cognee.modules.data.models import DatasetData
+
+    async with get_relational_engine().get_async_session() as session:
+        return list(await session.scalars(
+            select(DatasetData.data_id).where(DatasetData.dataset_id == UUID(dataset_id))
+        ))
+
+
+async def delete_dataset_stores(dataset_id: str, owner_id: str) -> None:
+    """Drop the dataset's graph and vector stores and its dataset row (cognee's delete_dataset)"""
+    from cognee.modules.data.methods import delete_dataset, get_dataset
+
+    dataset = await get_dataset(UUID(owner_id), UUID(dataset_id))
+    if dataset is not None:
+        await delete_dataset(dataset)
+
+
+async def delete_orphaned_data(
+        dataset_id: str,
+        owner_id: str,
+        data_ids: List[UUID],
+        progress: Callable[[int, Optional[int]], Awaitable[None]],
+        steps_done: int = 0
+) -> int:
+    """
+    Unlink the dataset's data items and delete those no other dataset uses, with their
+    stored files; SQLite doesn't enforce the cascades, so links are removed explicitly.
+    """
+    from sqlalchemy import delete, func, select
+    from cognee.base_config import get_base_config
+    from cognee.infrastructure.databases.relational import get_relational_engine
+    from cognee.infrastructure.files.storage.config import file_storage_config
+    from cognee.modules.data.models import DatasetData
+
+    # Stored files live under the owner's directory, which cognee normally selects per request
+    file_storage_config.set({"data_root_directory": os.path.join(get_base_config().data_root_directory, owner_id)})
+    engine = get_relational_engine()
+    async with engine.get_async_session() as session:
+        await session.execute(delete(DatasetData).where(DatasetData.dataset_id == UUID(dataset_id)))
+        await session.commit()
+
+    deleted = 0
+    for data_id in data_ids:
+        async with engine.get_async_session() as session:
+            links = await session.scalar(select(func.count()).select_from(DatasetData).where(DatasetData.data_id == data_id))
+        if not links:
+            await engine.delete_data_entity(data_id)
+            deleted += 1
+        steps_done += 1
+        await progress(steps_done, None)
+    return deleted
@@ -0,0 +1,311 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from shared_state import ALL_DATASETS, SharedGenerations
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", 2048))
+DEFAULT_TTL_SECONDS = float(os.environ.get("SEARCH_CACHE_TTL_SECONDS", 900))
+DATASET_SEPARATOR = "\x1f"
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable short hash of the given parts, used to build cache keys"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()[:32]
+
+
+class GroupedResultCache:
+    """
+    Async LRU cache of expensive results, partitioned by group.
+
+    Concurrent lookups of the same key share a single computation (single-flight).
+    `invalidate(group)` drops every entry of that group and bumps the group's
+    generation, so computations that started before the write are not stored.
+    Generations are only kept while a group has computations in flight.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, Hashable, int], asyncio.Future] = {}
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    def generation(self, group: str) -> int:
+        return self._generations.get(group, 0)
+
+    def peek(self, group: str, key: Hashable) -> Tuple[bool, Any]:
+        """Return (found, value) without computing or touching hit statistics"""
+        entry = self._entries.get((group, key))
+        if entry is None or entry[0] < time.monotonic():
+            return False, None
+        return True, entry[1]
+
+    async def get_or_compute(self, group: str, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        cache_key = (group, key)
+        entry = self._entries.get(cache_key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at >= time.monotonic():
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return value
+            del self._entries[cache_key]
+
+        generation = self.generation(group)
+        inflight_key = (group, key, generation)
+        future = self._inflight.get(inflight_key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        # The computation runs in its own task, so a cancelled caller doesn't cancel it for the others
+        task = asyncio.create_task(self._compute(cache_key, generation, compute))
+        self._inflight[inflight_key] = task
+        task.add_done_callback(lambda done: self._computed(inflight_key, done))
+        return await asyncio.shield(task)
+
+    async def _compute(self, cache_key: Tuple[str, Hashable], generation: int,
+                       compute: Callable[[], Awaitable[Any]]) -> Any:
+        value = await compute()
+        if self.generation(cache_key[0]) == generation:
+            self._store(cache_key, value)
+        return value
+
+    def _computed(self, inflight_key: Tuple[str, Hashable, int], task: asyncio.Task) -> None:
+        self._inflight.pop(inflight_key, None)
+        group = inflight_key[0]
+        if group in self._generations and not self._has_inflight(group):
+            # No computation from before the last invalidation is left to reject
+            del self._generations[group]
+        if not task.cancelled():
+            # Mark the exception as retrieved when every caller was cancelled
+            task.exception()
+
+    def _store(self, cache_key: Tuple[str, Hashable], value: Any) -> None:
+        self._entries[cache_key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def groups(self) -> Set[str]:
+        """Groups with cached or in-flight results"""
+        return {cache_key[0] for cache_key in self._entries} | {inflight_key[0] for inflight_key in self._inflight}
+
+    def _has_inflight(self, group: str) -> bool:
+        return any(inflight_key[0] == group for inflight_key in self._inflight)
+
+    def _bump(self, group: str) -> None:
+        if self._has_inflight(group):
+            self._generations[group] = self.generation(group) + 1
+        else:
+            self._generations.pop(group, None)
+
+    def invalidate(self, group: str) -> int:
+        """Drop all entries of a group; returns the number of entries removed"""
+        self._bump(group)
+        stale = [cache_key for cache_key in self._entries if cache_key[0] == group]
+        for cache_key in stale:
+            del self._entries[cache_key]
+        self.invalidations += 1
+        logger.info(f"Invalidated {len(stale)} cached results for group {group}")
+        return len(stale)
+
+    def clear(self) -> None:
+        for group in self.groups():
+            self._bump(group)
+        self._entries.clear()
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "in_flight": len(self._inflight),
+            "invalidations": self.invalidations
+        }
+
+
+class CachedGraphitiSearch:
+    """
+    Drop-in for `graphiti.search_` that shares results across requests.
+    Keyed by (group_id, query, search config fingerprint and search arguments).
+    """
+
+    def __init__(self, graphiti, cache: Optional[GroupedResultCache] = None):
+        self.graphiti = graphiti
+        self.cache = cache or GroupedResultCache()
+
+    async def search_(
+            self,
+            query: str,
+            config,
+            group_ids: Optional[list[str]] = None,
+            center_node_uuid: Optional[str] = None,
+            bfs_origin_node_uuids: Optional[list[str]] = None,
+            search_filter=None
+    ):
+        async def compute():
+            return await self.graphiti.search_(
+                query=query,
+                config=config,
+                group_ids=group_ids,
+                center_node_uuid=center_node_uuid,
+                bfs_origin_node_uuids=bfs_origin_node_uuids,
+                search_filter=search_filter
+            )
+
+        # Multi-group searches can't be invalidated per group, so they bypass the cache
+        if not group_ids or len(group_ids) != 1:
+            return await compute()
+
+        key = fingerprint(
+            query,
+            config.model_dump_json(),
+            center_node_uuid,
+            sorted(bfs_origin_node_uuids or []),
+            search_filter.model_dump_json() if search_filter is not None else None
+        )
+        return await self.cache.get_or_compute(group_ids[0], key, compute)
+
+    def invalidate(self, group_id: str) -> int:
+        return self.cache.invalidate(group_id)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+
+class CachedCogneeSearch:
+    """
+    Shares `cognee.search` results across requests.
+    Results are grouped by the set of searched datasets, so a write to one dataset
+    invalidates every group that includes it. Searches of all datasets (no datasets
+    given) can't be invalidated per dataset, so they bypass the cache. Entries warmed with `prefetch=True`
+    are tracked to report how many later searches they served.
+
+    With `generations` (a shared_state.SharedGenerations), writes made by other
+    worker processes invalidate this process's entries as well.
+    """
+
+    def __init__(
+            self,
+            search: Callable[..., Awaitable[Any]],
+            cache: Optional[GroupedResultCache] = None,
+            generations: Optional[SharedGenerations] = None
+    ):
+        self.search = search
+        self.cache = cache or GroupedResultCache()
+        self.generations = generations
+        self._prefetched: Set[Tuple[str, str]] = set()
+        self.prefetches = 0
+        self.prefetch_hits = 0
+        self.lookups = 0
+        self.hits = 0
+
+    @staticmethod
+    def _group(datasets: List[str]) -> str:
+        return DATASET_SEPARATOR.join(sorted(set(datasets)))
+
+    async def search_(
+            self,
+            datasets: List[str],
+            query_type,
+            query_text: str,
+            prefetch: bool = False,
+            variant: Any = None,
+            **kwargs
+    ):
+        """`variant` tells apart searches whose results differ for the same query, e.g. tuned ANN parameters"""
+        self._sync(datasets)
+        group = self._group(datasets)
+        key = fingerprint(str(query_type), query_text) if variant is None else fingerprint(str(query_type), query_text, variant)
+
+        async def compute():
+            return await self.search(datasets=datasets, query_type=query_type, query_text=query_text, **kwargs)
+
+        if not datasets:
+            return await compute()
+
+        if prefetch:
+            self.prefetches += 1
+            self._prefetched.add((group, key))
+            if len(self._prefetched) > self.cache.max_entries:
+                # Forget prefetched results that were evicted or expired unused
+                self._prefetched = {entry for entry in self._prefetched if self.cache.peek(*entry)[0]}
+        else:
+            found, _ = self.cache.peek(group, key)
+            self.lookups += 1
+            if found:
+                self.hits += 1
+                if (group, key) in self._prefetched:
+                    self.prefetch_hits += 1
+                    self._prefetched.discard((group, key))
+        return await self.cache.get_or_compute(group, key, compute)
+
+    def _sync(self, datasets: List[str]) -> None:
+        if self.generations is None:
+            return
+        for dataset in self.generations.changed(datasets):
+            if dataset == ALL_DATASETS:
+                self._clear_local()
+            else:
+                self._invalidate_local(dataset)
+
+    def invalidate(self, dataset: str) -> int:
+        """Drop the results of every dataset group containing `dataset`"""
+        removed = self._invalidate_local(dataset)
+        if self.generations is not None:
+            self.generations.bump(dataset)
+        return removed
+
+    def _invalidate_local(self, dataset: str) -> int:
+        removed = 0
+        for group in self.cache.groups():
+            if dataset in group.split(DATASET_SEPARATOR):
+                removed += self.cache.invalidate(group)
+        self._prefetched = {entry for entry in self._prefetched if dataset not in entry[0].split(DATASET_SEPARATOR)}
+        return removed
+
+    def clear(self) -> None:
+        self._clear_local()
+        if self.generations is not None:
+            self.generations.bump(ALL_DATASETS)
+
+    def _clear_local(self) -> None:
+        self.cache.clear()
+        self._prefetched.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.cache.stats(),
+            "searches": self.lookups,
+            "search_hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "prefetches": self.prefetches,
+            "prefetch_hits": self.prefetch_hits,
+            # Share of prefetched results that a later search actually used
+            "prefetch_hit_rate": round(self.prefetch_hits / self.prefetches, 4) if self.prefetches else 0.0
+        }
@@ -0,0 +1,225 @@
+import asyncio
+import fcntl
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Uvicorn reads WEB_CONCURRENCY as its default worker count
+DEFAULT_WORKERS = int(os.environ.get("WEB_CONCURRENCY", 1))
+DEFAULT_STATE_DIRECTORY = os.environ.get(
+    "SHARED_STATE_DIRECTORY",
+    os.path.join(os.environ.get("SYSTEM_ROOT_DIRECTORY", "."), "shared_state")
+)
+LOCK_POLL_SECONDS = 0.05
+ALL_DATASETS = "*"
+
+
+def multi_worker() -> bool:
+    return DEFAULT_WORKERS > 1
+
+
+def _lock_path(name: str, directory: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    safe_name = hashlib.sha256(name.encode("utf-8")).hexdigest()[:32]
+    return os.path.join(directory, f"{safe_name}.lock")
+
+
+class ProcessLock:
+    """
+    Exclusive lock shared by every process on the host, backed by flock(2).
+    Each acquisition opens its own file description, so it excludes other
+    coroutines and threads of the same process as well as other workers.
+    """
+
+    def __init__(self, name: str, directory: str = DEFAULT_STATE_DIRECTORY):
+        self.name = name
+        self.path = _lock_path(name, os.path.join(directory, "locks"))
+        self._fd: Optional[int] = None
+
+    def try_acquire(self) -> bool:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def acquire_blocking(self) -> None:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        self._fd = fd
+
+    async def acquire(self) -> float:
+        """Wait for the lock without blocking the event loop; returns the seconds waited"""
+        started = time.perf_counter()
+        while not self.try_acquire():
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+        return time.perf_counter() - started
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    # Interface of cognee's cache engine locks, used for the shared Kuzu lock
+    def acquire_lock(self) -> None:
+        self.acquire_blocking()
+
+    def release_lock(self) -> None:
+        self.release()
+
+
+@asynccontextmanager
+async def dataset_write_lock(datasets: Iterable[str], directory: str = DEFAULT_STATE_DIRECTORY):
+    """
+    Serialize writes to the given datasets across workers; a no-op with a single worker.
+    Locks are taken in sorted order so multi-dataset writes cannot deadlock.
+    """
+    if not multi_worker():
+        yield
+        return
+
+    locks = [ProcessLock(f"dataset:{name}", directory) for name in sorted(set(datasets))]
+    acquired: List[ProcessLock] = []
+    try:
+        for lock in locks:
+            waited = await lock.acquire()
+            acquired.append(lock)
+            if waited > 1:
+                logger.info("Waited %.1fs for the write lock of dataset %s", waited, lock.name)
+        yield
+    finally:
+        for lock in reversed(acquired):
+            lock.release()
+
+
+def acquire_worker_slot(workers: int = DEFAULT_WORKERS, directory: str = DEFAULT_STATE_DIRECTORY) -> int:
+    """
+    Claim a stable slot number for this worker process, held until the process exits.
+    Logs and stats use it to tell workers apart across restarts.
+    """
+    slot = 0
+    while True:
+        lock = ProcessLock(f"worker-slot:{slot}", directory)
+        if lock.try_acquire():
+            # Keep the descriptor open for the lifetime of the process
+            return slot
+        slot += 1
+        if slot >= workers * 4:
+            raise RuntimeError(f"No free worker slot among {slot} in {directory}")
+
+
+def enable_shared_kuzu_lock(directory: str = DEFAULT_STATE_DIRECTORY) -> None:
+    """
+    Switch cognee's Kuzu adapter to its shared-lock mode, where every query opens
+    the database, runs and closes it while holding a lock for that database path.
+    Cognee implements the lock with Redis; here it is a host-local ProcessLock.
+
+    Cognee runs the locked open, query and close inline on the event loop, so one
+    worker waiting for another's lock would freeze all its requests. The query is
+    replaced by one that waits for the lock asynchronously and opens, queries and
+    closes the database in a thread.
+    Must run before the first graph engine is created.
+    """
+    from cognee.infrastructure.databases.cache.config import get_cache_config
+    from cognee.infrastructure.databases.graph.kuzu import adapter
+
+    get_cache_config().shared_kuzu_lock = True
+    adapter.get_cache_engine = lambda lock_key, **kwargs: ProcessLock(lock_key, directory)
+
+    def locked_query(engine, query: str, params: dict) -> List[tuple]:
+        # Releases the lock itself, so a cancelled caller can't release it while the database is still open
+        try:
+            if not engine.connection:
+                engine._initialize_connection()
+            result = engine.connection.execute(query, params)
+            rows = []
+            while result.has_next():
+                rows.append(tuple(value.as_py() if hasattr(value, "as_py") else value for value in result.get_next()))
+            return rows
+        except Exception as e:
+            logger.error(f"{type(e).__name__}: Kuzu query failed: {str(e)}")
+            raise
+        finally:
+            try:
+                engine.close()
+            finally:
+                engine.redis_lock.release()
+
+    async def threaded_query(self, query: str, params: Optional[dict] = None) -> List[tuple]:
+        # Queries of one adapter share its connection, so they still run one at a time
+        async with self._connection_change_lock:
+            await self.redis_lock.acquire()
+            return await asyncio.to_thread(locked_query, self, query, params or {})
+
+    adapter.KuzuAdapter.query = threaded_query
+
+
+async def enable_sqlite_wal() -> None:
+    """Readers of the relational SQLite database no longer block on its single writer"""
+    from sqlalchemy import text
+    from cognee.infrastructure.databases.relational import get_relational_engine
+
+    engine = get_relational_engine()
+    if engine.engine.dialect.name != "sqlite":
+        return
+    async with engine.engine.begin() as connection:
+        await connection.execute(text("PRAGMA journal_mode=WAL"))
+
+
+class SharedGenerations:
+    """
+    Per-dataset write counters shared by all workers through SQLite.
+
+    Each worker keeps its own in-memory caches; a write in one worker bumps the
+    dataset's generation, and the other workers drop their entries for that
+    dataset the next time they look at it.
+    """
+
+    def __init__(self, directory: str = DEFAULT_STATE_DIRECTORY):
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(
+            os.path.join(directory, "generations.db"), isolation_level=None, check_same_thread=False, timeout=30
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS generations (dataset TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+        )
+        self._seen: Dict[str, int] = {}
+
+    def bump(self, dataset: str = ALL_DATASETS) -> None:
+        self._db.execute(
+            "INSERT INTO generations (dataset, generation) VALUES (?, 1) "
+            "ON CONFLICT(dataset) DO UPDATE SET generation = generation + 1",
+            (dataset,)
+        )
+        self._seen[dataset] = self._current([dataset]).get(dataset, 0)
+
+    def _current(self, datasets: List[str]) -> Dict[str, int]:
+        placeholders = ",".join("?" * len(datasets))
+        return dict(self._db.execute(
+            f"SELECT dataset, generation FROM generations WHERE dataset IN ({placeholders})", datasets
+        ).fetchall())
+
+    def changed(self, datasets: Iterable[str]) -> List[str]:
+        """
+        Datasets written by any worker since this worker last looked at them.
+        A change of ALL_DATASETS (a full wipe) is reported as "*".
+        """
+        names = list(dict.fromkeys(list(datasets) + [ALL_DATASETS]))
+        current = self._current(names)
+        changed = [name for name in names if current.get(name, 0) != self._seen.get(name, 0)]
+        self._seen.update({name: current.get(name, 0) for name in names})
+        return changed
+
+    def close(self) -> None:
+        self._db.close()
@@ -0,0 +1,224 @@
+import asyncio
+import glob
+import importlib
+import logging
+import os
+import shutil
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Per-dataset graph and vector stores kept open at once (each open Kuzu database reserves its own buffer pool)
+DEFAULT_MAX_OPEN_STORES = int(os.environ.get("STORE_MAX_OPEN", 32))
+# Stores unused for this long are closed and reopened on their next use
+DEFAULT_IDLE_SECONDS = float(os.environ.get("STORE_IDLE_SECONDS", 600))
+# Stores used more recently than this are never closed, even above the limit, as a query may still be running
+MIN_IDLE_TO_CLOSE_SECONDS = 30
+REAP_INTERVAL_SECONDS = 60
+
+GRAPH = "graph"
+VECTOR = "vector"
+
+
+class StoreHandles:
+    """
+    LRU of the open per-dataset graph (Kuzu) and vector (LanceDB) adapters.
+
+    With backend access control, cognee gives every dataset its own store files under
+    $SYSTEM_ROOT_DIRECTORY/databases/<owner id>/<dataset id>.*, but caches each adapter
+    forever, so every adventure ever touched keeps its databases open. `install()`
+    replaces those caches: adapters are created on first use, the least recently used
+    ones are closed above `max_open`, and idle ones are closed in the background.
+    cognee fetches the adapter at every step, so a closed store is simply reopened.
+
+    cognee may also hold on to an adapter across long steps (e.g. embedding between two
+    graph writes of a cognify). Graph stores with a running query are never closed, and
+    closing only drops an adapter's connection: one that is still referenced reconnects
+    on its next query and is handed out again instead of opening the store a second time.
+    """
+
+    def __init__(self, max_open: int = DEFAULT_MAX_OPEN_STORES, idle_seconds: float = DEFAULT_IDLE_SECONDS):
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self._handles: "OrderedDict[Tuple[str, tuple], Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Closed adapters that may still be referenced somewhere, reused while they are
+        self._retired: "weakref.WeakValueDictionary[Tuple[str, tuple], Any]" = weakref.WeakValueDictionary()
+        self._running: Dict[Tuple[str, tuple], int] = {}
+        self._reaper: Optional[asyncio.Task] = None
+        self.opened = 0
+        self.closed = 0
+
+    def install(self) -> None:
+        """Route cognee's graph and vector engine factories through this cache"""
+        # The packages re-export functions under the same names as these modules
+        for kind, module_name, name in (
+                (GRAPH, "cognee.infrastructure.databases.graph.get_graph_engine", "_create_graph_engine"),
+                (VECTOR, "cognee.infrastructure.databases.vector.create_vector_engine", "_create_vector_engine")
+        ):
+            module = importlib.import_module(module_name)
+            factory = getattr(module, name)
+            factory.cache_clear()
+            setattr(module, name, self._cached(kind, factory.__wrapped__))
+
+    def _cached(self, kind: str, create: Callable[..., Any]) -> Callable[..., Any]:
+        def cached_create(*args):
+            key = (kind, args)
+            with self._lock:
+                entry = self._handles.get(key)
+                if entry is not None:
+                    self._handles[key] = (entry[0], time.monotonic())
+                    self._handles.move_to_end(key)
+                    return entry[0]
+                adapter = self._retired.pop(key, None)
+                if adapter is None:
+                    adapter = create(*args)
+                    if kind == GRAPH:
+                        self._track_queries(key, adapter)
+                    self.opened += 1
+                self._handles[key] = (adapter, time.monotonic())
+                evicted = self._over_capacity()
+            self._close_all(evicted)
+            return adapter
+
+        return cached_create
+
+    def _track_queries(self, key: Tuple[str, tuple], adapter: Any) -> None:
+        """Count the running queries of a graph adapter and refresh its last use when they finish"""
+        # Bound through a weak reference, so the wrapper doesn't keep a closed adapter alive
+        adapter_ref = weakref.ref(adapter)
+        query = type(adapter).query
+
+        async def tracked_query(*args, **kwargs):
+            with self._lock:
+                self._running[key] = self._running.get(key, 0) + 1
+            try:
+                return await query(adapter_ref(), *args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running[key] -= 1
+                    if not self._running[key]:
+                        del self._running[key]
+                    entry = self._handles.get(key)
+                    if entry is not None:
+                        self._handles[key] = (entry[0], time.monotonic())
+
+        adapter.query = tracked_query
+
+    def _closable(self, key: Tuple[str, tuple], last_used: float, idle_seconds: float, now: float) -> bool:
+        return now - last_used >= idle_seconds and not self._running.get(key)
+
+    def _over_capacity(self) -> List[Tuple[Tuple[str, tuple], Any]]:
+        evicted = []
+        now = time.monotonic()
+        for key, (adapter, last_used) in list(self._handles.items()):
+            if len(self._handles) <= self.max_open:
+                break
+            if self._closable(key, last_used, MIN_IDLE_TO_CLOSE_SECONDS, now):
+                evicted.append((key, adapter))
+                self._retire(key, adapter)
+        return evicted
+
+    def _retire(self, key: Tuple[str, tuple], adapter: Any) -> None:
+        # Taken out of the LRU and kept for reuse in the same step, so a store is never opened twice
+        del self._handles[key]
+        self._retired[key] = adapter
+
+    def _close_all(self, evicted: List[Tuple[Tuple[str, tuple], Any]]) -> None:
+        for (kind, args), adapter in evicted:
+            # The adapter's executor stays up: whoever still holds the adapter reconnects through it
+            try:
+                if kind == GRAPH and hasattr(adapter, "close"):
+                    adapter.close()
+                elif kind == VECTOR and hasattr(adapter, "connection"):
+                    adapter.connection = None
+            except Exception as e:
+                logger.warning(f"{type(e).__name__}: Failed to close {kind} store {args[1]}: {str(e)}")
+            self.closed += 1
+            logger.info("Closed %s store %s", kind, args[1])
+
+    def reap(self) -> int:
+        """Close stores idle for longer than `idle_seconds`; returns how many were closed"""
+        now = time.monotonic()
+        with self._lock:
+            evicted = [
+                (key, adapter) for key, (adapter, last_used) in self._handles.items()
+                if self._closable(key, last_used, max(self.idle_seconds, MIN_IDLE_TO_CLOSE_SECONDS), now)
+            ]
+            for key, adapter in evicted:
+                self._retire(key, adapter)
+        self._close_all(evicted)
+        return len(evicted)
+
+    def evict_dataset(self, dataset_id: str) -> int:
+        """Close the stores of a dataset right away, e.g. before its files are removed"""
+        with self._lock:
+            evicted = [
+                (key, adapter) for key, (adapter, _) in self._handles.items()
+                if os.path.basename(str(key[1][1])).startswith(str(dataset_id))
+            ]
+            for key, adapter in evicted:
+                self._retire(key, adapter)
+        self._close_all(evicted)
+        return len(evicted)
+
+    def evict_all(self) -> int:
+        """Close every open store right away, e.g. before all databases are wiped"""
+        with self._lock:
+            evicted = list((key, adapter) for key, (adapter, _) in self._handles.items())
+            for key, adapter in evicted:
+                self._retire(key, adapter)
+        self._close_all(evicted)
+        return len(evicted)
+
+    def start(self) -> None:
+        self._reaper = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(REAP_INTERVAL_SECONDS)
+            try:
+                self.reap()
+            except Exception as e:
+                logger.warning(f"{type(e).__name__}: Closing idle stores failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            open_stores = {GRAPH: 0, VECTOR: 0}
+            for kind, _ in self._handles:
+                open_stores[kind] += 1
+        return {
+            "open": open_stores,
+            "max_open": self.max_open,
+            "idle_seconds": self.idle_seconds,
+            "opened": self.opened,
+            "closed": self.closed
+        }
+
+
+def remove_dataset_files(owner_id: str, dataset_id: str) -> List[str]:
+    """
+    Remove whatever is left of a dataset's own stores (Kuzu file, WAL, LanceDB directory)
+    after cognee deleted the dataset; returns the removed paths.
+    """
+    from cognee.base_config import get_base_config
+
+    directory = os.path.join(get_base_config().system_root_directory, "databases", str(owner_id))
+    removed = []
+    for path in glob.glob(os.path.join(glob.escape(directory), f"{dataset_id}.*")):
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+        removed.append(path)
+    return removed
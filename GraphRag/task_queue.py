@@ -0,0 +1,243 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_PATH = os.environ.get("TASK_QUEUE_PATH", "task_queue.db")
+DEFAULT_MAX_PENDING = int(os.environ.get("TASK_QUEUE_MAX_PENDING", 1000))
+DEFAULT_MAX_CONCURRENT_GROUPS = int(os.environ.get("TASK_QUEUE_MAX_CONCURRENT_GROUPS", 4))
+DEFAULT_RESULT_TTL_SECONDS = int(os.environ.get("TASK_QUEUE_RESULT_TTL_SECONDS", 24 * 60 * 60))
+EXPIRY_INTERVAL_SECONDS = 300
+
+
+class TaskStatus(str, Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when the queue already holds the maximum number of unfinished tasks"""
+
+
+TaskHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL UNIQUE,
+    group_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    episode_id TEXT,
+    message TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    completed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_tasks_group_status ON tasks (group_id, status, seq);
+CREATE INDEX IF NOT EXISTS ix_tasks_status_completed ON tasks (status, completed_at);
+"""
+
+# Oldest unfinished task of every group that has no task in flight
+_NEXT_TASKS = """
+SELECT t.seq, t.task_id, t.group_id, t.kind, t.payload FROM tasks t
+WHERE t.status = 'pending'
+  AND t.seq = (
+      SELECT MIN(seq) FROM tasks
+      WHERE group_id = t.group_id AND status IN ('pending', 'processing')
+  )
+ORDER BY t.seq
+LIMIT ?
+"""
+
+
+class DurableTaskQueue:
+    """
+    SQLite-backed background task queue.
+
+    Tasks of the same group run strictly in submission order, one at a time,
+    while different groups are processed in parallel up to a concurrency cap.
+    Task records survive restarts; tasks that were in flight during a crash are
+    re-queued on startup, and finished records expire after a retention period.
+    """
+
+    def __init__(
+            self,
+            handlers: Dict[str, TaskHandler],
+            path: str = DEFAULT_QUEUE_PATH,
+            max_pending: int = DEFAULT_MAX_PENDING,
+            max_concurrent_groups: int = DEFAULT_MAX_CONCURRENT_GROUPS,
+            result_ttl_seconds: int = DEFAULT_RESULT_TTL_SECONDS
+    ):
+        self.handlers = handlers
+        self.path = path
+        self.max_pending = max_pending
+        self.max_concurrent_groups = max_concurrent_groups
+        self.result_ttl = timedelta(seconds=result_ttl_seconds)
+        self._db: Optional[sqlite3.Connection] = None
+        self._wake = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        self._last_expiry = datetime.min
+
+    # ==================== LIFECYCLE ====================
+
+    async def start(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+        recovered = self._db.execute(
+            "UPDATE tasks SET status = ? WHERE status = ?",
+            (TaskStatus.PENDING.value, TaskStatus.PROCESSING.value)
+        ).rowcount
+        if recovered:
+            logger.warning(f"Re-queued {recovered} tasks interrupted by a restart")
+
+        self._expire_finished()
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+        self._wake.set()
+
+    async def stop(self) -> None:
+        tasks = [t for t in [self._dispatcher, *self._running.values()] if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._running.clear()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # ==================== PUBLIC API ====================
+
+    def enqueue(self, task_id: str, group_id: str, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Persist a task and schedule it; returns the task record"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown task kind: {kind}")
+
+        existing = self.get(task_id)
+        if existing and existing["status"] in (TaskStatus.PENDING, TaskStatus.PROCESSING):
+            # Retried submission of a task that is still queued
+            return existing
+
+        if self.unfinished_count() >= self.max_pending:
+            raise QueueFullError(f"Task queue is full ({self.max_pending} unfinished tasks)")
+
+        self._db.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+        self._db.execute(
+            "INSERT INTO tasks (task_id, group_id, kind, payload, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (task_id, group_id, kind, json.dumps(payload), TaskStatus.PENDING.value, datetime.now().isoformat())
+        )
+        self._wake.set()
+        return self.get(task_id)
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        row = self._db.execute(
+            "SELECT task_id, episode_id, status, message, error, created_at, completed_at FROM tasks WHERE task_id = ?",
+            (task_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "task_id": row["task_id"],
+            "episode_id": row["episode_id"],
+            "status": TaskStatus(row["status"]),
+            "message": row["message"],
+            "error": row["error"],
+            "created_at": datetime.fromisoformat(row["created_at"]),
+            "completed_at": datetime.fromisoformat(row["completed_at"]) if row["completed_at"] else None
+        }
+
+    def unfinished_count(self) -> int:
+        return self._db.execute(
+            "SELECT COUNT(*) FROM tasks WHERE status IN (?, ?)",
+            (TaskStatus.PENDING.value, TaskStatus.PROCESSING.value)
+        ).fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {status.value: 0 for status in TaskStatus}
+        for row in self._db.execute("SELECT status, COUNT(*) AS n FROM tasks GROUP BY status"):
+            counts[row["status"]] = row["n"]
+        return {
+            "tasks": counts,
+            "max_pending": self.max_pending,
+            "active_groups": sorted(self._running),
+            "max_concurrent_groups": self.max_concurrent_groups
+        }
+
+    # ==================== DISPATCH ====================
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=EXPIRY_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                self._expire_finished()
+                self._schedule_ready()
+            except Exception as e:
+                logger.error(f"{type(e).__name__}: Error dispatching queued tasks: {str(e)}")
+
+    def _schedule_ready(self) -> None:
+        free_slots = self.max_concurrent_groups - len(self._running)
+        if free_slots <= 0:
+            return
+        for row in self._db.execute(_NEXT_TASKS, (free_slots,)).fetchall():
+            if row["group_id"] in self._running:
+                continue
+            self._db.execute(
+                "UPDATE tasks SET status = ? WHERE seq = ?",
+                (TaskStatus.PROCESSING.value, row["seq"])
+            )
+            self._running[row["group_id"]] = asyncio.create_task(self._run(
+                row["task_id"], row["group_id"], row["kind"], json.loads(row["payload"])
+            ))
+
+    async def _run(self, task_id: str, group_id: str, kind: str, payload: Dict[str, Any]) -> None:
+        try:
+            result = await self.handlers[kind](payload)
+            self._db.execute(
+                "UPDATE tasks SET status = ?, episode_id = ?, message = ?, completed_at = ? WHERE task_id = ?",
+                (TaskStatus.COMPLETED.value, result.get("episode_id"), result.get("message"),
+                 datetime.now().isoformat(), task_id)
+            )
+        except asyncio.CancelledError:
+            # Shutdown: leave the task in flight so it is re-queued on the next start
+            raise
+        except Exception as e:
+            logger.error(f"{type(e).__name__}: Error processing {kind} task {task_id}: {str(e)}")
+            self._db.execute(
+                "UPDATE tasks SET status = ?, error = ?, completed_at = ? WHERE task_id = ?",
+                (TaskStatus.FAILED.value, f"{type(e).__name__}: {str(e)}", datetime.now().isoformat(), task_id)
+            )
+        finally:
+            self._running.pop(group_id, None)
+            self._wake.set()
+
+    def _expire_finished(self) -> None:
+        now = datetime.now()
+        if now - self._last_expiry < timedelta(seconds=EXPIRY_INTERVAL_SECONDS):
+            return
+        self._last_expiry = now
+        expired = self._db.execute(
+            "DELETE FROM tasks WHERE status IN (?, ?) AND completed_at < ?",
+            (TaskStatus.COMPLETED.value, TaskStatus.FAILED.value, (now - self.result_ttl).isoformat())
+        ).rowcount
+        if expired:
+            logger.info(f"Expired {expired} finished task records")
@@ -0,0 +1,270 @@
+import asyncio
+import json
+import logging
+import os
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from graph_maintenance import graph_stamp
+
+logger = logging.getLogger(__name__)
+
+# Timelines of this many graphs are kept in memory
+DEFAULT_MAX_TIMELINES = int(os.environ.get("TEMPORAL_INDEX_MAX_GRAPHS", 64))
+# Graph completion fetches this many times more triplets when a time window drops some of them
+WINDOW_TRIPLET_OVERFETCH = 2
+
+# Story-time window of the current search as (from, to) in epoch milliseconds, either end open
+TimeWindow = Tuple[Optional[int], Optional[int]]
+
+_window: ContextVar[Optional[TimeWindow]] = ContextVar("temporal_window", default=None)
+
+TIMESTAMPS_QUERY = "MATCH (n:Node) WHERE n.type = 'Timestamp' RETURN n.id, n.properties"
+EVENT_AT_QUERY = """
+    MATCH (e:Node)-[:EDGE {relationship_name: 'at'}]->(t:Node)
+    WHERE e.type = 'Event' AND t.type = 'Timestamp'
+    RETURN e.id, t.id
+"""
+EVENT_DURING_QUERY = """
+    MATCH (e:Node)-[:EDGE {relationship_name: 'during'}]->(i:Node)-[r:EDGE]->(t:Node)
+    WHERE e.type = 'Event' AND t.type = 'Timestamp' AND r.relationship_name IN ['time_from', 'time_to']
+    RETURN e.id, i.id, r.relationship_name, t.id
+"""
+
+
+def to_epoch_ms(moment: datetime) -> int:
+    """Epoch milliseconds as cognee stores Timestamp.time_at; naive datetimes are taken as UTC"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+
+def time_window(as_of: Optional[datetime] = None,
+                between: Optional[Tuple[datetime, datetime]] = None) -> Optional[TimeWindow]:
+    """The window of a search's as_of/between parameters, or None when it isn't time-scoped"""
+    if as_of is not None and between is not None:
+        raise ValueError("Use either as_of or between, not both")
+    if as_of is not None:
+        return to_epoch_ms(as_of), to_epoch_ms(as_of)
+    if between is not None:
+        start, end = to_epoch_ms(between[0]), to_epoch_ms(between[1])
+        if start > end:
+            raise ValueError("between must start before it ends")
+        return start, end
+    return None
+
+
+def use_time_window(window: Optional[TimeWindow]) -> None:
+    """Scope the graph retrieval of the current task to facts valid within `window`"""
+    _window.set(window)
+
+
+class Timeline:
+    """
+    Story times of a graph: Timestamp nodes and the interval each Event is valid in
+    (a point for `at`, from/to for `during`), as sorted arrays searched with bisect.
+    """
+
+    def __init__(self, timestamps: Dict[str, int], events: Dict[str, Tuple[int, int]],
+                 event_nodes: Dict[str, Set[str]]):
+        self._times = sorted((time_at, node_id) for node_id, time_at in timestamps.items())
+        self._time_keys = [time_at for time_at, _ in self._times]
+        self._timestamp_ids = set(timestamps)
+        self._starts = sorted((start, event_id) for event_id, (start, _) in events.items())
+        self._start_keys = [start for start, _ in self._starts]
+        self._ends = sorted((end, event_id) for event_id, (_, end) in events.items())
+        self._end_keys = [end for end, _ in self._ends]
+        # Timestamp and Interval nodes each event is linked to
+        self._event_nodes = event_nodes
+        self.events = len(events)
+
+    def timestamp_ids(self, time_from: Optional[int] = None, time_to: Optional[int] = None) -> List[str]:
+        low = bisect_left(self._time_keys, time_from) if time_from is not None else 0
+        high = bisect_right(self._time_keys, time_to) if time_to is not None else len(self._times)
+        return [node_id for _, node_id in self._times[low:high]]
+
+    def events_within(self, time_from: Optional[int] = None, time_to: Optional[int] = None) -> Set[str]:
+        """Events whose interval overlaps the window"""
+        started = self._starts[:bisect_right(self._start_keys, time_to)] if time_to is not None else self._starts
+        ended = self._ends[:bisect_left(self._end_keys, time_from)] if time_from is not None else []
+        return {event_id for _, event_id in started} - {event_id for _, event_id in ended}
+
+    def excluded(self, time_from: Optional[int] = None, time_to: Optional[int] = None) -> Set[str]:
+        """Events valid only outside the window, with their Interval nodes; events without a time are kept"""
+        within = self.events_within(time_from, time_to)
+        excluded = set()
+        for _, event_id in self._starts:
+            if event_id not in within:
+                excluded.add(event_id)
+                excluded.update(
+                    node_id for node_id in self._event_nodes.get(event_id, ()) if node_id not in self._timestamp_ids
+                )
+        return excluded
+
+    def anchor_ids(self, time_from: Optional[int] = None, time_to: Optional[int] = None) -> List[str]:
+        """Timestamps in the window plus those of events overlapping it, from which cognee collects events"""
+        anchors = set(self.timestamp_ids(time_from, time_to))
+        for event_id in self.events_within(time_from, time_to):
+            anchors.update(node_id for node_id in self._event_nodes.get(event_id, ()) if node_id in self._timestamp_ids)
+        return sorted(anchors)
+
+
+async def load_timeline(engine) -> Timeline:
+    timestamps = {}
+    for node_id, properties in await engine.query(TIMESTAMPS_QUERY):
+        time_at = json.loads(properties or "{}").get("time_at")
+        if time_at not in (None, ""):
+            timestamps[node_id] = int(time_at)
+
+    events: Dict[str, Tuple[int, int]] = {}
+    event_nodes: Dict[str, Set[str]] = {}
+    for event_id, timestamp_id in await engine.query(EVENT_AT_QUERY):
+        if timestamp_id in timestamps:
+            events[event_id] = (timestamps[timestamp_id], timestamps[timestamp_id])
+            event_nodes.setdefault(event_id, set()).add(timestamp_id)
+
+    bounds: Dict[str, Dict[str, int]] = {}
+    for event_id, interval_id, relationship, timestamp_id in await engine.query(EVENT_DURING_QUERY):
+        if timestamp_id in timestamps:
+            bounds.setdefault(event_id, {})[relationship] = timestamps[timestamp_id]
+            event_nodes.setdefault(event_id, set()).update((interval_id, timestamp_id))
+    for event_id, bound in bounds.items():
+        start, end = bound.get("time_from"), bound.get("time_to")
+        start = start if start is not None else end
+        end = end if end is not None else start
+        if event_id in events:
+            # An event with both a point and an interval is valid across both
+            start, end = min(start, events[event_id][0]), max(end, events[event_id][1])
+        events[event_id] = (min(start, end), max(start, end))
+
+    return Timeline(timestamps, events, event_nodes)
+
+
+class TemporalIndex:
+    """
+    Time-interval index over the events of each Kuzu graph, backing time-scoped searches.
+
+    `install()` hooks into cognee's retrieval:
+    - temporal search looks up Timestamp nodes by bisect instead of scanning and parsing
+      every one of them, and also finds events whose `during` interval spans the window;
+    - with a window set (`use_time_window`, from a search's as_of/between), temporal search
+      skips the LLM call that extracts the time from the query, and events and graph
+      triplets valid only outside the window are dropped before the answer is generated.
+
+    A graph's timeline is rebuilt after its files changed.
+    """
+
+    def __init__(self, max_timelines: int = DEFAULT_MAX_TIMELINES):
+        self.max_timelines = max_timelines
+        self._timelines: "OrderedDict[str, Tuple[Tuple[Any, ...], Timeline]]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.builds = 0
+        self.hits = 0
+        self.filtered = 0
+
+    async def timeline(self, engine) -> Timeline:
+        path = engine.db_path
+        async with self._locks.setdefault(path, asyncio.Lock()):
+            stamp = graph_stamp(path)
+            entry = self._timelines.get(path)
+            if entry is not None and entry[0] == stamp:
+                self._timelines.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            timeline = await load_timeline(engine)
+            self.builds += 1
+            # Loading reads only, but take the stamp after in case a write committed meanwhile
+            self._timelines[path] = (stamp if graph_stamp(path) == stamp else None, timeline)
+            self._timelines.move_to_end(path)
+            while len(self._timelines) > self.max_timelines:
+                evicted, _ = self._timelines.popitem(last=False)
+                self._locks.pop(evicted, None)
+            return timeline
+
+    def install(self) -> None:
+        from cognee.infrastructure.databases.graph.kuzu.adapter import KuzuAdapter
+        from cognee.modules.engine.utils.generate_timestamp_datapoint import date_to_int
+        from cognee.modules.retrieval.graph_completion_retriever import GraphCompletionRetriever
+        from cognee.modules.retrieval.temporal_retriever import TemporalRetriever
+        from cognee.tasks.temporal_graph.models import Timestamp
+
+        index = self
+        extract_time_from_query = TemporalRetriever.extract_time_from_query
+        collect_events = KuzuAdapter.collect_events
+        get_triplets = GraphCompletionRetriever.get_triplets
+
+        def timestamp(time_at: Optional[int]):
+            if time_at is None:
+                return None
+            moment = datetime.fromtimestamp(time_at / 1000, tz=timezone.utc)
+            return Timestamp(year=moment.year, month=moment.month, day=moment.day,
+                             hour=moment.hour, minute=moment.minute, second=moment.second)
+
+        async def windowed_extract_time_from_query(self, query: str):
+            window = _window.get()
+            if window is None:
+                return await extract_time_from_query(self, query)
+            return timestamp(window[0]), timestamp(window[1])
+
+        async def indexed_collect_time_ids(self, time_from=None, time_to=None) -> str:
+            if not time_from and not time_to:
+                return []
+            window = (date_to_int(time_from) if time_from else None, date_to_int(time_to) if time_to else None)
+            if _window.get() is None:
+                # Events collected next are filtered by the window extracted from the query
+                _window.set(window)
+            timeline = await index.timeline(self)
+            return ", ".join(f"'{node_id}'" for node_id in timeline.anchor_ids(*window))
+
+        async def windowed_collect_events(self, ids):
+            result = await collect_events(self, ids)
+            window = _window.get()
+            if window is None:
+                return result
+            excluded = (await index.timeline(self)).excluded(*window)
+            for group in result:
+                kept = [event for event in group["events"] if event["id"] not in excluded]
+                index.filtered += len(group["events"]) - len(kept)
+                group["events"] = kept
+            return result
+
+        async def windowed_get_triplets(self, query: str):
+            window = _window.get()
+            if window is None:
+                return await get_triplets(self, query)
+            from cognee.infrastructure.databases.graph import get_graph_engine
+
+            graph_engine = await get_graph_engine()
+            if not isinstance(graph_engine, KuzuAdapter):
+                return await get_triplets(self, query)
+            timeline = await index.timeline(graph_engine)
+            if not timeline.events:
+                return await get_triplets(self, query)
+
+            top_k = self.top_k
+            self.top_k = top_k * WINDOW_TRIPLET_OVERFETCH
+            try:
+                triplets = await get_triplets(self, query)
+            finally:
+                self.top_k = top_k
+            excluded = timeline.excluded(*window)
+            kept = [edge for edge in triplets if str(edge.node1.id) not in excluded and str(edge.node2.id) not in excluded]
+            index.filtered += len(triplets) - len(kept)
+            return kept[:top_k]
+
+        TemporalRetriever.extract_time_from_query = windowed_extract_time_from_query
+        KuzuAdapter.collect_time_ids = indexed_collect_time_ids
+        KuzuAdapter.collect_events = windowed_collect_events
+        GraphCompletionRetriever.get_triplets = windowed_get_triplets
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "graphs": len(self._timelines),
+            "max_graphs": self.max_timelines,
+            "builds": self.builds,
+            "hits": self.hits,
+            "filtered": self.filtered
+        }
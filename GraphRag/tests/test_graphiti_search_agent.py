@@ -0,0 +1,52 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("graphiti_core")
+pytest.importorskip("langgraph")
+
+from agent_instrumentation import instrument_node  # noqa: E402
+from graphiti_search_agent_old import GraphToolsNode  # noqa: E402
+
+
+class StubDriver:
+    """Answers every Cypher query with the same edge rows, like neo4j's execute_query"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    async def execute_query(self, query, params=None, **kwargs):
+        self.queries.append(params)
+        return self.rows, None, list(self.rows[0]) if self.rows else []
+
+
+def test_expand_via_bfs_returns_edges_and_counts_queries():
+    rows = [{
+        "uuid": "edge-1",
+        "name": "KNOWS",
+        "fact": "Aldric knows Brenna",
+        "source_node_uuid": "node-1",
+        "target_node_uuid": "node-2",
+        "episodes": ["episode-1"],
+        "valid_at": None,
+        "invalid_at": None
+    }]
+    driver = StubDriver(rows)
+    tools = GraphToolsNode(SimpleNamespace(graphiti=SimpleNamespace(driver=driver), search_client=None))
+
+    async def expand(state):
+        return {"edges": await tools._expand_via_bfs(state["seeds"], "Who does Aldric know?")}
+
+    update = asyncio.run(instrument_node("bfs", expand)({"seeds": [{"uuid": "node-1"}, {"name": "no uuid"}]}))
+
+    assert [edge["uuid"] for edge in update["edges"]] == ["edge-1"]
+    assert update["edges"][0]["fact"] == "Aldric knows Brenna"
+    assert update["edges"][0]["depth_discovered"] == -1
+    assert driver.queries == [{"uuid": "node-1"}]
+    assert update["node_metrics"][0]["graph_queries"] == 1
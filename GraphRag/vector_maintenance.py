@@ -0,0 +1,240 @@
+import logging
+import os
+import time
+from contextvars import ContextVar
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from background_maintenance import BackgroundMaintainer
+
+logger = logging.getLogger(__name__)
+
+# Tables below this size are searched exhaustively, which is exact and fast enough
+DEFAULT_INDEX_MIN_ROWS = int(os.environ.get("LANCEDB_INDEX_MIN_ROWS", 10000))
+# ivf_pq, hnsw_pq or hnsw_sq
+DEFAULT_INDEX_TYPE = os.environ.get("LANCEDB_INDEX_TYPE", "ivf_pq")
+# Compact once a table has this many small fragments (every add or cognify appends one per table)
+DEFAULT_COMPACT_MIN_SMALL_FRAGMENTS = int(os.environ.get("LANCEDB_COMPACT_MIN_SMALL_FRAGMENTS", 16))
+# Share of rows not covered by the index above which the index is updated or retrained
+DEFAULT_MAX_UNINDEXED_RATIO = float(os.environ.get("LANCEDB_MAX_UNINDEXED_RATIO", 0.1))
+DEFAULT_INTERVAL_SECONDS = float(os.environ.get("LANCEDB_MAINTENANCE_INTERVAL_SECONDS", 3600))
+# Old table versions are kept this long, so searches that started on them can finish
+CLEANUP_OLDER_THAN = timedelta(minutes=10)
+# Searches use these unless a request overrides them (None keeps LanceDB's defaults)
+DEFAULT_NPROBES = int(os.environ["LANCEDB_NPROBES"]) if os.environ.get("LANCEDB_NPROBES") else None
+DEFAULT_REFINE_FACTOR = int(os.environ["LANCEDB_REFINE_FACTOR"]) if os.environ.get("LANCEDB_REFINE_FACTOR") else None
+
+VECTOR_COLUMN = "vector"
+INDEX_TYPES = ("ivf_pq", "hnsw_pq", "hnsw_sq")
+
+_search_params: ContextVar[Optional[Dict[str, int]]] = ContextVar("vector_search_params", default=None)
+
+
+def search_overrides(nprobes: Optional[int] = None, refine_factor: Optional[int] = None) -> Optional[Dict[str, int]]:
+    """ANN parameters a search request sets explicitly, or None to use the configured defaults"""
+    overrides = {"nprobes": nprobes, "refine_factor": refine_factor}
+    return {name: value for name, value in overrides.items() if value is not None} or None
+
+
+def use_search_params(overrides: Optional[Dict[str, int]]) -> None:
+    """Apply ANN parameters to the LanceDB searches made from the current task"""
+    _search_params.set(overrides)
+
+
+def _effective_search_params() -> Dict[str, int]:
+    defaults = {"nprobes": DEFAULT_NPROBES, "refine_factor": DEFAULT_REFINE_FACTOR}
+    params = {name: value for name, value in defaults.items() if value is not None}
+    params.update(_search_params.get() or {})
+    return params
+
+
+class _TunedTable:
+    """LanceDB table whose vector searches carry the request's ANN parameters"""
+
+    def __init__(self, table, params: Dict[str, int]):
+        self._table = table
+        self._params = params
+
+    def vector_search(self, *args, **kwargs):
+        query = self._table.vector_search(*args, **kwargs)
+        if "nprobes" in self._params:
+            query = query.nprobes(self._params["nprobes"])
+        if "refine_factor" in self._params:
+            query = query.refine_factor(self._params["refine_factor"])
+        return query
+
+    def __getattr__(self, name):
+        return getattr(self._table, name)
+
+
+def install_search_params() -> None:
+    """Make cognee's LanceDB adapter honour LANCEDB_NPROBES/LANCEDB_REFINE_FACTOR and `use_search_params`"""
+    from cognee.infrastructure.databases.vector.lancedb.LanceDBAdapter import LanceDBAdapter
+
+    get_collection = LanceDBAdapter.get_collection
+
+    async def tuned_get_collection(self, collection_name: str):
+        table = await get_collection(self, collection_name)
+        params = _effective_search_params()
+        return _TunedTable(table, params) if params else table
+
+    LanceDBAdapter.get_collection = tuned_get_collection
+
+
+async def dataset_vector_urls() -> Dict[str, str]:
+    """LanceDB directory of every dataset with its own vector store, by dataset id"""
+    from sqlalchemy import select
+    from cognee.infrastructure.databases.relational import get_relational_engine
+    from cognee.modules.users.models import DatasetDatabase
+
+    async with get_relational_engine().get_async_session() as session:
+        rows = await session.execute(
+            select(DatasetDatabase.dataset_id, DatasetDatabase.vector_database_url)
+            .where(DatasetDatabase.vector_database_provider == "lancedb")
+        )
+        return {str(dataset_id): url for dataset_id, url in rows if url}
+
+
+def _stat(stats: Any, name: str, default: Any = None) -> Any:
+    # LanceDB returns statistics as dicts or objects depending on its version
+    if isinstance(stats, dict):
+        return stats.get(name, default)
+    return getattr(stats, name, default)
+
+
+def _index_config(index_type: str, distance_type: str = "l2"):
+    from lancedb.index import HnswPq, HnswSq, IvfPq
+
+    # cognee searches with LanceDB's default l2 distance, so the index must use it too
+    configs = {"ivf_pq": IvfPq, "hnsw_pq": HnswPq, "hnsw_sq": HnswSq}
+    return configs[index_type](distance_type=distance_type)
+
+
+class VectorIndexMaintainer(BackgroundMaintainer):
+    """
+    Builds ANN indexes on and compacts the LanceDB tables of each adventure.
+
+    - A table without a vector index gets one once it reaches `index_min_rows`.
+    - A table with many small fragments, or many rows the index doesn't cover, is
+      optimized: fragments are merged, new rows are added to the index and old
+      versions are cleaned up. If rows remain unindexed, the index is retrained.
+
+    `request(dataset)` queues a check (e.g. after cognify); queued datasets and,
+    every `interval_seconds`, all datasets are checked in the background.
+    """
+
+    lock_name = "vector-maintenance"
+    store_label = "LanceDB"
+
+    def __init__(
+            self,
+            index_min_rows: int = DEFAULT_INDEX_MIN_ROWS,
+            index_type: str = DEFAULT_INDEX_TYPE,
+            compact_min_small_fragments: int = DEFAULT_COMPACT_MIN_SMALL_FRAGMENTS,
+            max_unindexed_ratio: float = DEFAULT_MAX_UNINDEXED_RATIO,
+            interval_seconds: float = DEFAULT_INTERVAL_SECONDS
+    ):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown LanceDB index type {index_type}; expected one of {INDEX_TYPES}")
+        super().__init__(interval_seconds)
+        self.index_min_rows = index_min_rows
+        self.index_type = index_type
+        self.compact_min_small_fragments = compact_min_small_fragments
+        self.max_unindexed_ratio = max_unindexed_ratio
+        self.indexes_built = 0
+        self.compactions = 0
+
+    # ==================== TABLES ====================
+
+    async def inspect(self, url: str) -> List[Dict[str, Any]]:
+        """Row, fragment and index statistics of every vector table in a LanceDB database"""
+        import lancedb
+
+        if not os.path.exists(url):
+            return []
+        connection = await lancedb.connect_async(url)
+        report = []
+        for name in await connection.table_names():
+            table = await connection.open_table(name)
+            report.append({"table": name, **await self._table_stats(table)})
+        return report
+
+    async def _table_stats(self, table) -> Dict[str, Any]:
+        stats = await table.stats()
+        fragments = _stat(stats, "fragment_stats", {})
+        index = await self._vector_index(table)
+        index_stats = await table.index_stats(index.name) if index is not None else None
+        return {
+            "rows": _stat(stats, "num_rows", 0),
+            "bytes": _stat(stats, "total_bytes"),
+            "fragments": _stat(fragments, "num_fragments"),
+            "small_fragments": _stat(fragments, "num_small_fragments", 0),
+            "index": index.index_type if index is not None else None,
+            "unindexed_rows": _stat(index_stats, "num_unindexed_rows") if index_stats is not None else None
+        }
+
+    @staticmethod
+    async def _vector_index(table):
+        return next((index for index in await table.list_indices() if VECTOR_COLUMN in index.columns), None)
+
+    async def maintain(self, url: str, force_index: bool = False, compact: Optional[bool] = None,
+                       write_lock: Optional[Callable[[], Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Check every vector table of a LanceDB database and index or compact it as needed.
+        `write_lock` returns a context manager held while fragments are rewritten.
+        """
+        import lancedb
+
+        if not os.path.exists(url):
+            return []
+        connection = await lancedb.connect_async(url)
+        actions = []
+        for name in await connection.table_names():
+            table = await connection.open_table(name)
+            if VECTOR_COLUMN not in (await table.schema()).names:
+                continue
+            before = current = await self._table_stats(table)
+            done = []
+
+            if before["index"] is None and (before["rows"] >= self.index_min_rows or (force_index and before["rows"])):
+                started = time.perf_counter()
+                await table.create_index(VECTOR_COLUMN, config=_index_config(self.index_type), replace=True)
+                self.indexes_built += 1
+                done.append(f"built {self.index_type} index in {time.perf_counter() - started:.1f}s")
+                current = await self._table_stats(table)
+
+            unindexed = current["unindexed_rows"] or 0
+            too_fragmented = current["small_fragments"] >= self.compact_min_small_fragments
+            too_unindexed = current["index"] is not None and unindexed > self.max_unindexed_ratio * current["rows"]
+            if compact or (compact is None and (too_fragmented or too_unindexed)):
+                started = time.perf_counter()
+                if write_lock is not None:
+                    async with write_lock():
+                        await table.optimize(cleanup_older_than=CLEANUP_OLDER_THAN)
+                else:
+                    await table.optimize(cleanup_older_than=CLEANUP_OLDER_THAN)
+                self.compactions += 1
+                done.append(f"optimized in {time.perf_counter() - started:.1f}s")
+
+                after = await self._table_stats(table)
+                if after["index"] is not None and (after["unindexed_rows"] or 0) > self.max_unindexed_ratio * after["rows"]:
+                    await table.create_index(VECTOR_COLUMN, config=_index_config(self.index_type), replace=True)
+                    self.indexes_built += 1
+                    done.append("retrained index")
+
+            if done:
+                after = await self._table_stats(table)
+                logger.info("LanceDB table %s in %s: %s", name, url, ", ".join(done))
+                actions.append({"table": name, "actions": done, "before": before, "after": after})
+        return actions
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "index_type": self.index_type,
+            "index_min_rows": self.index_min_rows,
+            "compact_min_small_fragments": self.compact_min_small_fragments,
+            "indexes_built": self.indexes_built,
+            "compactions": self.compactions,
+            **self.background_stats(),
+            "search_defaults": _effective_search_params()
+        }
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Set
+
+from latency_stats import percentile_ms
+from shared_state import dataset_write_lock
+
+logger = logging.getLogger(__name__)
+
+# Writes running at once across all datasets; they all share the relational SQLite database
+DEFAULT_MAX_CONCURRENT_WRITES = int(os.environ.get("WRITE_MAX_CONCURRENT", 4))
+# Upper bound on the documents merged into one batched add
+DEFAULT_MAX_BATCH_ITEMS = int(os.environ.get("WRITE_MAX_BATCH_ITEMS", 100))
+WAIT_SAMPLES = 1000
+SLOW_WAIT_SECONDS = 1.0
+
+
+@dataclass
+class _AddBatch:
+    contents: List[str] = field(default_factory=list)
+    requests: int = 0
+    closed: bool = False
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+
+@dataclass
+class _KindStats:
+    count: int = 0
+    waits: Deque[float] = field(default_factory=lambda: deque(maxlen=WAIT_SAMPLES))
+    durations: Deque[float] = field(default_factory=lambda: deque(maxlen=WAIT_SAMPLES))
+
+
+class WriteScheduler:
+    """
+    Coordinates writes to the per-dataset stores (Kuzu graph, LanceDB vectors) and
+    the shared relational database.
+
+    - Writes to a dataset run one at a time, in arrival order; reads never wait here.
+    - At most `max_concurrent_writes` writes run at once across datasets.
+    - `/add` requests queued for the same dataset are merged into one batched add
+      (one pipeline run and one set of transactions), as long as no other kind of
+      write was queued in between.
+    - With several workers, the dataset locks of shared_state additionally
+      serialize writes across processes.
+
+    Time spent waiting for the dataset and the global slot is recorded per write kind.
+    """
+
+    def __init__(
+            self,
+            max_concurrent_writes: int = DEFAULT_MAX_CONCURRENT_WRITES,
+            max_batch_items: int = DEFAULT_MAX_BATCH_ITEMS
+    ):
+        self.max_concurrent_writes = max_concurrent_writes
+        self.max_batch_items = max_batch_items
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._queued: Dict[str, int] = {}
+        self._slots = asyncio.Semaphore(max_concurrent_writes) if max_concurrent_writes > 0 else None
+        self._open_batches: Dict[str, _AddBatch] = {}
+        self._kinds: Dict[str, _KindStats] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.batched_requests = 0
+
+    @asynccontextmanager
+    async def write(self, datasets: Iterable[str], kind: str):
+        """Run the enclosed write exclusively for the given datasets"""
+        names = sorted(set(datasets))
+        if kind != "add":
+            for name in names:
+                # Adds queued after this write must not be merged into an earlier batch
+                batch = self._open_batches.pop(name, None)
+                if batch is not None:
+                    batch.closed = True
+
+        stats = self._kinds.setdefault(kind, _KindStats())
+        started = time.perf_counter()
+        for name in names:
+            self._queued[name] = self._queued.get(name, 0) + 1
+        waiting = True
+        acquired: List[asyncio.Lock] = []
+        try:
+            for name in names:
+                lock = self._locks.setdefault(name, asyncio.Lock())
+                await lock.acquire()
+                acquired.append(lock)
+            if self._slots is not None:
+                await self._slots.acquire()
+            try:
+                async with dataset_write_lock(names):
+                    waited = time.perf_counter() - started
+                    stats.waits.append(waited)
+                    if waited > SLOW_WAIT_SECONDS:
+                        logger.info("%s on %s waited %.1fs for earlier writes", kind, names, waited)
+                    self._dequeue(names)
+                    waiting = False
+                    running = time.perf_counter()
+                    try:
+                        yield
+                    finally:
+                        stats.count += 1
+                        stats.durations.append(time.perf_counter() - running)
+            finally:
+                if self._slots is not None:
+                    self._slots.release()
+        finally:
+            if waiting:
+                self._dequeue(names)
+            for lock in reversed(acquired):
+                lock.release()
+            for name in names:
+                # Forget idle datasets so the lock table doesn't grow with every adventure
+                lock = self._locks.get(name)
+                if lock is not None and not lock.locked() and not self._queued.get(name):
+                    del self._locks[name]
+                    self._queued.pop(name, None)
+
+    def _dequeue(self, names: List[str]) -> None:
+        for name in names:
+            self._queued[name] -= 1
+
+    async def add(
+            self,
+            dataset: str,
+            contents: List[str],
+            run_add: Callable[[List[str]], Awaitable[Any]]
+    ) -> Any:
+        """
+        Add documents to a dataset, merged with other adds waiting for the same dataset.
+        `run_add` receives the merged documents; every merged request gets its result.
+        """
+        batch = self._open_batches.get(dataset)
+        if batch is None or batch.closed or len(batch.contents) + len(contents) > self.max_batch_items:
+            if batch is not None:
+                batch.closed = True
+            batch = _AddBatch()
+            self._open_batches[dataset] = batch
+            # The batch runs in its own task, so it goes on for the other requests if the first one is cancelled
+            batch.task = asyncio.create_task(self._run_batch(dataset, batch, run_add))
+            self._tasks.add(batch.task)
+            batch.task.add_done_callback(self._batch_done)
+        batch.contents.extend(contents)
+        batch.requests += 1
+        return await asyncio.shield(batch.task)
+
+    async def _run_batch(self, dataset: str, batch: _AddBatch, run_add: Callable[[List[str]], Awaitable[Any]]) -> Any:
+        async with self.write([dataset], "add"):
+            batch.closed = True
+            if self._open_batches.get(dataset) is batch:
+                del self._open_batches[dataset]
+            self.batches += 1
+            self.batched_requests += batch.requests
+            return await run_add(batch.contents)
+
+    def _batch_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled():
+            # Mark the exception as retrieved in case every request was cancelled
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent_writes": self.max_concurrent_writes,
+            "queued": {name: count for name, count in self._queued.items() if count},
+            "add_batches": self.batches,
+            "add_requests_batched": self.batched_requests,
+            "kinds": {
+                kind: {
+                    "writes": stats.count,
+                    "wait_p50_ms": percentile_ms(stats.waits, 50),
+                    "wait_p95_ms": percentile_ms(stats.waits, 95),
+                    "wait_max_ms": round(max(stats.waits) * 1000, 2) if stats.waits else None,
+                    "duration_p50_ms": percentile_ms(stats.durations, 50),
+                    "duration_p95_ms": percentile_ms(stats.durations, 95)
+                }
+                for kind, stats in self._kinds.items()
+            }
+        }
@@ -106,6 +106,8 @@ public interface IRagSearch
 
 internal class RagClient : IRagBuilder, IRagSearch
 {
+    private const int DatasetPageSize = 500;
+
     private readonly HttpClient _httpClient;
     private readonly ILogger _logger;
     private readonly IMessageDispatcher _messageDispatcher;
@@ -162,11 +164,30 @@ internal class RagClient : IRagBuilder, IRagSearch
 
     public async Task<List<DatasetData>> GetDatasetsAsync(string dataset, CancellationToken cancellationToken = default)
     {
-        var response = await _httpClient.GetAsync($"/datasets/{Uri.EscapeDataString(dataset)}", cancellationToken);
-        response.EnsureSuccessStatusCode();
+        var datasets = new List<DatasetData>();
+        string? cursor = null;
+        do
+        {
+            var url = $"/datasets/{Uri.EscapeDataString(dataset)}?fields=id,name&limit={DatasetPageSize}";
+            if (cursor != null)
+            {
+                url += $"&cursor={Uri.EscapeDataString(cursor)}";
+            }
+
+            var response = await _httpClient.GetAsync(url, cancellationToken);
+            response.EnsureSuccessStatusCode();
 
-        return await response.Content.ReadFromJsonAsync<List<DatasetData>>(cancellationToken)
-               ?? new List<DatasetData>();
+            var page = await response.Content.ReadFromJsonAsync<DatasetDataPage>(cancellationToken);
+            if (page == null)
+            {
+                break;
+            }
+
+            datasets.AddRange(page.Items);
+            cursor = page.NextCursor;
+        } while (cursor != null);
+
+        return datasets;
     }
 
     public async Task UpdateDataAsync(string dataset, string dataId, string content, CancellationToken cancellationToken = default)
@@ -350,4 +371,13 @@ public class DatasetData
 
     [JsonPropertyName("name")]
     public string? Name { get; set; }
+}
+
+public class DatasetDataPage
+{
+    [JsonPropertyName("items")]
+    public List<DatasetData> Items { get; set; } = new();
+
+    [JsonPropertyName("next_cursor")]
+    public string? NextCursor { get; set; }
 }
\ No newline at end of file